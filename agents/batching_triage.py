@@ -0,0 +1,302 @@
+# agents/batching_triage.py
+"""
+BatchingTriageAgent:
+- Drop-in replacement for TriageAgent in front of a model that can triage
+  many messages per call (e.g. one LLM request for a whole batch).
+- Collects concurrent requests for a short window (or until max_batch are
+  waiting), sends them to a pluggable backend as one batch and hands each
+  caller its own result.
+- Merges identical in-flight messages (same normalized text, see
+  agents/triage_cache.py) into one entry of one batch.
+
+A backend implements
+    async def triage_batch(messages: List[str]) -> List[TriageResult]
+returning one result per message, in order. KeywordTriageBackend runs the
+local keyword TriageAgent; FakeModelBackend adds model-like latency and a
+concurrency limit, for tests and benchmarks.
+
+As with the triage cache, only message text reaches the backend (sessions
+are never batched together), and every caller gets its own copy of the
+result.
+
+triage_async batches within the caller's event loop. The sync triage()
+hands requests to a background event loop started on first use, so calls
+from many threads are batched together as well.
+"""
+
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import asyncio
+import threading
+import weakref
+
+from agents.triage_agent import TriageAgent, TriageResult
+from agents.triage_cache import normalize_message
+
+
+class KeywordTriageBackend:
+    """
+    Batch backend over the local keyword TriageAgent.
+    """
+
+    def __init__(self, triage_agent: Optional[TriageAgent] = None) -> None:
+        self._triage_agent = triage_agent or TriageAgent()
+
+    async def triage_batch(self, messages: List[str]) -> List[TriageResult]:
+        triage = self._triage_agent.triage
+        return [triage(message, {}) for message in messages]
+
+
+class _ConcurrencyLimit:
+    """
+    An async semaphore that keeps no reference to its event loop once idle
+    (asyncio.Semaphore holds on to the loop it first waited on), so it can
+    be stored per loop in a WeakKeyDictionary.
+    """
+
+    def __init__(self, size: int) -> None:
+        self._free = size
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+
+    async def __aenter__(self) -> None:
+        if self._free:
+            self._free -= 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as we were cancelled: pass it on
+                self._release()
+            raise
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self._release()
+
+    def _release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._free += 1
+
+
+class FakeModelBackend:
+    """
+    Local stand-in for a hosted model. Answers like the keyword triage, but
+    every call takes call_latency + per_message_latency * len(batch) seconds
+    and at most `max_concurrent` calls run at once (a rate limit); more wait
+    their turn.
+    """
+
+    def __init__(
+        self,
+        call_latency: float = 0.020,
+        per_message_latency: float = 0.0005,
+        max_concurrent: int = 8,
+    ) -> None:
+        self.call_latency = call_latency
+        self.per_message_latency = per_message_latency
+        self._max_concurrent = max_concurrent
+        self._answers = KeywordTriageBackend()
+        # Waiters belong to one event loop, so each loop gets its own limit
+        self._limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _ConcurrencyLimit]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.calls = 0
+        self.messages = 0
+
+    async def triage_batch(self, messages: List[str]) -> List[TriageResult]:
+        loop = asyncio.get_running_loop()
+        limit = self._limits.get(loop)
+        if limit is None:
+            limit = self._limits.setdefault(loop, _ConcurrencyLimit(self._max_concurrent))
+        async with limit:
+            self.calls += 1
+            self.messages += len(messages)
+            await asyncio.sleep(self.call_latency + self.per_message_latency * len(messages))
+            return await self._answers.triage_batch(messages)
+
+
+class _LoopState:
+    """
+    Batching state for one event loop. It must not reference the loop: it
+    is the value of a WeakKeyDictionary keyed by that loop.
+    """
+
+    def __init__(self) -> None:
+        # (key, message) waiting for the next batch
+        self.pending: List[Tuple[str, str]] = []
+        # key -> future for every message queued or in a running batch
+        self.in_flight: Dict[str, "asyncio.Future[TriageResult]"] = {}
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.tasks: "set[asyncio.Task[None]]" = set()
+        self.requests = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.batched_messages = 0
+
+
+class BatchingTriageAgent:
+    def __init__(
+        self,
+        backend: Optional[Any] = None,
+        window_ms: float = 2.0,
+        max_batch: int = 32,
+    ) -> None:
+        self._backend = backend or KeywordTriageBackend()
+        self._window = window_ms / 1000
+        self._max_batch = max_batch
+        self._states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = (
+            weakref.WeakKeyDictionary()
+        )
+        # Counts from loops that have been garbage collected, for stats().
+        # Finalizers only append to the deque (atomic, no lock): garbage
+        # collection can run them on a thread already holding self._lock.
+        self._retired = _LoopState()
+        self._retiring: Deque[_LoopState] = deque()
+        self._lock = threading.Lock()
+        # Event loop behind the sync triage(), started on first use
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            with self._lock:
+                state = self._states.get(loop)
+                if state is None:
+                    state = self._states[loop] = _LoopState()
+                    # Keep its counts in stats() once the loop is gone
+                    weakref.finalize(loop, self._retire, state)
+        return state
+
+    def _retire(self, state: _LoopState) -> None:
+        self._retiring.append(state)
+
+    def _fold_retired_locked(self) -> None:
+        while self._retiring:
+            state = self._retiring.popleft()
+            self._retired.requests += state.requests
+            self._retired.coalesced += state.coalesced
+            self._retired.batches += state.batches
+            self._retired.batched_messages += state.batched_messages
+
+    async def triage_async(self, message: str, session: Dict[str, Any]) -> TriageResult:
+        state = self._state()
+        state.requests += 1
+        key = normalize_message(message)
+        future = state.in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            state.in_flight[key] = future
+            state.pending.append((key, message))
+            if len(state.pending) >= self._max_batch:
+                self._flush(state)
+            elif state.timer is None:
+                state.timer = loop.call_later(self._window, self._flush, state)
+        else:
+            state.coalesced += 1
+
+        # Shielded, so one caller giving up doesn't cancel the others' result
+        result = await asyncio.shield(future)
+        return TriageResult(intent=result.intent, request_data=dict(result.request_data))
+
+    def _flush(self, state: _LoopState) -> None:
+        if state.timer is not None:
+            state.timer.cancel()
+            state.timer = None
+        batch, state.pending = state.pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run_batch(state, batch))
+            state.tasks.add(task)
+            task.add_done_callback(state.tasks.discard)
+
+    async def _run_batch(self, state: _LoopState, batch: List[Tuple[str, str]]) -> None:
+        state.batches += 1
+        state.batched_messages += len(batch)
+        try:
+            results = await self._backend.triage_batch([message for _, message in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Triage backend returned {len(results)} results for {len(batch)} messages.")
+        except Exception as exc:
+            for key, _ in batch:
+                future = state.in_flight.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(exc)
+            return
+        for (key, _), result in zip(batch, results):
+            future = state.in_flight.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(result)
+
+    def triage(self, message: str, session: Dict[str, Any]) -> TriageResult:
+        """
+        Blocking entry point: batched on the agent's own event loop thread
+        with every other thread's triage() calls.
+        """
+        # Submitted under the lock, so close() sees every request it has to fail
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="triage-batcher", daemon=True)
+                self._thread.start()
+                self._loop = loop
+            future = asyncio.run_coroutine_threadsafe(self.triage_async(message, session), self._loop)
+        return future.result()
+
+    async def _abandon(self) -> None:
+        """
+        Fail every request still waiting on the background loop, so no
+        triage() caller stays blocked once the loop stops.
+        """
+        state = self._state()
+        if state.timer is not None:
+            state.timer.cancel()
+            state.timer = None
+        error = RuntimeError("BatchingTriageAgent was closed.")
+        for future in state.in_flight.values():
+            if not future.done():
+                future.set_exception(error)
+        state.in_flight.clear()
+        state.pending.clear()
+        for task in list(state.tasks):
+            task.cancel()
+        # Waiters now finish with the error; cancel anything that doesn't
+        others = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        if others:
+            _, stuck = await asyncio.wait(others, timeout=1.0)
+            for task in stuck:
+                task.cancel()
+            if stuck:
+                await asyncio.wait(stuck)
+
+    def close(self) -> None:
+        """
+        Stop the background loop used by triage(), if it was started. Calls
+        still waiting on it raise RuntimeError (or CancelledError).
+        """
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self._abandon(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._fold_retired_locked()
+            states = [*self._states.values(), self._retired]
+        return {
+            "requests": sum(state.requests for state in states),
+            "coalesced": sum(state.coalesced for state in states),
+            "batches": sum(state.batches for state in states),
+            "batched_messages": sum(state.batched_messages for state in states),
+        }
@@ -0,0 +1,102 @@
+"""
+KeywordMatcher:
+A table-driven, single-pass keyword extractor used by TriageAgent.
+
+Keyword tables map a field (e.g. "intent") to an ordered list of
+(value, keywords) pairs; earlier entries win when several values match.
+Keywords are whole words or phrases. A trailing "*" on a word makes it a
+prefix match, so "cardio*" matches "cardiology" but "ent" never matches
+inside "appointment".
+
+The tables are compiled once into a single word-bounded regular expression,
+so one scan over the message finds every keyword for every field; each hit
+is then resolved to its (field, value) outputs with a dict lookup.
+"""
+
+from typing import Dict, List, Mapping, Sequence, Tuple
+import re
+
+
+KeywordTable = Mapping[str, Sequence[Tuple[str, Sequence[str]]]]
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+DEFAULT_KEYWORD_TABLE: KeywordTable = {
+    # Explicit verbs come before the generic "appointment", so
+    # "reschedule my appointment" is not read as a new booking.
+    "intent": [
+        ("reschedule", ["reschedul*", "change*"]),
+        ("cancel", ["cancel*"]),
+        ("book", ["book*", "appointment*", "schedul*", "see a doctor"]),
+    ],
+    "department": [
+        ("Cardiology", ["cardio*", "heart"]),
+        ("Dermatology", ["derma*", "skin"]),
+        ("ENT", ["ent", "ear", "ears", "nose", "throat"]),
+    ],
+    "time_of_day": [
+        ("morning", ["morning*"]),
+        ("afternoon", ["afternoon*"]),
+        ("evening", ["evening*", "after 5*"]),
+    ],
+}
+
+
+class KeywordMatcher:
+    def __init__(self, table: KeywordTable) -> None:
+        self._fields = list(table)
+        # normalized keyword text -> (field, priority, value) outputs
+        outputs: Dict[str, List[Tuple[str, int, str]]] = {}
+        prefixes: List[str] = []
+        exact: List[str] = []
+
+        for field, entries in table.items():
+            for priority, (value, keywords) in enumerate(entries):
+                for keyword in keywords:
+                    words = keyword.lower().split()
+                    key = " ".join(word.rstrip("*") for word in words)
+                    outputs.setdefault(key, []).append((field, priority, value))
+                    body = r"[^a-z0-9]+".join(re.escape(word.rstrip("*")) for word in words)
+                    (prefixes if words[-1].endswith("*") else exact).append(body)
+
+        self._outputs = {key: tuple(hits) for key, hits in outputs.items()}
+
+        # Longest alternatives first so "ears" wins over "ear". Prefix
+        # keywords only need a left word boundary, exact ones need both.
+        alternatives = []
+        if prefixes:
+            alternatives.append("|".join(sorted(set(prefixes), key=len, reverse=True)))
+        if exact:
+            alternatives.append(
+                "(?:" + "|".join(sorted(set(exact), key=len, reverse=True)) + ")(?![a-z0-9])"
+            )
+        pattern = "(?<![a-z0-9])(?:" + "|".join(alternatives) + ")" if alternatives else "(?!)"
+        self._findall = re.compile(pattern).findall
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self._fields)
+
+    def match(self, message: str) -> Dict[str, str]:
+        """
+        Return {field: value} for every field with at least one keyword in
+        the message, choosing the highest-priority value per field.
+        """
+        best: Dict[str, Tuple[int, str]] = {}
+        outputs = self._outputs
+
+        for hit in self._findall(message.lower()):
+            hits = outputs.get(hit)
+            if hits is None:
+                # Multi-word keyword matched with unusual spacing/punctuation
+                hits = outputs[_NON_WORD.sub(" ", hit)]
+            for field, priority, value in hits:
+                current = best.get(field)
+                if current is None or priority < current[0]:
+                    best[field] = (priority, value)
+
+        return {field: value for field, (_, value) in best.items()}
+
+
+DEFAULT_MATCHER = KeywordMatcher(DEFAULT_KEYWORD_TABLE)
@@ -0,0 +1,192 @@
+"""
+TemplateRegistry:
+Response templates for NotificationAgent, keyed by (intent, channel, locale).
+
+Templates are str.format strings over slot fields ({doctor_name}, {date},
+{time}, {location}) plus {department}. Each locale supplies fallback text
+for every field ("an upcoming day", ...), used when a slot lacks it.
+
+The table is compiled once: placeholders are parsed and checked against the
+locale's fallbacks up front, so a typo fails at startup rather than on a
+patient's message. Rendering is a single str.format_map call straight on
+the slot dict; fallbacks are only filled in when a field is missing.
+Lookups fall back to the default channel, then the default locale, and are
+cached.
+"""
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+import string
+
+
+TemplateKey = Tuple[str, str, str]   # (intent, channel, locale)
+
+DEFAULT_CHANNEL = "chat"
+DEFAULT_LOCALE = "en"
+
+
+DEFAULT_FIELD_FALLBACKS: Mapping[str, Mapping[str, str]] = {
+    "en": {
+        "department": "the doctor",
+        "date": "an upcoming day",
+        "time": "a convenient time",
+        "doctor_name": "a specialist",
+        "location": "the clinic",
+    },
+    "es": {
+        "department": "el médico",
+        "date": "un día próximo",
+        "time": "una hora conveniente",
+        "doctor_name": "un especialista",
+        "location": "la clínica",
+    },
+}
+
+
+DEFAULT_TEMPLATES: Mapping[TemplateKey, str] = {
+    ("book", "chat", "en"): (
+        "Your appointment with {doctor_name} ({department}) is booked for "
+        "{date} at {time} at {location}. "
+        "If you’d like, I can help you reschedule or cancel later."
+    ),
+    ("reschedule", "chat", "en"): (
+        "Your appointment has been rescheduled to {date} at {time} "
+        "with {doctor_name} at {location}."
+    ),
+    ("cancel", "chat", "en"): "Your appointment has been canceled. Let me know if you want to book a new one.",
+    ("reminder", "chat", "en"): (
+        "Reminder: your appointment with {doctor_name} ({department}) is on "
+        "{date} at {time} at {location}."
+    ),
+
+    ("book", "sms", "en"): "Booked: {doctor_name}, {date} {time}, {location}.",
+    ("reschedule", "sms", "en"): "Moved: {doctor_name}, {date} {time}, {location}.",
+    ("cancel", "sms", "en"): "Your appointment is canceled.",
+    ("reminder", "sms", "en"): "Reminder: {doctor_name}, {date} {time}, {location}.",
+
+    ("book", "email", "en"): (
+        "Your appointment is confirmed.\n\n"
+        "Doctor: {doctor_name} ({department})\n"
+        "When: {date} at {time}\n"
+        "Where: {location}\n\n"
+        "Reply to this email if you need to reschedule or cancel."
+    ),
+    ("reminder", "email", "en"): (
+        "This is a reminder of your upcoming appointment.\n\n"
+        "Doctor: {doctor_name} ({department})\n"
+        "When: {date} at {time}\n"
+        "Where: {location}"
+    ),
+
+    ("book", "chat", "es"): (
+        "Su cita con {doctor_name} ({department}) está reservada para el "
+        "{date} a las {time} en {location}."
+    ),
+    ("reschedule", "chat", "es"): (
+        "Su cita se ha cambiado al {date} a las {time} con {doctor_name} en {location}."
+    ),
+    ("cancel", "chat", "es"): "Su cita ha sido cancelada.",
+    ("reminder", "chat", "es"): (
+        "Recordatorio: su cita con {doctor_name} ({department}) es el "
+        "{date} a las {time} en {location}."
+    ),
+    ("reminder", "sms", "es"): "Recordatorio: {doctor_name}, {date} {time}, {location}.",
+}
+
+
+class MessageTemplate:
+    """
+    One compiled template: the format string plus (field, fallback) pairs
+    for every placeholder it uses.
+    """
+
+    __slots__ = ("text", "_format", "_format_map", "_fields")
+
+    def __init__(self, text: str, fallbacks: Mapping[str, str]) -> None:
+        names = [name for _, name, _, _ in string.Formatter().parse(text) if name is not None]
+        unknown = [name for name in names if name not in fallbacks]
+        if unknown:
+            raise ValueError(f"Template {text!r} uses fields without a fallback: {', '.join(unknown)}.")
+        self.text = text
+        self._format = text.format
+        self._format_map = text.format_map
+        self._fields = tuple((name, fallbacks[name]) for name in dict.fromkeys(names))
+
+    def _with_fallbacks(self, context: Mapping[str, Any]) -> str:
+        get = context.get
+        return self._format(**{name: get(name, fallback) for name, fallback in self._fields})
+
+    def render(self, context: Mapping[str, Any], **overrides: Any) -> str:
+        """
+        Fill the template from `context` (usually a slot dict); keyword
+        overrides win over the context.
+        """
+        if overrides:
+            context = {**context, **overrides}
+        try:
+            # Complete contexts are formatted directly, without a copy
+            return self._format_map(context)
+        except KeyError:
+            return self._with_fallbacks(context)
+
+    def render_many(self, contexts: Iterable[Mapping[str, Any]]) -> List[str]:
+        format_map = self._format_map
+        rendered = []
+        append = rendered.append
+        for context in contexts:
+            try:
+                append(format_map(context))
+            except KeyError:
+                append(self._with_fallbacks(context))
+        return rendered
+
+
+class TemplateRegistry:
+    def __init__(
+        self,
+        templates: Mapping[TemplateKey, str] = DEFAULT_TEMPLATES,
+        field_fallbacks: Mapping[str, Mapping[str, str]] = DEFAULT_FIELD_FALLBACKS,
+        default_channel: str = DEFAULT_CHANNEL,
+        default_locale: str = DEFAULT_LOCALE,
+    ) -> None:
+        self._default_channel = default_channel
+        self._default_locale = default_locale
+        self._templates: Dict[TemplateKey, MessageTemplate] = {}
+        for (intent, channel, locale), text in templates.items():
+            fallbacks = field_fallbacks.get(locale)
+            if fallbacks is None:
+                raise ValueError(f"No field fallbacks for locale {locale!r}.")
+            self._templates[(intent, channel, locale)] = MessageTemplate(text, fallbacks)
+        # Resolved lookups, including fallbacks and misses
+        self._resolved: Dict[TemplateKey, Optional[MessageTemplate]] = {}
+
+    def get(
+        self,
+        intent: str,
+        channel: str = DEFAULT_CHANNEL,
+        locale: str = DEFAULT_LOCALE,
+    ) -> Optional[MessageTemplate]:
+        """
+        Template for (intent, channel, locale), falling back to the default
+        channel and then the default locale. None if there is none at all.
+        """
+        key = (intent, channel, locale)
+        try:
+            return self._resolved[key]
+        except KeyError:
+            pass
+        template = None
+        for candidate in (
+            key,
+            (intent, self._default_channel, locale),
+            (intent, channel, self._default_locale),
+            (intent, self._default_channel, self._default_locale),
+        ):
+            template = self._templates.get(candidate)
+            if template is not None:
+                break
+        self._resolved[key] = template
+        return template
+
+
+# Compiled once at import
+DEFAULT_REGISTRY = TemplateRegistry()
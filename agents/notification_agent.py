@@ -2,10 +2,19 @@
 """
 NotificationAgent:
 - Builds user-facing messages from triage and scheduler results.
+- Renders them from precompiled templates (see agents/message_templates.py),
+  per channel (chat / sms / email) and locale.
+- Renders reminder-style notifications for many patients in one batch call.
 """
 
-from agents.triage_agent import TriageResult
-from agents.scheduler_agent import SchedulerResult
+from typing import TYPE_CHECKING, Any, Iterable, List, Mapping, Optional
+
+from agents.message_templates import DEFAULT_CHANNEL, DEFAULT_LOCALE, DEFAULT_REGISTRY, TemplateRegistry
+
+if TYPE_CHECKING:
+    # Annotations only: rendering reminders doesn't load triage or scheduling
+    from agents.triage_agent import TriageResult
+    from agents.scheduler_agent import SchedulerResult
 
 
 class NotificationAgent:
@@ -13,36 +22,49 @@ class NotificationAgent:
     Converts internal results into friendly, human-readable text responses.
     """
 
+    def __init__(
+        self,
+        templates: Optional[TemplateRegistry] = None,
+        channel: str = DEFAULT_CHANNEL,
+        locale: str = DEFAULT_LOCALE,
+    ) -> None:
+        self._templates = templates or DEFAULT_REGISTRY
+        self._channel = channel
+        self._locale = locale
+
     def build_user_message(
         self,
         intent: str,
-        triage_result: TriageResult,
-        scheduler_result: SchedulerResult,
+        triage_result: "TriageResult",
+        scheduler_result: "SchedulerResult",
+        channel: Optional[str] = None,
+        locale: Optional[str] = None,
     ) -> str:
         if not scheduler_result.success:
             return scheduler_result.message
 
-        slot = scheduler_result.slot or {}
-        department = triage_result.request_data.get("department", "the doctor")
-
-        date = slot.get("date", "an upcoming day")
-        time = slot.get("time", "a convenient time")
-        doctor = slot.get("doctor_name", "a specialist")
-        location = slot.get("location", "the clinic")
-
-        if intent == "book":
-            return (
-                f"Your appointment with {doctor} ({department}) is booked for "
-                f"{date} at {time} at {location}. "
-                "If you’d like, I can help you reschedule or cancel later."
-            )
-        elif intent == "reschedule":
-            return (
-                f"Your appointment has been rescheduled to {date} at {time} "
-                f"with {doctor} at {location}."
-            )
-        elif intent == "cancel":
-            return "Your appointment has been canceled. Let me know if you want to book a new one."
-        else:
+        template = self._templates.get(intent, channel or self._channel, locale or self._locale)
+        if template is None:
             return scheduler_result.message
 
+        slot = scheduler_result.slot or {}
+        department = triage_result.request_data.get("department")
+        if department is None:
+            return template.render(slot)
+        return template.render(slot, department=department)
+
+    def render_batch(
+        self,
+        intent: str,
+        slots: Iterable[Mapping[str, Any]],
+        channel: Optional[str] = None,
+        locale: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Render one intent's template (e.g. "reminder") for many slots at
+        once, with a single template lookup for the whole batch.
+        """
+        template = self._templates.get(intent, channel or self._channel, locale or self._locale)
+        if template is None:
+            raise KeyError(f"No {intent!r} template for channel {channel or self._channel!r}.")
+        return template.render_many(slots)
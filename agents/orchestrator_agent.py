@@ -3,14 +3,27 @@
 OrchestratorAgent coordinates the overall workflow:
 - Understands high-level intent (book / reschedule / cancel / check)
 - Delegates to sub-agents (triage, scheduler, notification)
-- Manages simple per-user session state (in-memory)
+- Manages per-user session state through a pluggable session store
+
+Each message runs inside a trace (see tools.tracing) with one span per
+stage: triage, scheduler.<intent>, notification.
+
+Sub-agents that aren't passed in are imported and built on first use, so
+constructing an orchestrator is cheap and short-lived workers only load
+what their first messages need (e.g. no scheduler or tools for a message
+triage can't place). Profile with `python -m evaluation.profile_startup`.
 """
 
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any, Optional
+import threading
+
+from agents.session_store import InMemorySessionStore
+from tools.tracing import tracer
 
-from agents.triage_agent import TriageAgent
-from agents.scheduler_agent import SchedulerAgent
-from agents.notification_agent import NotificationAgent
+if TYPE_CHECKING:
+    from agents.triage_agent import TriageAgent
+    from agents.scheduler_agent import SchedulerAgent
+    from agents.notification_agent import NotificationAgent
 
 
 class OrchestratorAgent:
@@ -18,25 +31,79 @@ class OrchestratorAgent:
     High-level coordinator for the CareFlow assistant.
     """
 
-    def __init__(self) -> None:
-        # Simple in-memory session state keyed by user_id
-        self._sessions: Dict[str, Dict[str, Any]] = {}
+    def __init__(
+        self,
+        triage_agent: Optional["TriageAgent"] = None,
+        scheduler_agent: Optional["SchedulerAgent"] = None,
+        notification_agent: Optional["NotificationAgent"] = None,
+        session_store: Optional[Any] = None,
+    ) -> None:
+        # Session state keyed by user_id. In-process LRU/TTL by default; pass
+        # a SQLiteSessionStore to share sessions between worker processes.
+        self._session_store = session_store or InMemorySessionStore()
+
+        # Sub-agents; defaults are built lazily by the properties below
+        self._triage_agent = triage_agent
+        self._scheduler_agent = scheduler_agent
+        self._notification_agent = notification_agent
+        # Guards lazy construction, so concurrent first requests share one
+        # scheduler (and its bookings) instead of each building their own
+        self._build_lock = threading.Lock()
+
+    @property
+    def triage_agent(self) -> "TriageAgent":
+        agent = self._triage_agent
+        if agent is None:
+            with self._build_lock:
+                if self._triage_agent is None:
+                    from agents.triage_agent import TriageAgent
+                    self._triage_agent = TriageAgent()
+                agent = self._triage_agent
+        return agent
 
-        # Sub-agents
-        self._triage_agent = TriageAgent()
-        self._scheduler_agent = SchedulerAgent()
-        self._notification_agent = NotificationAgent()
+    @property
+    def scheduler_agent(self) -> "SchedulerAgent":
+        agent = self._scheduler_agent
+        if agent is None:
+            with self._build_lock:
+                if self._scheduler_agent is None:
+                    from agents.scheduler_agent import SchedulerAgent
+                    self._scheduler_agent = SchedulerAgent()
+                agent = self._scheduler_agent
+        return agent
+
+    @property
+    def notification_agent(self) -> "NotificationAgent":
+        agent = self._notification_agent
+        if agent is None:
+            with self._build_lock:
+                if self._notification_agent is None:
+                    from agents.notification_agent import NotificationAgent
+                    self._notification_agent = NotificationAgent()
+                agent = self._notification_agent
+        return agent
 
     def _get_session(self, user_id: str) -> Dict[str, Any]:
         """
         Retrieve or create a session state for a given user.
         """
-        if user_id not in self._sessions:
-            self._sessions[user_id] = {
+        session = self._session_store.get(user_id)
+        if session is None:
+            session = {
                 "patient_profile": {},   # could hold preferences, history, etc.
                 "last_appointment_id": None,
             }
-        return self._sessions[user_id]
+            self._session_store.put(user_id, session)
+        return session
+
+    def _save_session(self, user_id: str, session: Dict[str, Any]) -> None:
+        """
+        Write the session back, so shared stores see this request's changes.
+        """
+        self._session_store.put(user_id, session)
+
+    def session_metrics(self) -> Dict[str, int]:
+        return self._session_store.metrics()
 
     def handle_user_message(self, user_id: str, message: str) -> str:
         """
@@ -48,33 +115,41 @@ class OrchestratorAgent:
         3. Call scheduler agent to interact with tools
         4. Use notification agent to generate final response message
         """
+        with tracer.trace(), tracer.span("orchestrator.handle_user_message", user_id=user_id):
+            return self._handle_user_message(user_id, message)
+
+    def _handle_user_message(self, user_id: str, message: str) -> str:
         session = self._get_session(user_id)
 
         # 1. Triage: extract intent and structured appointment request
-        triage_result = self._triage_agent.triage(message, session)
+        with tracer.span("triage"):
+            triage_result = self.triage_agent.triage(message, session)
 
         intent = triage_result.intent  # e.g. "book", "reschedule", "cancel"
         request = triage_result.request_data
 
         # 2. Call scheduler logic based on intent
         if intent == "book":
-            scheduler_result = self._scheduler_agent.book_appointment(
-                user_id=user_id,
-                request_data=request,
-                session=session,
-            )
+            with tracer.span("scheduler.book"):
+                scheduler_result = self.scheduler_agent.book_appointment(
+                    user_id=user_id,
+                    request_data=request,
+                    session=session,
+                )
         elif intent == "reschedule":
-            scheduler_result = self._scheduler_agent.reschedule_appointment(
-                user_id=user_id,
-                request_data=request,
-                session=session,
-            )
+            with tracer.span("scheduler.reschedule"):
+                scheduler_result = self.scheduler_agent.reschedule_appointment(
+                    user_id=user_id,
+                    request_data=request,
+                    session=session,
+                )
         elif intent == "cancel":
-            scheduler_result = self._scheduler_agent.cancel_appointment(
-                user_id=user_id,
-                request_data=request,
-                session=session,
-            )
+            with tracer.span("scheduler.cancel"):
+                scheduler_result = self.scheduler_agent.cancel_appointment(
+                    user_id=user_id,
+                    request_data=request,
+                    session=session,
+                )
         else:
             # Fallback when we don't understand intent well
             return "I’m not sure if you want to book, reschedule, or cancel. Could you please clarify?"
@@ -82,12 +157,67 @@ class OrchestratorAgent:
         # Optionally store last appointment id in the session
         if scheduler_result.appointment_id:
             session["last_appointment_id"] = scheduler_result.appointment_id
+            self._save_session(user_id, session)
 
         # 3. Create user-friendly notification/summary
-        response = self._notification_agent.build_user_message(
-            intent=intent,
-            triage_result=triage_result,
-            scheduler_result=scheduler_result,
-        )
+        with tracer.span("notification"):
+            response = self.notification_agent.build_user_message(
+                intent=intent,
+                triage_result=triage_result,
+                scheduler_result=scheduler_result,
+            )
         return response
 
+    async def handle_user_message_async(self, user_id: str, message: str) -> str:
+        """
+        Async counterpart of handle_user_message.
+
+        Sub-agent and tool calls are awaited, so many conversations can be in
+        flight on one event loop while each waits on triage or the backends.
+        """
+        with tracer.trace(), tracer.span("orchestrator.handle_user_message", user_id=user_id):
+            return await self._handle_user_message_async(user_id, message)
+
+    async def _handle_user_message_async(self, user_id: str, message: str) -> str:
+        session = self._get_session(user_id)
+
+        with tracer.span("triage"):
+            triage_result = await self.triage_agent.triage_async(message, session)
+
+        intent = triage_result.intent
+        request = triage_result.request_data
+
+        if intent == "book":
+            with tracer.span("scheduler.book"):
+                scheduler_result = await self.scheduler_agent.book_appointment_async(
+                    user_id=user_id,
+                    request_data=request,
+                    session=session,
+                )
+        elif intent == "reschedule":
+            with tracer.span("scheduler.reschedule"):
+                scheduler_result = await self.scheduler_agent.reschedule_appointment_async(
+                    user_id=user_id,
+                    request_data=request,
+                    session=session,
+                )
+        elif intent == "cancel":
+            with tracer.span("scheduler.cancel"):
+                scheduler_result = await self.scheduler_agent.cancel_appointment_async(
+                    user_id=user_id,
+                    request_data=request,
+                    session=session,
+                )
+        else:
+            return "I’m not sure if you want to book, reschedule, or cancel. Could you please clarify?"
+
+        if scheduler_result.appointment_id:
+            session["last_appointment_id"] = scheduler_result.appointment_id
+            self._save_session(user_id, session)
+
+        with tracer.span("notification"):
+            return self.notification_agent.build_user_message(
+                intent=intent,
+                triage_result=triage_result,
+                scheduler_result=scheduler_result,
+            )
@@ -0,0 +1,170 @@
+# agents/reminder_dispatcher.py
+"""
+ReminderDispatcher:
+- Schedules reminders before each booked appointment (24h and 1h by default)
+  on a hierarchical TimerWheel (see tools/timer_wheel.py): O(1) to add,
+  cancel or move, however many are pending.
+- On advance(), renders everything that fell due with NotificationAgent's
+  batch API and hands it to a pluggable sender in batches.
+
+A sender implements send(notifications: List[Notification]). StubSender
+just records what it was given, for tests and benchmarks.
+
+Reminders whose send time has already passed when an appointment is
+booked (e.g. the 24h reminder for a slot later today) are skipped.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import threading
+
+from agents.notification_agent import NotificationAgent
+from tools.timer_wheel import Timer, TimerWheel
+
+
+DEFAULT_OFFSETS: Sequence[Tuple[str, timedelta]] = (
+    ("24h", timedelta(hours=24)),
+    ("1h", timedelta(hours=1)),
+)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+@dataclass
+class Notification:
+    user_id: str
+    appointment_id: str
+    kind: str       # which reminder, e.g. "24h"
+    channel: str
+    text: str
+
+
+class StubSender:
+    """
+    Records notifications instead of delivering them.
+    """
+
+    def __init__(self) -> None:
+        self.sent: List[Notification] = []
+        self.batches = 0
+
+    def send(self, notifications: List[Notification]) -> None:
+        self.sent.extend(notifications)
+        self.batches += 1
+
+
+def slot_start(slot: Dict[str, Any]) -> datetime:
+    return datetime.fromisoformat(f"{slot['date']}T{slot['time']}")
+
+
+class ReminderDispatcher:
+    def __init__(
+        self,
+        sender: Optional[Any] = None,
+        notification_agent: Optional[NotificationAgent] = None,
+        now: Optional[datetime] = None,
+        offsets: Sequence[Tuple[str, timedelta]] = DEFAULT_OFFSETS,
+        tick_seconds: int = 60,
+        batch_size: int = 1000,
+        channel: str = "sms",
+        locale: str = "en",
+    ) -> None:
+        self._sender = sender or StubSender()
+        self._notification_agent = notification_agent or NotificationAgent()
+        self._tick_seconds = tick_seconds
+        # (kind, ticks before the appointment)
+        self._offsets = [(kind, int(offset.total_seconds()) // tick_seconds) for kind, offset in offsets]
+        self._batch_size = batch_size
+        self._channel = channel
+        self._locale = locale
+
+        self._wheel = TimerWheel(now=self._tick(now or datetime.now()))
+        # appointment_id -> (user_id, slot, pending timers)
+        self._appointments: Dict[str, Tuple[str, Dict[str, Any], List[Timer]]] = {}
+        self._lock = threading.Lock()
+
+    def _tick(self, when: datetime) -> int:
+        return int((when - _EPOCH).total_seconds()) // self._tick_seconds
+
+    def __len__(self) -> int:
+        """
+        Number of reminders still waiting to be sent.
+        """
+        return len(self._wheel)
+
+    def schedule(self, appointment_id: str, user_id: str, slot: Dict[str, Any]) -> int:
+        """
+        Schedule reminders for an appointment, replacing any it already had
+        (so a reschedule is just another call). Returns how many were
+        scheduled.
+        """
+        start = self._tick(slot_start(slot))
+        with self._lock:
+            self._cancel_locked(appointment_id)
+            now = self._wheel.now
+            timers = [
+                self._wheel.schedule(start - ticks, (appointment_id, kind))
+                for kind, ticks in self._offsets
+                if start - ticks > now
+            ]
+            if timers:
+                self._appointments[appointment_id] = (user_id, slot, timers)
+            return len(timers)
+
+    def schedule_all(self, appointments: Iterable[Dict[str, Any]]) -> int:
+        """
+        Schedule reminders for existing appointment records
+        ({"id", "user_id", "slot", ...}), e.g.
+        ClinicSchedulerTool.booked_appointments().
+        """
+        return sum(
+            self.schedule(appointment["id"], appointment["user_id"], appointment["slot"])
+            for appointment in appointments
+        )
+
+    def _cancel_locked(self, appointment_id: str) -> int:
+        entry = self._appointments.pop(appointment_id, None)
+        if entry is None:
+            return 0
+        return sum(self._wheel.cancel(timer) for timer in entry[2])
+
+    def cancel(self, appointment_id: str) -> int:
+        """
+        Drop an appointment's pending reminders. Returns how many there were.
+        """
+        with self._lock:
+            return self._cancel_locked(appointment_id)
+
+    def advance(self, now: Optional[datetime] = None) -> int:
+        """
+        Send every reminder due by `now` (default: the current time), in
+        batches of `batch_size`. Returns how many were sent.
+        """
+        with self._lock:
+            fired = self._wheel.advance(self._tick(now or datetime.now()))
+            due: List[Tuple[str, str, str, Dict[str, Any]]] = []
+            for appointment_id, kind in fired:
+                user_id, slot, _ = self._appointments[appointment_id]
+                due.append((appointment_id, kind, user_id, slot))
+            # Forget appointments with nothing left to send
+            for appointment_id, _ in fired:
+                entry = self._appointments.get(appointment_id)
+                if entry is not None and not any(timer.active for timer in entry[2]):
+                    del self._appointments[appointment_id]
+
+        # Render and deliver outside the lock, so booking threads never wait on the sender
+        sent = 0
+        for i in range(0, len(due), self._batch_size):
+            batch = due[i:i + self._batch_size]
+            texts = self._notification_agent.render_batch(
+                "reminder", [slot for _, _, _, slot in batch], channel=self._channel, locale=self._locale
+            )
+            self._sender.send([
+                Notification(
+                    user_id=user_id, appointment_id=appointment_id, kind=kind, channel=self._channel, text=text
+                )
+                for (appointment_id, kind, user_id, _), text in zip(batch, texts)
+            ])
+            sent += len(batch)
+        return sent
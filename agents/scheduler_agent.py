@@ -3,13 +3,29 @@
 SchedulerAgent:
 - Wraps interaction with scheduler and calendar tools.
 - Decides which slots to offer and returns a simple result object.
+
+Slots are offered best-first according to SlotRanker (earliest date, the
+patient's previous doctors, their usual clinic); calendar conflicts are
+checked only for candidates the ranking actually reaches.
+
+With a reminder dispatcher (see agents/reminder_dispatcher.py), reminders
+are scheduled on booking, moved on reschedule and dropped on cancel.
 """
 
+from collections import defaultdict
 from dataclasses import dataclass
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple
+import weakref
 
+from agents.slot_ranker import SlotPreferences, SlotRanker, remember_booking
 from tools.clinic_scheduler_tool import ClinicSchedulerTool
-from tools.calendar_tool import CalendarTool
+from tools.calendar_tool import CalendarTool, slot_interval
+from tools.interval_index import IntervalIndex
+from tools.lazy_import import lazy_import
+from tools.tracing import traced
+
+# Only the async paths need it; importing it costs sync startup ~50 ms
+asyncio = lazy_import("asyncio")
 
 
 @dataclass
@@ -20,15 +36,107 @@ class SchedulerResult:
     slot: Optional[Dict[str, Any]] = None
 
 
+@dataclass
+class BookingRequest:
+    """
+    A structured booking request, e.g. one row of a referral import.
+    """
+    user_id: str
+    department: str = "General"
+    time_of_day: str = "any"
+
+
 class SchedulerAgent:
     """
     Handles booking, rescheduling, and canceling appointments
     by calling the underlying tools.
     """
 
-    def __init__(self) -> None:
-        self._scheduler_tool = ClinicSchedulerTool()
-        self._calendar_tool = CalendarTool()
+    def __init__(
+        self,
+        scheduler_tool: Optional[ClinicSchedulerTool] = None,
+        calendar_tool: Optional[CalendarTool] = None,
+        ranker: Optional[SlotRanker] = None,
+        reminders: Optional[Any] = None,
+    ) -> None:
+        self._scheduler_tool = scheduler_tool or ClinicSchedulerTool()
+        self._calendar_tool = calendar_tool or CalendarTool()
+        self._ranker = ranker or SlotRanker()
+        self._reminders = reminders
+        # user_id -> asyncio.Lock held by that user's async book/reschedule
+        self._user_locks: "weakref.WeakValueDictionary[str, Any]" = weakref.WeakValueDictionary()
+
+    def _user_lock(self, user_id: str) -> "asyncio.Lock":
+        """
+        The user's async booking lock. Kept only while someone holds or
+        waits on it.
+        """
+        return self._user_locks.setdefault(user_id, asyncio.Lock())
+
+    def _schedule_reminders(self, appointment_id: str, user_id: str, slot: Dict[str, Any]) -> None:
+        if self._reminders is not None:
+            self._reminders.schedule(appointment_id, user_id, slot)
+
+    def _cancel_reminders(self, appointment_id: str) -> None:
+        if self._reminders is not None:
+            self._reminders.cancel(appointment_id)
+
+    def _ranked_slots(
+        self,
+        department: str,
+        time_of_day: str,
+        profile: Dict[str, Any],
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Free slots for department/time_of_day, best first for this patient.
+        """
+        return self._ranker.ranked(
+            self._scheduler_tool.find_available_slots_by_date(department=department, time_of_day=time_of_day),
+            SlotPreferences.from_profile(profile),
+        )
+
+    async def _ranked_slots_and_busy(
+        self,
+        user_id: str,
+        department: str,
+        time_of_day: str,
+        profile: Dict[str, Any],
+    ) -> Tuple[Iterator[Dict[str, Any]], IntervalIndex]:
+        """
+        Async lookup of the ranked free slots and a snapshot of the user's
+        calendar. The two are independent, so they are fetched at once.
+        """
+        by_date, busy = await asyncio.gather(
+            self._scheduler_tool.find_available_slots_by_date_async(department=department, time_of_day=time_of_day),
+            self._calendar_tool.busy_intervals_async(user_id=user_id),
+        )
+        return self._ranker.ranked(by_date, SlotPreferences.from_profile(profile)), busy
+
+    @staticmethod
+    def _conflicts(busy: IntervalIndex, slot: Dict[str, Any]) -> bool:
+        return bool(busy) and busy.overlaps(*slot_interval(slot))
+
+    def _busy_except(self, busy: IntervalIndex, appointment_id: str) -> IntervalIndex:
+        """
+        Drop the appointment being rescheduled from a busy snapshot: its
+        current time is about to be freed, so it must not block candidates.
+        """
+        slot = self._calendar_tool.get_appointment(appointment_id)
+        if slot is not None:
+            busy.remove(*slot_interval(slot), appointment_id)
+        return busy
+
+    @staticmethod
+    def _no_bookable_slot(lost_race: bool) -> SchedulerResult:
+        if lost_race:
+            return SchedulerResult(
+                success=False,
+                message="The matching slots were just taken by other patients. Please try again.",
+            )
+        return SchedulerResult(
+            success=False,
+            message="Found slots, but they all conflict with your existing schedule.",
+        )
 
     def book_appointment(
         self,
@@ -38,34 +146,132 @@ class SchedulerAgent:
     ) -> SchedulerResult:
         department = request_data.get("department", "General")
         time_of_day = request_data.get("time_of_day", "any")
+        profile = session.setdefault("patient_profile", {})
+
+        # 1. Walk free slots for department/time, best ranked first
+        found = False
+        lost_race = False
+        for slot in self._ranked_slots(department, time_of_day, profile):
+            found = True
 
-        # 1. Find doctor slots based on department/time
-        slots = self._scheduler_tool.find_available_slots(department=department, time_of_day=time_of_day)
+            # 2. Skip slots that conflict with the user's calendar
+            if self._calendar_tool.has_conflict(user_id=user_id, slot=slot):
+                continue
 
-        if not slots:
+            # 3. Book it. Another request may have taken the slot since the
+            # lookup; in that case move on to the next candidate.
+            appointment_id = self._scheduler_tool.book_slot(user_id=user_id, slot=slot)
+            if appointment_id is None:
+                lost_race = True
+                continue
+
+            self._calendar_tool.add_appointment(
+                user_id=user_id, appointment_slot=slot, appointment_id=appointment_id
+            )
+            remember_booking(profile, slot)
+            self._schedule_reminders(appointment_id, user_id, slot)
+            return SchedulerResult(
+                success=True,
+                message="Appointment booked successfully.",
+                appointment_id=appointment_id,
+                slot=slot,
+            )
+
+        if not found:
             return SchedulerResult(
                 success=False,
                 message=f"No available slots found for {department} in the {time_of_day}.",
             )
+        return self._no_bookable_slot(lost_race)
 
-        # 2. Pick the first slot that does not conflict with user's calendar
-        for slot in slots:
-            if not self._calendar_tool.has_conflict(user_id=user_id, slot=slot):
-                # 3. Book it
-                appointment_id = self._scheduler_tool.book_slot(user_id=user_id, slot=slot)
-                self._calendar_tool.add_appointment(user_id=user_id, appointment_slot=slot)
+    @traced("scheduler.book_many")
+    def book_many(self, requests: Sequence[BookingRequest]) -> List[SchedulerResult]:
+        """
+        Book many structured requests at once.
 
-                return SchedulerResult(
-                    success=True,
-                    message="Appointment booked successfully.",
-                    appointment_id=appointment_id,
-                    slot=slot,
-                )
+        Requests are grouped by (department, time_of_day) and each group walks
+        one date-ordered slot lookup, reading a further date only once the
+        ones read so far are used up, so a generated (recurring) inventory is
+        never expanded past the dates the batch needs. Slots are handed out
+        in one pass, earliest first, skipping slots that conflict with a
+        patient's calendar or were taken concurrently. Results are returned
+        in request order.
+        """
+        results: List[Optional[SchedulerResult]] = [None] * len(requests)
 
-        return SchedulerResult(
-            success=False,
-            message="Found slots, but they all conflict with your existing schedule.",
-        )
+        groups: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        for i, request in enumerate(requests):
+            groups[(request.department, request.time_of_day)].append(i)
+
+        for (department, time_of_day), indices in groups.items():
+            dates = self._scheduler_tool.find_available_slots_by_date(department=department, time_of_day=time_of_day)
+            slots: List[Dict[str, Any]] = []
+            taken = bytearray()
+            cursor = 0  # everything before this position is taken
+
+            def read_date() -> bool:
+                for _, day_slots in dates:
+                    slots.extend(day_slots)
+                    taken.extend(bytes(len(day_slots)))
+                    return True
+                return False
+
+            def first_untaken(user_id: str, start: int) -> Optional[int]:
+                # First slot from `start` on that is not taken and fits the
+                # user's calendar, reading more dates until one turns up
+                while True:
+                    position = self._calendar_tool.first_free_index(user_id=user_id, slots=slots, start=start)
+                    while position is not None and taken[position]:
+                        position = self._calendar_tool.first_free_index(
+                            user_id=user_id, slots=slots, start=position + 1
+                        )
+                    if position is not None:
+                        return position
+                    start = max(start, len(slots))
+                    if not read_date():
+                        return None
+
+            for i in indices:
+                user_id = requests[i].user_id
+                while True:
+                    while cursor < len(slots) and taken[cursor]:
+                        cursor += 1
+                    if cursor < len(slots) or not read_date():
+                        break
+
+                if cursor == len(slots):
+                    results[i] = SchedulerResult(
+                        success=False,
+                        message=f"No available slots found for {department} in the {time_of_day}.",
+                    )
+                    continue
+
+                lost_race = False
+                position = first_untaken(user_id, cursor)
+                while position is not None:
+                    slot = slots[position]
+                    taken[position] = 1
+                    appointment_id = self._scheduler_tool.book_slot(user_id=user_id, slot=slot)
+                    if appointment_id is not None:
+                        self._calendar_tool.add_appointment(
+                            user_id=user_id, appointment_slot=slot, appointment_id=appointment_id
+                        )
+                        self._schedule_reminders(appointment_id, user_id, slot)
+                        results[i] = SchedulerResult(
+                            success=True,
+                            message="Appointment booked successfully.",
+                            appointment_id=appointment_id,
+                            slot=slot,
+                        )
+                        break
+
+                    lost_race = True
+                    position = first_untaken(user_id, position + 1)
+
+                if results[i] is None:
+                    results[i] = self._no_bookable_slot(lost_race)
+
+        return results  # type: ignore[return-value]
 
     def reschedule_appointment(
         self,
@@ -80,25 +286,44 @@ class SchedulerAgent:
                 message="I couldn't find a previous appointment to reschedule.",
             )
 
-        department = request_data.get("department", "General")
-        time_of_day = request_data.get("time_of_day", "any")
-
-        slots = self._scheduler_tool.find_available_slots(department=department, time_of_day=time_of_day)
-        if not slots:
+        if self._scheduler_tool.get_appointment(last_appointment_id) is None:
             return SchedulerResult(
                 success=False,
-                message=f"No alternative slots available for {department} in the {time_of_day}.",
+                message="Unable to reschedule the appointment due to an internal error.",
             )
 
-        new_slot = slots[0]  # naive choice for demo
-        success = self._scheduler_tool.reschedule_appointment(last_appointment_id, new_slot)
-        if not success:
+        department = request_data.get("department", "General")
+        time_of_day = request_data.get("time_of_day", "any")
+        profile = session.setdefault("patient_profile", {})
+        # The rest of the user's calendar; the appointment being moved doesn't count
+        busy = self._busy_except(self._calendar_tool.busy_intervals(user_id=user_id), last_appointment_id)
+
+        # Best-ranked slot that fits the calendar and that we manage to claim
+        found = False
+        lost_race = False
+        new_slot = None
+        for candidate in self._ranked_slots(department, time_of_day, profile):
+            found = True
+            if self._conflicts(busy, candidate):
+                continue
+            if self._scheduler_tool.reschedule_appointment(last_appointment_id, candidate):
+                new_slot = candidate
+                break
+            lost_race = True
+
+        if not found:
             return SchedulerResult(
                 success=False,
-                message="Unable to reschedule the appointment due to an internal error.",
+                message=f"No alternative slots available for {department} in the {time_of_day}.",
             )
+        if new_slot is None:
+            return self._no_bookable_slot(lost_race)
 
-        self._calendar_tool.update_appointment(user_id=user_id, appointment_slot=new_slot)
+        self._calendar_tool.update_appointment(
+            user_id=user_id, appointment_id=last_appointment_id, appointment_slot=new_slot
+        )
+        remember_booking(profile, new_slot)
+        self._schedule_reminders(last_appointment_id, user_id, new_slot)
 
         return SchedulerResult(
             success=True,
@@ -128,6 +353,7 @@ class SchedulerAgent:
             )
 
         self._calendar_tool.remove_appointment(user_id=user_id, appointment_id=last_appointment_id)
+        self._cancel_reminders(last_appointment_id)
 
         return SchedulerResult(
             success=True,
@@ -135,3 +361,145 @@ class SchedulerAgent:
             appointment_id=last_appointment_id,
         )
 
+    # ------------------------------------------------------------------
+    # Async variants
+    # ------------------------------------------------------------------
+
+    async def book_appointment_async(
+        self,
+        user_id: str,
+        request_data: Dict[str, Any],
+        session: Dict[str, Any],
+    ) -> SchedulerResult:
+        department = request_data.get("department", "General")
+        time_of_day = request_data.get("time_of_day", "any")
+        profile = session.setdefault("patient_profile", {})
+
+        # The user's calendar is read, checked and updated under their lock,
+        # so two of their conversations can't both book overlapping slots
+        async with self._user_lock(user_id):
+            # 1. Slot lookup and a snapshot of the user's calendar, fetched together
+            ranked, busy = await self._ranked_slots_and_busy(user_id, department, time_of_day, profile)
+
+            # 2. Walk free slots best ranked first, skipping calendar conflicts
+            found = False
+            lost_race = False
+            for slot in ranked:
+                found = True
+                if self._conflicts(busy, slot):
+                    continue
+
+                # 3. Book it, moving on if another conversation got there first
+                appointment_id = await self._scheduler_tool.book_slot_async(user_id=user_id, slot=slot)
+                if appointment_id is None:
+                    lost_race = True
+                    continue
+
+                await self._calendar_tool.add_appointment_async(
+                    user_id=user_id, appointment_slot=slot, appointment_id=appointment_id
+                )
+                remember_booking(profile, slot)
+                self._schedule_reminders(appointment_id, user_id, slot)
+                return SchedulerResult(
+                    success=True,
+                    message="Appointment booked successfully.",
+                    appointment_id=appointment_id,
+                    slot=slot,
+                )
+
+            if not found:
+                return SchedulerResult(
+                    success=False,
+                    message=f"No available slots found for {department} in the {time_of_day}.",
+                )
+            return self._no_bookable_slot(lost_race)
+
+    async def reschedule_appointment_async(
+        self,
+        user_id: str,
+        request_data: Dict[str, Any],
+        session: Dict[str, Any],
+    ) -> SchedulerResult:
+        last_appointment_id = session.get("last_appointment_id")
+        if not last_appointment_id:
+            return SchedulerResult(
+                success=False,
+                message="I couldn't find a previous appointment to reschedule.",
+            )
+
+        department = request_data.get("department", "General")
+        time_of_day = request_data.get("time_of_day", "any")
+
+        if self._scheduler_tool.get_appointment(last_appointment_id) is None:
+            return SchedulerResult(
+                success=False,
+                message="Unable to reschedule the appointment due to an internal error.",
+            )
+
+        profile = session.setdefault("patient_profile", {})
+        # Same per-user lock as booking: the calendar check holds until the move
+        async with self._user_lock(user_id):
+            ranked, busy = await self._ranked_slots_and_busy(user_id, department, time_of_day, profile)
+            busy = self._busy_except(busy, last_appointment_id)
+
+            found = False
+            lost_race = False
+            new_slot = None
+            for candidate in ranked:
+                found = True
+                if self._conflicts(busy, candidate):
+                    continue
+                if await self._scheduler_tool.reschedule_appointment_async(last_appointment_id, candidate):
+                    new_slot = candidate
+                    break
+                lost_race = True
+
+            if not found:
+                return SchedulerResult(
+                    success=False,
+                    message=f"No alternative slots available for {department} in the {time_of_day}.",
+                )
+            if new_slot is None:
+                return self._no_bookable_slot(lost_race)
+
+            await self._calendar_tool.update_appointment_async(
+                user_id=user_id, appointment_id=last_appointment_id, appointment_slot=new_slot
+            )
+            remember_booking(profile, new_slot)
+            self._schedule_reminders(last_appointment_id, user_id, new_slot)
+
+            return SchedulerResult(
+                success=True,
+                message="Appointment rescheduled successfully.",
+                appointment_id=last_appointment_id,
+                slot=new_slot,
+            )
+
+    async def cancel_appointment_async(
+        self,
+        user_id: str,
+        request_data: Dict[str, Any],
+        session: Dict[str, Any],
+    ) -> SchedulerResult:
+        last_appointment_id = session.get("last_appointment_id")
+        if not last_appointment_id:
+            return SchedulerResult(
+                success=False,
+                message="I couldn't find a previous appointment to cancel.",
+            )
+
+        success = await self._scheduler_tool.cancel_appointment_async(last_appointment_id)
+        if not success:
+            return SchedulerResult(
+                success=False,
+                message="Unable to cancel the appointment due to an internal error.",
+            )
+
+        await self._calendar_tool.remove_appointment_async(user_id=user_id, appointment_id=last_appointment_id)
+        self._cancel_reminders(last_appointment_id)
+
+        return SchedulerResult(
+            success=True,
+            message="Your appointment has been canceled.",
+            appointment_id=last_appointment_id,
+        )
@@ -0,0 +1,185 @@
+"""
+Session stores for OrchestratorAgent.
+
+- InMemorySessionStore: per-process LRU with a TTL, bounded by
+  `max_sessions`. Idle users are evicted instead of kept forever.
+- SQLiteSessionStore: sessions serialized as JSON in a shared SQLite file,
+  so requests for the same user can be served by any worker process.
+
+Both implement get(user_id) / put(user_id, session) / delete(user_id) /
+expire_idle() / metrics(). A get refreshes the session's last-used time,
+and every `expire_every` puts drop sessions idle for longer than the TTL.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import sys
+import threading
+import time
+
+from tools.lazy_import import lazy_import
+
+# Only SQLiteSessionStore needs these
+json = lazy_import("json")
+sqlite3 = lazy_import("sqlite3")
+
+
+def _deep_sizeof(obj: Any) -> int:
+    """
+    Rough recursive size of JSON-like data (dicts, lists, scalars).
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k) + _deep_sizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_deep_sizeof(item) for item in obj)
+    return size
+
+
+class InMemorySessionStore:
+    def __init__(
+        self, max_sessions: int = 100_000, ttl_seconds: float = 3600.0, expire_every: int = 1024
+    ) -> None:
+        self._max_sessions = max_sessions
+        self._ttl_seconds = ttl_seconds
+        self._expire_every = expire_every
+        self._puts = 0
+        # user_id -> (last_used, session), least recently used first
+        self._sessions: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._sessions.get(user_id)
+            if entry is None:
+                return None
+            last_used, session = entry
+            now = time.monotonic()
+            if now - last_used > self._ttl_seconds:
+                del self._sessions[user_id]
+                self.expirations += 1
+                return None
+            self._sessions[user_id] = (now, session)
+            self._sessions.move_to_end(user_id)
+            return session
+
+    def put(self, user_id: str, session: Dict[str, Any]) -> None:
+        with self._lock:
+            self._sessions[user_id] = (time.monotonic(), session)
+            self._sessions.move_to_end(user_id)
+            while len(self._sessions) > self._max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+            self._puts += 1
+            if self._puts % self._expire_every == 0:
+                self._expire_idle_locked()
+
+    def delete(self, user_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(user_id, None)
+
+    def expire_idle(self) -> int:
+        """
+        Drop sessions idle for longer than the TTL. Returns how many were dropped.
+        """
+        with self._lock:
+            return self._expire_idle_locked()
+
+    def _expire_idle_locked(self) -> int:
+        cutoff = time.monotonic() - self._ttl_seconds
+        dropped = 0
+        # Oldest first, so stop at the first session that is still fresh
+        while self._sessions:
+            user_id, (last_used, _) = next(iter(self._sessions.items()))
+            if last_used >= cutoff:
+                break
+            del self._sessions[user_id]
+            dropped += 1
+        self.expirations += dropped
+        return dropped
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        Session count, approximate memory use, and eviction counters.
+        Memory is measured by walking every session, so call it sparingly.
+        """
+        with self._lock:
+            sessions = [session for _, session in self._sessions.values()]
+            evictions, expirations = self.evictions, self.expirations
+        return {
+            "sessions": len(sessions),
+            "approx_bytes": sum(_deep_sizeof(session) for session in sessions),
+            "evictions": evictions,
+            "expirations": expirations,
+        }
+
+
+class SQLiteSessionStore:
+    """
+    Shared session store. Every worker opening the same file sees the same
+    sessions; expiry uses wall-clock time so it agrees across processes.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 3600.0, expire_every: int = 1024) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._expire_every = expire_every
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " user_id TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used)")
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, last_used FROM sessions WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            if row is None or now - row[1] > self._ttl_seconds:
+                return None
+            self._conn.execute("UPDATE sessions SET last_used = ? WHERE user_id = ?", (now, user_id))
+        return json.loads(row[0])
+
+    def put(self, user_id: str, session: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (user_id, data, last_used) VALUES (?, ?, ?)",
+                (user_id, json.dumps(session), time.time()),
+            )
+            self._puts += 1
+            if self._puts % self._expire_every == 0:
+                self._expire_idle_locked()
+
+    def delete(self, user_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+
+    def expire_idle(self) -> int:
+        with self._lock:
+            return self._expire_idle_locked()
+
+    def _expire_idle_locked(self) -> int:
+        return self._conn.execute(
+            "DELETE FROM sessions WHERE last_used < ?", (time.time() - self._ttl_seconds,)
+        ).rowcount
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM sessions"
+            ).fetchone()
+        return {"sessions": count, "approx_bytes": size}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
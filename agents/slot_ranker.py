@@ -0,0 +1,153 @@
+# agents/slot_ranker.py
+"""
+SlotRanker:
+Orders candidate slots by score instead of taking the first free one.
+
+Score (lower is better), measured in days:
+    days after the earliest candidate date + time of day as a fraction of a day
+    - continuity_bonus_days if the patient has seen this doctor before
+    - location_bonus_days if the slot is at the patient's preferred location
+
+Candidates arrive grouped by date, earliest first (see
+ClinicSchedulerTool.find_available_slots_by_date). Because the bonuses are
+bounded, a date more than (continuity + location bonus) days after the
+current best candidate can't beat it, so ranked() stops reading dates there.
+Dates enter the heap as single entries keyed by the best score they could
+contain and are only split and scored once they reach the top. Taking the
+top few slots therefore touches a handful of dates however large the
+candidate set is, and callers run conflict checks only on what they consume.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+import heapq
+import itertools
+
+from tools.slot_table import date_to_ordinal, time_to_minutes
+
+
+MAX_REMEMBERED_DOCTORS = 5
+
+_MINUTES_PER_DAY = 24 * 60
+
+# Kinds of heap entry in SlotRanker.ranked()
+_SLOTS = 0      # slots sharing one exact score
+_DATE = 1       # one date's slots, not yet scored
+
+
+@dataclass
+class SlotPreferences:
+    doctor_ids: FrozenSet[str] = frozenset()
+    location: Optional[str] = None
+
+    @classmethod
+    def from_profile(cls, profile: Dict[str, Any]) -> "SlotPreferences":
+        """
+        Build preferences from a session's patient_profile. An explicit
+        preferred_location wins over the location of the last visit.
+        """
+        return cls(
+            doctor_ids=frozenset(profile.get("doctor_ids", ())),
+            location=profile.get("preferred_location") or profile.get("last_location"),
+        )
+
+
+def remember_booking(profile: Dict[str, Any], slot: Dict[str, Any]) -> None:
+    """
+    Record a booked slot's doctor and location in the patient profile, so
+    later bookings favour the same doctor and clinic.
+    """
+    doctors = [d for d in profile.get("doctor_ids", []) if d != slot["doctor_id"]]
+    doctors.insert(0, slot["doctor_id"])
+    profile["doctor_ids"] = doctors[:MAX_REMEMBERED_DOCTORS]
+    profile["last_location"] = slot.get("location")
+
+
+class SlotRanker:
+    def __init__(self, continuity_bonus_days: float = 3.0, location_bonus_days: float = 1.0) -> None:
+        self.continuity_bonus_days = continuity_bonus_days
+        self.location_bonus_days = location_bonus_days
+        # "HH:MM" -> fraction of a day; only a few dozen distinct times exist
+        self._day_fractions: Dict[str, float] = {}
+
+    def _day_fraction(self, time: str) -> float:
+        fraction = self._day_fractions.get(time)
+        if fraction is None:
+            fraction = self._day_fractions[time] = time_to_minutes(time) / _MINUTES_PER_DAY
+        return fraction
+
+    def score(self, slot: Dict[str, Any], day_offset: int, preferences: SlotPreferences) -> float:
+        score = day_offset + self._day_fraction(slot["time"])
+        if slot["doctor_id"] in preferences.doctor_ids:
+            score -= self.continuity_bonus_days
+        if preferences.location is not None and slot.get("location") == preferences.location:
+            score -= self.location_bonus_days
+        return score
+
+    def ranked(
+        self,
+        slots_by_date: Iterable[Tuple[str, List[Dict[str, Any]]]],
+        preferences: SlotPreferences,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield slots from best to worst score. Ties go to the earlier
+        date, then to candidate order.
+        """
+        doctors = preferences.doctor_ids
+        location = preferences.location
+        horizon = (self.continuity_bonus_days if doctors else 0.0) + (
+            self.location_bonus_days if location is not None else 0.0
+        )
+
+        # Heap entries are (key, offset, seq, kind, payload); equal keys go
+        # to the earlier date. _SLOTS entries hold a
+        # group of equally scored slots; _DATE entries hold a whole date keyed
+        # by the best score it could contain, and are split when they reach
+        # the top of the heap.
+        heap: List[Tuple[float, int, int, int, Any]] = []
+        seq = itertools.count()
+        groups = iter(slots_by_date)
+        pending = next(groups, None)
+        first_ordinal: Optional[int] = None
+
+        while True:
+            # Read every date that could still hold a better slot than the heap's best
+            while pending is not None:
+                day, slots = pending
+                ordinal = date_to_ordinal(day)
+                if first_ordinal is None:
+                    first_ordinal = ordinal
+                offset = ordinal - first_ordinal
+                if heap and offset - horizon >= heap[0][0]:
+                    break
+                heapq.heappush(heap, (offset - horizon, offset, next(seq), _DATE, slots))
+                pending = next(groups, None)
+
+            if not heap:
+                return
+            _, offset, _, kind, slots = heapq.heappop(heap)
+
+            if kind == _SLOTS:
+                yield from slots
+                continue
+
+            # Slots on one date with the same time and the same bonuses score
+            # the same, so they go back on the heap as one entry per group
+            groups_by_score: Dict[Tuple[str, bool, bool], List[Dict[str, Any]]] = {}
+            for slot in slots:
+                group = (slot["time"], slot["doctor_id"] in doctors, slot.get("location") == location)
+                same = groups_by_score.get(group)
+                if same is None:
+                    groups_by_score[group] = [slot]
+                else:
+                    same.append(slot)
+            for same in groups_by_score.values():
+                heapq.heappush(heap, (self.score(same[0], offset, preferences), offset, next(seq), _SLOTS, same))
+
+    def top_k(
+        self,
+        slots_by_date: Iterable[Tuple[str, List[Dict[str, Any]]]],
+        k: int,
+        preferences: SlotPreferences,
+    ) -> List[Dict[str, Any]]:
+        return list(itertools.islice(self.ranked(slots_by_date, preferences), k))
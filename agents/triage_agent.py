@@ -7,7 +7,9 @@ This is a simple placeholder, not a real NLP/LLM model.
 """
 
 from dataclasses import dataclass
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from agents.keyword_matcher import DEFAULT_MATCHER, KeywordMatcher, KeywordTable
 
 
 @dataclass
@@ -22,44 +24,29 @@ class TriageAgent:
     Replace with an LLM call in a real system.
     """
 
-    def triage(self, message: str, session: Dict[str, Any]) -> TriageResult:
-        lower_msg = message.lower()
-
-        # 1. Detect intent
-        if any(word in lower_msg for word in ["book", "appointment", "schedule", "see a doctor"]):
-            intent = "book"
-        elif "reschedule" in lower_msg or "change" in lower_msg:
-            intent = "reschedule"
-        elif "cancel" in lower_msg:
-            intent = "cancel"
+    def __init__(self, keyword_table: Optional[KeywordTable] = None) -> None:
+        # The default table is compiled once at import; custom tables are
+        # compiled here, once per agent.
+        if keyword_table is None:
+            self._matcher = DEFAULT_MATCHER
         else:
-            intent = "unknown"
+            self._matcher = KeywordMatcher(keyword_table)
 
-        # 2. Crude specialty detection
-        if "cardio" in lower_msg or "heart" in lower_msg:
-            department = "Cardiology"
-        elif "skin" in lower_msg or "derma" in lower_msg:
-            department = "Dermatology"
-        elif "ent" in lower_msg or "ear" in lower_msg or "nose" in lower_msg or "throat" in lower_msg:
-            department = "ENT"
-        else:
-            department = "General"
-
-        # 3. Very basic time preference detection
-        if "morning" in lower_msg:
-            time_of_day = "morning"
-        elif "afternoon" in lower_msg:
-            time_of_day = "afternoon"
-        elif "evening" in lower_msg or "after 5" in lower_msg:
-            time_of_day = "evening"
-        else:
-            time_of_day = "any"
+    def triage(self, message: str, session: Dict[str, Any]) -> TriageResult:
+        # One pass extracts intent, specialty and time preference
+        fields = self._matcher.match(message)
 
         request_data = {
-            "department": department,
-            "time_of_day": time_of_day,
+            "department": fields.get("department", "General"),
+            "time_of_day": fields.get("time_of_day", "any"),
             # In a real system you'd parse date ranges, urgency, etc.
         }
 
-        return TriageResult(intent=intent, request_data=request_data)
+        return TriageResult(intent=fields.get("intent", "unknown"), request_data=request_data)
 
+    async def triage_async(self, message: str, session: Dict[str, Any]) -> TriageResult:
+        """
+        Async entry point. Keyword triage is pure CPU, so this just delegates;
+        an LLM-backed triage would await the model call here.
+        """
+        return self.triage(message, session)
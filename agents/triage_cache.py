@@ -0,0 +1,212 @@
+"""
+CachedTriageAgent:
+- Memoizes TriageAgent.triage on the normalized message text.
+- Bounded LRU with a TTL, plus hit/miss/eviction counters.
+- Optional shared backend (SQLite file) so several worker processes can
+  reuse each other's triage results.
+
+Only message-derived data is cached. Fields listed in `session_fields` are
+dropped before a result is stored, and every hit returns fresh copies, so
+nothing from one user's session can be served to another.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+import re
+import threading
+import time
+
+from agents.triage_agent import TriageAgent, TriageResult
+from tools.lazy_import import lazy_import
+
+# Only SQLiteTriageCacheBackend needs these
+json = lazy_import("json")
+sqlite3 = lazy_import("sqlite3")
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+# (intent, request_data) as stored in the cache
+CachedTriage = Tuple[str, Dict[str, Any]]
+
+
+def normalize_message(message: str) -> str:
+    """
+    Cache key for a message: lowercased, whitespace collapsed, and trailing
+    punctuation removed, so trivially different phrasings share an entry.
+    """
+    return _WHITESPACE.sub(" ", message.lower()).strip(" .!?,;:")
+
+
+class SQLiteTriageCacheBackend:
+    """
+    Shared triage cache stored in a SQLite file. Every process that opens the
+    same path sees the same entries. Expiry uses wall-clock time so it means
+    the same thing in every process. Every `purge_every` writes, rows that
+    have expired are deleted, so the table stays about as large as the
+    entries written within one TTL.
+    """
+
+    def __init__(self, path: str, purge_every: int = 256) -> None:
+        self._purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS triage_cache ("
+            " key TEXT PRIMARY KEY,"
+            " intent TEXT NOT NULL,"
+            " request_data TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS triage_cache_expires ON triage_cache (expires_at)")
+
+    def get(self, key: str) -> Optional[CachedTriage]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT intent, request_data, expires_at FROM triage_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None or row[2] <= time.time():
+            return None
+        return row[0], json.loads(row[1])
+
+    def set(self, key: str, value: CachedTriage, ttl_seconds: float) -> None:
+        intent, request_data = value
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO triage_cache (key, intent, request_data, expires_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, intent, json.dumps(request_data), time.time() + ttl_seconds),
+            )
+            self._writes += 1
+            if self._writes % self._purge_every == 0:
+                self._purge_locked()
+
+    def _purge_locked(self) -> int:
+        return self._conn.execute("DELETE FROM triage_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def purge_expired(self) -> int:
+        """
+        Delete expired rows now. Returns how many were removed.
+        """
+        with self._lock:
+            return self._purge_locked()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM triage_cache").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedTriageAgent:
+    """
+    Drop-in replacement for TriageAgent that caches results.
+    """
+
+    def __init__(
+        self,
+        triage_agent: Optional[TriageAgent] = None,
+        max_entries: int = 10_000,
+        ttl_seconds: float = 300.0,
+        backend: Optional[SQLiteTriageCacheBackend] = None,
+        session_fields: Iterable[str] = (),
+    ) -> None:
+        self._triage_agent = triage_agent or TriageAgent()
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._backend = backend
+        self._session_fields = frozenset(session_fields)
+
+        # key -> (expires_at, intent, request_data), least recently used first
+        self._entries: "OrderedDict[str, Tuple[float, str, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _lookup_local(self, key: str) -> Optional[CachedTriage]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, intent, request_data = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return intent, request_data
+
+    def _store_local(self, key: str, intent: str, request_data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl_seconds, intent, request_data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _cached(self, key: str) -> Optional[TriageResult]:
+        cached = self._lookup_local(key)
+        if cached is None and self._backend is not None:
+            cached = self._backend.get(key)
+            if cached is not None:
+                with self._lock:
+                    self.shared_hits += 1
+                self._store_local(key, *cached)
+
+        if cached is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        intent, request_data = cached
+        return TriageResult(intent=intent, request_data=dict(request_data))
+
+    def _remember(self, key: str, result: TriageResult) -> None:
+        request_data = {
+            k: v for k, v in result.request_data.items() if k not in self._session_fields
+        }
+        self._store_local(key, result.intent, request_data)
+        if self._backend is not None:
+            self._backend.set(key, (result.intent, request_data), self._ttl_seconds)
+
+    def triage(self, message: str, session: Dict[str, Any]) -> TriageResult:
+        key = normalize_message(message)
+        result = self._cached(key)
+        if result is None:
+            result = self._triage_agent.triage(message, session)
+            self._remember(key, result)
+        return result
+
+    async def triage_async(self, message: str, session: Dict[str, Any]) -> TriageResult:
+        key = normalize_message(message)
+        result = self._cached(key)
+        if result is None:
+            result = await self._triage_agent.triage_async(message, session)
+            self._remember(key, result)
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
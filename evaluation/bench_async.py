@@ -0,0 +1,115 @@
+"""
+Load benchmark: sync handle_user_message vs handle_user_message_async.
+
+Tools are wrapped with a simulated backend latency so the comparison shows
+what happens once triage and scheduling talk to real services.
+
+Run with:
+    python -m evaluation.bench_async [conversations] [latency_ms]
+"""
+
+import asyncio
+import sys
+import time
+
+from agents.orchestrator_agent import OrchestratorAgent
+from agents.scheduler_agent import SchedulerAgent
+from evaluation.synthetic import generate_slots
+from tools.calendar_tool import CalendarTool
+from tools.clinic_scheduler_tool import ClinicSchedulerTool
+from tools.slot_index import SlotIndex
+
+
+class SlowSchedulerTool(ClinicSchedulerTool):
+    """
+    Slot lookups pay `latency` once per call, as a remote scheduling API
+    would. These are the lookups SchedulerAgent uses (see _ranked_slots).
+    """
+
+    def __init__(self, latency: float, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.latency = latency
+
+    def find_available_slots_by_date(self, department, time_of_day):
+        time.sleep(self.latency)
+        return super().find_available_slots_by_date(department, time_of_day)
+
+    async def find_available_slots_by_date_async(self, department, time_of_day):
+        await asyncio.sleep(self.latency)
+        return super().find_available_slots_by_date(department, time_of_day)
+
+
+class SlowCalendarTool(CalendarTool):
+    """
+    Calendar reads pay `latency`: the sync booking path checks candidates
+    with has_conflict (usually one call for a new patient), the async path
+    fetches one busy snapshot.
+    """
+
+    def __init__(self, latency: float) -> None:
+        super().__init__()
+        self.latency = latency
+
+    def has_conflict(self, user_id, slot):
+        time.sleep(self.latency)
+        return super().has_conflict(user_id, slot)
+
+    async def busy_intervals_async(self, user_id):
+        await asyncio.sleep(self.latency)
+        return super().busy_intervals(user_id)
+
+
+MESSAGES = [
+    "I need a cardiology appointment in the evening",
+    "Book a skin check in the morning",
+    "Can I book a general checkup in the afternoon",
+]
+
+
+def build_orchestrator(latency: float) -> OrchestratorAgent:
+    scheduler_tool = SlowSchedulerTool(latency, slot_store=SlotIndex(generate_slots(50_000)))
+    calendar_tool = SlowCalendarTool(latency)
+    return OrchestratorAgent(
+        scheduler_agent=SchedulerAgent(scheduler_tool=scheduler_tool, calendar_tool=calendar_tool),
+    )
+
+
+def run_sync(conversations: int, latency: float) -> float:
+    orchestrator = build_orchestrator(latency)
+    start = time.perf_counter()
+    for i in range(conversations):
+        orchestrator.handle_user_message(f"user-{i}", MESSAGES[i % len(MESSAGES)])
+    return time.perf_counter() - start
+
+
+def run_async(conversations: int, latency: float) -> float:
+    orchestrator = build_orchestrator(latency)
+
+    async def drive() -> None:
+        await asyncio.gather(*(
+            orchestrator.handle_user_message_async(f"user-{i}", MESSAGES[i % len(MESSAGES)])
+            for i in range(conversations)
+        ))
+
+    start = time.perf_counter()
+    asyncio.run(drive())
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    conversations = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 2.0) / 1000
+
+    sync_count = min(conversations, 200)
+    sync_elapsed = run_sync(sync_count, latency)
+    async_elapsed = run_async(conversations, latency)
+
+    print(f"Simulated backend latency: {latency * 1000:.1f} ms per tool call")
+    print(f"sync : {sync_count:>6} conversations in {sync_elapsed:6.2f}s "
+          f"-> {sync_count / sync_elapsed:8.1f} conv/s")
+    print(f"async: {conversations:>6} conversations in {async_elapsed:6.2f}s "
+          f"-> {conversations / async_elapsed:8.1f} conv/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Bulk intake benchmark: N chat messages through OrchestratorAgent vs one
+SchedulerAgent.book_many call.
+
+Run with:
+    python -m evaluation.bench_batch_booking [requests] [slot_count]
+"""
+
+import sys
+import time
+
+from agents.orchestrator_agent import OrchestratorAgent
+from agents.scheduler_agent import BookingRequest, SchedulerAgent
+from evaluation.synthetic import generate_slots
+from tools.clinic_scheduler_tool import ClinicSchedulerTool
+from tools.slot_index import SlotIndex
+
+
+REQUESTS = [
+    ("Cardiology", "evening", "I need a cardiology appointment in the evening"),
+    ("Dermatology", "morning", "Book a skin appointment in the morning"),
+    ("General", "afternoon", "I want to book a checkup in the afternoon"),
+]
+
+
+def scheduler_agent(slot_count: int) -> SchedulerAgent:
+    tool = ClinicSchedulerTool(slot_store=SlotIndex(generate_slots(slot_count)))
+    return SchedulerAgent(scheduler_tool=tool)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    slot_count = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+
+    orchestrator = OrchestratorAgent(scheduler_agent=scheduler_agent(slot_count))
+    start = time.perf_counter()
+    for i in range(count):
+        orchestrator.handle_user_message(f"patient-{i}", REQUESTS[i % len(REQUESTS)][2])
+    one_by_one = time.perf_counter() - start
+
+    agent = scheduler_agent(slot_count)
+    requests = [
+        BookingRequest(user_id=f"patient-{i}", department=dep, time_of_day=tod)
+        for i, (dep, tod, _) in ((i, REQUESTS[i % len(REQUESTS)]) for i in range(count))
+    ]
+    start = time.perf_counter()
+    results = agent.book_many(requests)
+    batched = time.perf_counter() - start
+
+    booked = sum(r.success for r in results)
+    print(f"{count:,} requests against {slot_count:,} slots ({booked:,} booked in batch)")
+    print(f"one message at a time: {one_by_one:7.3f}s -> {count / one_by_one:10.1f} req/s")
+    print(f"book_many            : {batched:7.3f}s -> {count / batched:10.1f} req/s")
+    print(f"speedup              : {one_by_one / batched:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Schedule import benchmark: import rate and peak RSS.
+
+Writes a synthetic schedule (with ~1% duplicate rows) as CSV and JSON Lines,
+then measures each way of getting it into a ClinicSchedulerTool in a fresh
+process, so peak RSS reflects that path alone:
+- read the whole file into a list, then build a SlotIndex (no streaming)
+- streaming import into a SlotIndex / SlotTable
+- loading a SlotTable snapshot written from the import
+
+Run with:
+    python -m evaluation.bench_import [rows]
+"""
+
+from typing import Callable, Tuple
+import csv
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from evaluation.synthetic import generate_slots
+from tools.clinic_scheduler_tool import ClinicSchedulerTool
+from tools.slot_import import SLOT_FIELDS, import_slots, iter_slots
+from tools.slot_index import SlotIndex
+from tools.slot_table import SlotTable
+
+
+def write_schedule(directory: str, rows: int) -> Tuple[str, str]:
+    csv_path = os.path.join(directory, "schedule.csv")
+    jsonl_path = os.path.join(directory, "schedule.jsonl")
+    with open(csv_path, "w", newline="") as csv_file, open(jsonl_path, "w") as jsonl_file:
+        writer = csv.DictWriter(csv_file, fieldnames=SLOT_FIELDS + ("booked",))
+        writer.writeheader()
+        for n, slot in enumerate(generate_slots(rows)):
+            rows_to_write = (slot, slot) if n % 100 == 0 else (slot,)
+            for row in rows_to_write:
+                writer.writerow(row)
+                jsonl_file.write(json.dumps(row) + "\n")
+    return csv_path, jsonl_path
+
+
+def load_whole_file(path: str) -> int:
+    slots = list(iter_slots(path))
+    scheduler_tool = ClinicSchedulerTool(slot_store=SlotIndex())
+    scheduler_tool.add_slots(slots)
+    return len(slots)
+
+
+def stream_into(store_factory: Callable[[], object], path: str) -> int:
+    return import_slots(ClinicSchedulerTool(slot_store=store_factory()), path).rows
+
+
+def load_snapshot(path: str) -> int:
+    table = SlotTable.load_snapshot(path)
+    ClinicSchedulerTool(slot_store=table)
+    return len(table)
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of this process. ru_maxrss would also count the
+    parent's pages from before the worker exec'd, so prefer VmHWM.
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _measure(target, args, results) -> None:
+    start = time.perf_counter()
+    rows = target(*args)
+    elapsed = time.perf_counter() - start
+    results.put((rows, elapsed, peak_rss_mb()))
+
+
+def _noop() -> int:
+    return 0
+
+
+def measure(context, target, *args) -> Tuple[int, float, float]:
+    results = context.Queue()
+    process = context.Process(target=_measure, args=(target, args, results))
+    process.start()
+    outcome = results.get()
+    process.join()
+    return outcome
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    context = multiprocessing.get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path, jsonl_path = write_schedule(tmp, rows)
+        snapshot_path = os.path.join(tmp, "slots.bin")
+        table = SlotTable()
+        import_slots(ClinicSchedulerTool(slot_store=table), csv_path)
+        table.save_snapshot(snapshot_path)
+        del table
+
+        sizes = {path: os.path.getsize(path) / 2**20 for path in (csv_path, jsonl_path, snapshot_path)}
+        print(f"{rows:,} slots (+1% duplicate rows): CSV {sizes[csv_path]:.0f} MB, "
+              f"JSONL {sizes[jsonl_path]:.0f} MB, snapshot {sizes[snapshot_path]:.0f} MB")
+        _, _, baseline_mb = measure(context, _noop)
+        print(f"(an idle worker process peaks at {baseline_mb:.0f} MB)")
+        print(f"{'path':<34}{'rows/s':>12}{'seconds':>10}{'peak RSS MB':>14}")
+
+        cases = [
+            ("whole file -> SlotIndex (CSV)", load_whole_file, (csv_path,)),
+            ("stream -> SlotIndex (CSV)", stream_into, (SlotIndex, csv_path)),
+            ("stream -> SlotTable (CSV)", stream_into, (SlotTable, csv_path)),
+            ("stream -> SlotTable (JSONL)", stream_into, (SlotTable, jsonl_path)),
+            ("snapshot -> SlotTable", load_snapshot, (snapshot_path,)),
+        ]
+        for label, target, args in cases:
+            count, elapsed, peak_mb = measure(context, target, *args)
+            print(f"{label:<34}{count / elapsed:>12,.0f}{elapsed:>10.2f}{peak_mb:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
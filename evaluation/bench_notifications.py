@@ -0,0 +1,53 @@
+"""
+Notification rendering benchmark: messages rendered per second.
+
+- single: NotificationAgent.build_user_message, one call per message (the
+  per-conversation path)
+- batch: NotificationAgent.render_batch, one call for all messages (the
+  reminder path)
+
+Both run for each channel, plus one non-default locale.
+
+Run with:
+    python -m evaluation.bench_notifications [messages]
+"""
+
+import sys
+import time
+
+from agents.notification_agent import NotificationAgent
+from agents.scheduler_agent import SchedulerResult
+from agents.triage_agent import TriageResult
+from evaluation.synthetic import generate_slots
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    slots = list(generate_slots(count))
+    agent = NotificationAgent()
+    triage_results = [TriageResult(intent="reminder", request_data={"department": slot["department"]}) for slot in slots]
+    scheduler_results = [SchedulerResult(success=True, message="", slot=slot) for slot in slots]
+
+    print(f"{count:,} reminder messages")
+    print(f"{'channel':<12}{'locale':<8}{'single msg/s':>16}{'batch msg/s':>16}{'speedup':>9}")
+    for channel, locale in (("chat", "en"), ("sms", "en"), ("email", "en"), ("chat", "es")):
+        start = time.perf_counter()
+        single = [
+            agent.build_user_message("reminder", triage, result, channel=channel, locale=locale)
+            for triage, result in zip(triage_results, scheduler_results)
+        ]
+        single_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = agent.render_batch("reminder", slots, channel=channel, locale=locale)
+        batch_elapsed = time.perf_counter() - start
+
+        assert single == batch, "batch rendering differs from single rendering"
+        print(
+            f"{channel:<12}{locale:<8}{count / single_elapsed:>16,.0f}{count / batch_elapsed:>16,.0f}"
+            f"{single_elapsed / batch_elapsed:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Operation log benchmark: durable booking throughput and recovery time.
+
+1. Durable bookings: threads book distinct slots through a
+   ClinicSchedulerTool on LogStorage(synchronous=True), so every booking is
+   on disk before book_slot returns. With more threads, more bookings share
+   each fsync (group commit).
+2. Recovery: time to rebuild a ClinicSchedulerTool from logs of increasing
+   length (book/cancel churn over a fixed inventory), replaying the raw log
+   and again after compacting it into a snapshot.
+
+Run with:
+    python -m evaluation.bench_oplog [slot_count] [bookings]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from evaluation.synthetic import generate_slots
+from tools.clinic_scheduler_tool import ClinicSchedulerTool
+from tools.oplog import LogStorage
+from tools.slot_index import SlotIndex
+
+
+def durable_bookings(directory: str, slot_count: int, bookings: int, threads: int) -> None:
+    storage = LogStorage(directory, synchronous=True)
+    scheduler_tool = ClinicSchedulerTool(slot_store=SlotIndex(), storage=storage)
+    scheduler_tool.add_slots(generate_slots(slot_count, days=30))
+    slots = scheduler_tool.find_available_slots("General", "any")[:bookings]
+    before = storage.metrics()
+
+    def worker(offset: int) -> None:
+        for i in range(offset, len(slots), threads):
+            scheduler_tool.book_slot(user_id=f"user-{i}", slot=slots[i])
+
+    workers = [threading.Thread(target=worker, args=(k,)) for k in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    after = storage.metrics()
+    storage.close()
+    syncs = after["syncs"] - before["syncs"]
+    records = after["records"] - before["records"]
+    print(f"{threads:>8}{len(slots) / elapsed:>16,.0f}{syncs:>10,}{records / max(syncs, 1):>16.1f}")
+
+
+def write_churn(directory: str, slot_count: int, operations: int) -> None:
+    """
+    Log `operations` booking changes: each round books a slot and cancels
+    every other booking.
+    """
+    storage = LogStorage(directory, segment_bytes=1 << 40)
+    scheduler_tool = ClinicSchedulerTool(slot_store=SlotIndex(), storage=storage)
+    scheduler_tool.add_slots(generate_slots(slot_count, days=30))
+    slots = scheduler_tool.find_available_slots("General", "any")
+    logged = 0
+    i = 0
+    while logged < operations:
+        slot = slots[i % len(slots)]
+        i += 1
+        appointment_id = scheduler_tool.book_slot(user_id=f"user-{i}", slot=slot)
+        if appointment_id is None:
+            continue
+        logged += 1
+        if i % 2:
+            scheduler_tool.cancel_appointment(appointment_id)
+            logged += 1
+    storage.close()
+
+
+def recover(directory: str) -> float:
+    start = time.perf_counter()
+    storage = LogStorage(directory)
+    ClinicSchedulerTool(slot_store=SlotIndex(), storage=storage)
+    elapsed = time.perf_counter() - start
+    storage.close()
+    return elapsed
+
+
+def directory_bytes(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def main() -> None:
+    slot_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    bookings = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Durable bookings (synchronous=True), {slot_count:,} slots, {bookings:,} bookings")
+        print(f"{'threads':>8}{'bookings/sec':>16}{'fsyncs':>10}{'records/fsync':>16}")
+        for threads in (1, 4, 16, 64):
+            durable_bookings(os.path.join(tmp, f"durable-{threads}"), slot_count, bookings, threads)
+
+        print(f"\nRecovery, {slot_count:,} slots plus N logged booking changes")
+        print(f"{'changes':>10}{'log MB':>10}{'replay (s)':>12}{'snapshot MB':>13}{'replay (s)':>12}")
+        for operations in (10_000, 100_000, 1_000_000):
+            directory = os.path.join(tmp, f"recovery-{operations}")
+            write_churn(directory, slot_count, operations)
+            log_size = directory_bytes(directory)
+            from_log = recover(directory)
+
+            storage = LogStorage(directory)
+            storage.snapshot()
+            storage.close()
+            snapshot_size = directory_bytes(directory)
+            from_snapshot = recover(directory)
+            print(
+                f"{operations:>10,}{log_size / 1e6:>10.1f}{from_log:>12.3f}"
+                f"{snapshot_size / 1e6:>13.1f}{from_snapshot:>12.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Slot ranking benchmark: top-k selection vs scoring and sorting every
+candidate.
+
+For each query the full-sort baseline scores all free slots and sorts them;
+SlotRanker.top_k reads dates earliest first from the slot index and stops
+once no later date can make the top k.
+
+Run with:
+    python -m evaluation.bench_ranking [slot_count] [k]
+"""
+
+import statistics
+import sys
+import time
+
+from agents.slot_ranker import SlotPreferences, SlotRanker
+from evaluation.synthetic import generate_slots
+from tools.clinic_scheduler_tool import ClinicSchedulerTool
+from tools.slot_index import SlotIndex
+from tools.slot_table import date_to_ordinal
+
+
+QUERIES = [
+    ("Cardiology", "evening"),
+    ("Dermatology", "any"),
+    ("General", "any"),
+]
+PREFERENCES = {
+    "no preferences": SlotPreferences(),
+    "doctor + location": SlotPreferences(doctor_ids=frozenset({"doc-car-3", "doc-gen-7"}), location="Lakeside Hospital"),
+}
+
+
+def full_sort(tool, ranker, department, time_of_day, preferences, k):
+    slots = tool.find_available_slots(department, time_of_day)
+    first = min(date_to_ordinal(d) for d in {s["date"] for s in slots})
+    scored = sorted(
+        (ranker.score(s, date_to_ordinal(s["date"]) - first, preferences), date_to_ordinal(s["date"]), i)
+        for i, s in enumerate(slots)
+    )
+    return [slots[i] for _, _, i in scored[:k]], len(slots)
+
+
+def median_us(call, repeat: int = 15) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e6
+
+
+def main() -> None:
+    slot_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    tool = ClinicSchedulerTool(slot_store=SlotIndex(generate_slots(slot_count)))
+    ranker = SlotRanker()
+
+    print(f"{slot_count:,} slots, top {k}")
+    print(f"{'query':<24}{'preferences':<20}{'candidates':>11}{'full sort us':>14}{'top-k us':>11}")
+    for department, time_of_day in QUERIES:
+        for label, preferences in PREFERENCES.items():
+            expected, candidates = full_sort(tool, ranker, department, time_of_day, preferences, k)
+            top = ranker.top_k(tool.find_available_slots_by_date(department, time_of_day), k, preferences)
+            assert [s["slot_id"] for s in top] == [s["slot_id"] for s in expected]
+
+            baseline = median_us(lambda: full_sort(tool, ranker, department, time_of_day, preferences, k), repeat=5)
+            ranked = median_us(
+                lambda: ranker.top_k(tool.find_available_slots_by_date(department, time_of_day), k, preferences)
+            )
+            print(f"{department + '/' + time_of_day:<24}{label:<20}{candidates:>11,}{baseline:>14.0f}{ranked:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Recurring availability benchmark: rule-generated slots vs listing every slot.
+
+Builds a clinic of weekly rules (several doctors per department, morning,
+afternoon and evening sessions) and compares, over growing horizons, a
+RecurringSlotStore against a SlotIndex holding every slot those rules
+describe:
+- build time and memory held (tracemalloc)
+- earliest free date for a department/time of day (find_available_slots_by_date)
+- free slots within one week (find_available_slots with a date window)
+- free-slot count over the whole horizon (count_available_slots)
+- memory added by bookings
+
+Run with:
+    python -m evaluation.bench_recurring [doctors_per_department] [bookings]
+"""
+
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterator, List
+import random
+import sys
+import time
+import tracemalloc
+
+from evaluation.synthetic import DEPARTMENTS, LOCATIONS, TIMES
+from tools.clinic_scheduler_tool import ClinicSchedulerTool
+from tools.recurring_slots import AvailabilityRule, RecurringSlotStore, parse_weekdays
+from tools.slot_index import SlotIndex
+
+
+HORIZONS = [30, 90, 365]
+START = "2026-01-05"
+SESSIONS = [("Mon-Fri", "09:00", "12:00"), ("Mon,Wed,Fri", "13:00", "16:30"), ("Tue-Sat", "18:00", "20:00")]
+LOOKUPS = 2_000
+
+
+def clinic_rules(doctors_per_department: int) -> List[AvailabilityRule]:
+    rules = []
+    for dep in DEPARTMENTS:
+        for n in range(doctors_per_department):
+            doctor_id = f"{dep.lower()}-{n}"
+            for i, (days, start, end) in enumerate(SESSIONS):
+                rules.append(AvailabilityRule(
+                    f"{doctor_id}-{i}", doctor_id, f"Dr. {dep} {n}", dep, LOCATIONS[n % len(LOCATIONS)],
+                    parse_weekdays(days), start, end, slot_minutes=15 if n % 2 else 30,
+                ))
+    return rules
+
+
+def listed_slots(store: RecurringSlotStore) -> Iterator[Dict[str, Any]]:
+    """
+    Every slot the store's rules describe, as a SlotIndex would hold them.
+    """
+    for dep in DEPARTMENTS:
+        if dep != "General":
+            for _, slots in store.find_by_date(dep, "any"):
+                yield from slots
+    for _, slots in store.find_by_date("General", "any"):
+        yield from (slot for slot in slots if slot["department"] == "General")
+
+
+def measure(build: Callable[[], ClinicSchedulerTool]) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    tool = build()
+    elapsed = time.perf_counter() - start
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return tool, elapsed, held
+
+
+def per_call_us(fn: Callable[[random.Random], Any]) -> float:
+    rng = random.Random(7)
+    start = time.perf_counter()
+    for _ in range(LOOKUPS):
+        fn(rng)
+    return (time.perf_counter() - start) / LOOKUPS * 1e6
+
+
+def main() -> None:
+    doctors = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    bookings = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+    rules = clinic_rules(doctors)
+    times_of_day = ["any", *TIMES]
+    first = date.fromisoformat(START)
+
+    print(f"{len(rules)} rules ({doctors} doctors per department), {bookings:,} bookings")
+    print(
+        f"{'store':<11}{'days':>5}{'slots':>9}{'build ms':>10}{'memory':>10}{'earliest us':>13}"
+        f"{'week us':>10}{'count us':>10}{'+bookings':>11}"
+    )
+
+    for horizon in HORIZONS:
+        def recurring_store() -> RecurringSlotStore:
+            return RecurringSlotStore(rules, start_date=START, horizon_days=horizon)
+
+        slot_count = sum(1 for _ in listed_slots(recurring_store()))
+        builds = {
+            "recurring": lambda: ClinicSchedulerTool(slot_store=recurring_store()),
+            "listed": lambda: ClinicSchedulerTool(slot_store=SlotIndex(listed_slots(recurring_store()))),
+        }
+        for label, build in builds.items():
+            tool, elapsed, held = measure(build)
+
+            def earliest(rng: random.Random) -> Any:
+                return next(iter(tool.find_available_slots_by_date(rng.choice(DEPARTMENTS), rng.choice(times_of_day))), None)
+
+            def week(rng: random.Random) -> Any:
+                day = first + timedelta(days=rng.randrange(horizon))
+                end = min(day + timedelta(days=6), first + timedelta(days=horizon - 1))
+                return tool.find_available_slots(rng.choice(DEPARTMENTS), rng.choice(times_of_day), day.isoformat(), end.isoformat())
+
+            def count(rng: random.Random) -> int:
+                return tool.count_available_slots(rng.choice(DEPARTMENTS), rng.choice(times_of_day))
+
+            lookup_us = [per_call_us(fn) for fn in (earliest, week, count)]
+
+            # Book random free slots and see what holding them costs
+            rng = random.Random(11)
+            free = tool.find_available_slots("General", "any")
+            chosen = rng.sample(free, min(bookings, len(free)))
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            for n, slot in enumerate(chosen):
+                tool.book_slot(f"user-{n}", slot)
+            grown = tracemalloc.get_traced_memory()[0] - before
+            tracemalloc.stop()
+
+            print(
+                f"{label:<11}{horizon:>5}{slot_count:>9,}{elapsed * 1000:>10.1f}{held / 1e6:>8.1f}MB"
+                f"{lookup_us[0]:>13.1f}{lookup_us[1]:>10.1f}{lookup_us[2]:>10.1f}{grown / 1e6:>9.2f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Reminder dispatch benchmark.
+
+1. Timer structure: schedule, cancel and drain N timers on the TimerWheel
+   versus a heapq baseline (lazy cancellation: cancelled entries are
+   flagged and skipped when popped).
+2. End to end: ReminderDispatcher schedules 24h + 1h reminders for N
+   appointments, moves 20% (reschedule) and drops 10% (cancel), then is
+   advanced an hour at a time over the whole horizon, rendering and
+   delivering every reminder in batches to a StubSender.
+
+Run with:
+    python -m evaluation.bench_reminders [appointments]
+"""
+
+from datetime import datetime, timedelta
+import heapq
+import itertools
+import random
+import sys
+import time
+
+from agents.reminder_dispatcher import ReminderDispatcher, StubSender
+from evaluation.synthetic import generate_slots
+from tools.timer_wheel import TimerWheel
+
+
+HORIZON_MINUTES = 200 * 24 * 60
+
+
+def bench_wheel(expiries):
+    wheel = TimerWheel(now=0)
+    start = time.perf_counter()
+    timers = [wheel.schedule(expires, i) for i, expires in enumerate(expiries)]
+    scheduled = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for timer in timers[::10]:
+        wheel.cancel(timer)
+    cancelled = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fired = 0
+    for now in range(60, HORIZON_MINUTES + 61, 60):
+        fired += len(wheel.advance(now))
+    drained = time.perf_counter() - start
+    return scheduled, cancelled, drained, fired
+
+
+def bench_heap(expiries):
+    heap = []
+    counter = itertools.count()
+    start = time.perf_counter()
+    entries = []
+    for i, expires in enumerate(expiries):
+        entry = [expires, next(counter), i, True]
+        heapq.heappush(heap, entry)
+        entries.append(entry)
+    scheduled = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for entry in entries[::10]:
+        entry[3] = False
+    cancelled = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fired = 0
+    for now in range(60, HORIZON_MINUTES + 61, 60):
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            if entry[3]:
+                fired += 1
+    drained = time.perf_counter() - start
+    return scheduled, cancelled, drained, fired
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = random.Random(7)
+
+    timers = 2 * count
+    expiries = [rng.randrange(1, HORIZON_MINUTES) for _ in range(timers)]
+    print(f"{timers:,} timers over {HORIZON_MINUTES // (24 * 60)} days of 1-minute ticks, 10% cancelled")
+    print(f"{'structure':<12}{'schedule/s':>14}{'cancel/s':>14}{'drain (s)':>12}{'fired':>12}")
+    for name, bench in (("timer wheel", bench_wheel), ("heapq", bench_heap)):
+        scheduled, cancelled, drained, fired = bench(expiries)
+        print(
+            f"{name:<12}{timers / scheduled:>14,.0f}{(timers // 10) / cancelled:>14,.0f}"
+            f"{drained:>12.2f}{fired:>12,}"
+        )
+
+    slots = list(generate_slots(count, days=180))
+    start_time = datetime(2025, 12, 31)
+    sender = StubSender()
+    dispatcher = ReminderDispatcher(sender=sender, now=start_time)
+
+    start = time.perf_counter()
+    for i, slot in enumerate(slots):
+        dispatcher.schedule(f"appt-{i}", f"user-{i}", slot)
+    scheduled = time.perf_counter() - start
+
+    moved = slots[::-1][: count // 5]
+    start = time.perf_counter()
+    for i, slot in enumerate(moved):
+        dispatcher.schedule(f"appt-{i}", f"user-{i}", slot)
+    rescheduled = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(count - count // 10, count):
+        dispatcher.cancel(f"appt-{i}")
+    cancelled = time.perf_counter() - start
+
+    pending = len(dispatcher)
+    start = time.perf_counter()
+    clock = start_time
+    while len(dispatcher):
+        clock += timedelta(hours=1)
+        dispatcher.advance(clock)
+    delivered = time.perf_counter() - start
+
+    print(f"\nReminderDispatcher, {count:,} appointments (24h + 1h reminders)")
+    print(f"schedule     {count / scheduled:>12,.0f} appointments/s")
+    print(f"reschedule   {len(moved) / rescheduled:>12,.0f} appointments/s")
+    print(f"cancel       {(count // 10) / cancelled:>12,.0f} appointments/s")
+    print(
+        f"deliver      {len(sender.sent) / delivered:>12,.0f} reminders/s "
+        f"({len(sender.sent):,} of {pending:,} pending, {sender.batches:,} batches)"
+    )
+    assert len(sender.sent) == pending
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Server throughput benchmark across worker counts.
+
+Starts CareFlowServer with 1, 2, 4, ... workers (all booking from one
+shared slot file, seeded with the same synthetic slots for every run), drives
+it with keep-alive HTTP clients in separate processes, and reports
+requests/sec and latency percentiles.
+
+Run with:
+    python -m evaluation.bench_server [max_workers] [seconds]
+"""
+
+from typing import List
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from evaluation.benchmark import generate_population, percentile
+from evaluation.synthetic import generate_slots
+from server import CareFlowServer, seed_shared_slots
+
+
+CLIENT_PROCESSES = 2
+CONNECTIONS_PER_CLIENT = 32
+# Every run starts from the same synthetic inventory, so runs are reproducible
+SLOT_SEED = 42
+
+
+async def _drive(port: int, client: int, duration: float) -> List[float]:
+    population = generate_population(CONNECTIONS_PER_CLIENT * 50, seed=client)
+    latencies: List[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def connection(k: int) -> None:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        conversations = population[k::CONNECTIONS_PER_CLIENT]
+        n = 0
+        while time.perf_counter() < deadline:
+            conversation = conversations[n % len(conversations)]
+            for _, message in conversation.messages:
+                body = json.dumps({"user_id": f"c{client}-{conversation.user_id}", "message": message}).encode()
+                start = time.perf_counter()
+                writer.write(b"POST /message HTTP/1.1\r\nHost: bench\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+                await reader.readexactly(length)
+                latencies.append(time.perf_counter() - start)
+            n += 1
+        writer.close()
+
+    await asyncio.gather(*(connection(k) for k in range(CONNECTIONS_PER_CLIENT)))
+    return latencies
+
+
+def _client_main(port: int, client: int, duration: float, results: "multiprocessing.Queue") -> None:
+    results.put(asyncio.run(_drive(port, client, duration)))
+
+
+async def run(workers: int, duration: float, slots: int) -> List[float]:
+    with tempfile.TemporaryDirectory() as directory:
+        slots_path = os.path.join(directory, "slots.db")
+        seed_shared_slots(slots_path, list(generate_slots(slots, seed=SLOT_SEED)))
+        return await _serve_and_drive(workers, duration, slots_path)
+
+
+async def _serve_and_drive(workers: int, duration: float, slots_path: str) -> List[float]:
+    server = CareFlowServer(workers=workers, port=0, slots_path=slots_path)
+    await server.start()
+    results: "multiprocessing.Queue" = multiprocessing.Queue()
+    clients = [
+        multiprocessing.Process(target=_client_main, args=(server.port, client, duration, results))
+        for client in range(CLIENT_PROCESSES)
+    ]
+    for process in clients:
+        process.start()
+
+    loop = asyncio.get_running_loop()
+    latencies: List[float] = []
+    for _ in clients:
+        latencies.extend(await loop.run_in_executor(None, results.get))
+    for process in clients:
+        process.join()
+    await server.shutdown()
+    return latencies
+
+
+def main() -> None:
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else (os.cpu_count() or 1)
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    slots = 20_000
+
+    counts = []
+    workers = 1
+    while workers <= max_workers:
+        counts.append(workers)
+        workers *= 2
+    if counts[-1] != max_workers:
+        counts.append(max_workers)
+
+    print(f"{os.cpu_count()} CPUs, {CLIENT_PROCESSES}x{CONNECTIONS_PER_CLIENT} client connections, {duration}s per run")
+    print(f"{'workers':>8}{'req/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for workers in counts:
+        latencies = sorted(asyncio.run(run(workers, duration, slots)))
+        print(
+            f"{workers:>8}{len(latencies) / duration:>12.1f}{percentile(latencies, 0.50) * 1000:>10.3f}"
+            f"{percentile(latencies, 0.95) * 1000:>10.3f}{percentile(latencies, 0.99) * 1000:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
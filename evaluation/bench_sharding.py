@@ -0,0 +1,96 @@
+"""
+Sharded scheduler benchmark: booking throughput as shards are added.
+
+Seeds N synthetic slots, then runs client threads for a fixed time. Each
+one repeatedly looks up the earliest free date for a random
+department/time of day and books the first slot on it; 20% of lookups are
+"General", which fans out to every shard. The same workload runs against
+one in-process ClinicSchedulerTool for reference, then against
+ShardedScheduler with 1, 2, 4, ... shard processes, partitioned by
+department and by (location, department).
+
+Shards only add throughput when there are cores for them to run on; the
+host's core count is printed with the results.
+
+Run with:
+    python -m evaluation.bench_sharding [slots] [seconds] [max_shards]
+"""
+
+from typing import Any, List, Tuple
+import os
+import random
+import sys
+import threading
+import time
+
+from evaluation.synthetic import DEPARTMENTS, TIMES, generate_slots
+from tools.clinic_scheduler_tool import ClinicSchedulerTool
+from tools.sharded_scheduler import ShardedScheduler, by_department, by_location_department
+from tools.slot_index import SlotIndex
+
+
+CLIENT_THREADS = 8
+GENERAL_SHARE = 0.2
+
+
+def _client(tool: Any, seed: int, deadline: float, results: List[Tuple[int, int]]) -> None:
+    rng = random.Random(seed)
+    specific = [d for d in DEPARTMENTS if d != "General"]
+    times_of_day = ["any", *TIMES]
+    lookups = bookings = 0
+    while time.perf_counter() < deadline:
+        department = "General" if rng.random() < GENERAL_SHARE else rng.choice(specific)
+        earliest = next(iter(tool.find_available_slots_by_date(department, rng.choice(times_of_day))), None)
+        lookups += 1
+        if earliest is not None and tool.book_slot(f"user-{seed}-{lookups}", earliest[1][0]) is not None:
+            bookings += 1
+    results.append((lookups, bookings))
+
+
+def run(tool: Any, duration: float) -> Tuple[float, float]:
+    results: List[Tuple[int, int]] = []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=_client, args=(tool, seed, deadline, results)) for seed in range(CLIENT_THREADS)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return sum(r[0] for r in results) / elapsed, sum(r[1] for r in results) / elapsed
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    max_shards = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    print(f"{count:,} slots, {CLIENT_THREADS} client threads, {duration:.0f}s per run, {os.cpu_count()} CPU(s)")
+    print(f"{'scheduler':<30}{'seed (s)':>10}{'lookups/s':>12}{'bookings/s':>12}  slots per shard")
+
+    start = time.perf_counter()
+    tool = ClinicSchedulerTool(slot_store=SlotIndex(generate_slots(count)))
+    seeded = time.perf_counter() - start
+    lookups, bookings = run(tool, duration)
+    print(f"{'in-process':<30}{seeded:>10.2f}{lookups:>12,.0f}{bookings:>12,.0f}")
+
+    shards = 1
+    while shards <= max_shards:
+        for label, partition_key in (("department", by_department), ("location+department", by_location_department)):
+            start = time.perf_counter()
+            sharded = ShardedScheduler(shards=shards, slots=generate_slots(count), partition_key=partition_key)
+            seeded = time.perf_counter() - start
+            try:
+                lookups, bookings = run(sharded, duration)
+            finally:
+                sharded.close()
+            sizes = ", ".join(f"{n:,}" for n in sharded.shard_slot_counts())
+            name = f"{shards} x {label}"
+            print(f"{name:<30}{seeded:>10.2f}{lookups:>12,.0f}{bookings:>12,.0f}  {sizes}")
+        shards *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Memory and throughput comparison of slot representations:
+- list of slot dicts with a linear scan (the original layout)
+- SlotIndex (dicts + free-slot index)
+- SlotTable (compact columns + byte-mask filtering)
+
+Run with:
+    python -m evaluation.bench_slot_table [slot_count]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from evaluation.synthetic import generate_slots
+from tools.slot_index import SlotIndex
+from tools.slot_table import SlotTable
+
+
+QUERIES = [
+    ("Cardiology", "evening", None),
+    ("Dermatology", "morning", None),
+    ("ENT", "any", None),
+    ("General", "afternoon", None),
+    ("Cardiology", "evening", "2026-02-10"),
+    ("General", "any", "2026-03-01"),
+]
+
+
+def scan(slots, department, time_of_day, date=None):
+    results = []
+    for slot in slots:
+        if slot["booked"]:
+            continue
+        if date is not None and slot["date"] != date:
+            continue
+        if department != "General" and slot["department"] != department:
+            continue
+        if time_of_day != "any" and slot["time_of_day"] != time_of_day:
+            continue
+        results.append(slot)
+    return results
+
+
+def measure_memory(build):
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current
+
+
+def measure_queries(find, rounds=5):
+    start = time.perf_counter()
+    returned = 0
+    for _ in range(rounds):
+        for department, time_of_day, date in QUERIES:
+            returned += len(find(department, time_of_day, date))
+    elapsed = time.perf_counter() - start
+    return rounds * len(QUERIES) / elapsed, returned
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    print(f"Slots: {count:,}")
+
+    slots, dict_bytes = measure_memory(lambda: list(generate_slots(count)))
+    index, index_bytes = measure_memory(lambda: SlotIndex(generate_slots(count)))
+    table, table_bytes = measure_memory(lambda: SlotTable(generate_slots(count)))
+
+    print(f"{'layout':<12}{'memory (MB)':>14}{'queries/sec':>14}")
+    for name, size, find in [
+        ("dict list", dict_bytes, lambda d, t, day: scan(slots, d, t, day)),
+        ("SlotIndex", index_bytes, index.find),
+        ("SlotTable", table_bytes, table.find),
+    ]:
+        qps, _ = measure_queries(find)
+        print(f"{name:<12}{size / 1e6:>14.1f}{qps:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
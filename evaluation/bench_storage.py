@@ -0,0 +1,81 @@
+"""
+Storage backend benchmark: booking throughput and cold-start load time.
+
+Compares:
+- InMemoryStorage (default, nothing persisted)
+- SQLiteStorage with group commit (default batch settings)
+- SQLiteStorage committing every write (batch_size=1)
+- LogStorage (append-only operation log) with group commit
+
+Run with:
+    python -m evaluation.bench_storage [slot_count] [bookings]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from evaluation.synthetic import generate_slots
+from tools.clinic_scheduler_tool import ClinicSchedulerTool
+from tools.oplog import LogStorage
+from tools.slot_index import SlotIndex
+from tools.storage import InMemoryStorage, SQLiteStorage
+
+
+def book(scheduler_tool: ClinicSchedulerTool, bookings: int) -> float:
+    """
+    Time book_slot alone, so the numbers reflect storage cost rather than
+    slot lookups.
+    """
+    slots = scheduler_tool.find_available_slots("General", "any")[:bookings]
+    start = time.perf_counter()
+    for i, slot in enumerate(slots):
+        scheduler_tool.book_slot(user_id=f"user-{i}", slot=slot)
+    return time.perf_counter() - start
+
+
+def build(storage, slot_count: int) -> ClinicSchedulerTool:
+    scheduler_tool = ClinicSchedulerTool(slot_store=SlotIndex(), storage=storage)
+    scheduler_tool.add_slots(generate_slots(slot_count, days=30))
+    storage.flush()
+    return scheduler_tool
+
+
+def main() -> None:
+    slot_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    bookings = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [
+            ("in-memory", lambda: InMemoryStorage()),
+            ("sqlite group commit", lambda: SQLiteStorage(os.path.join(tmp, "group.db"))),
+            ("sqlite commit per write", lambda: SQLiteStorage(
+                os.path.join(tmp, "single.db"), batch_size=1, flush_interval=0)),
+            ("log group commit", lambda: LogStorage(os.path.join(tmp, "oplog"))),
+        ]
+
+        print(f"{slot_count:,} slots, {bookings:,} bookings")
+        print(f"{'backend':<26}{'bookings/sec':>14}{'cold start (s)':>16}")
+        for name, factory in backends:
+            storage = factory()
+            scheduler_tool = build(storage, slot_count)
+            elapsed = book(scheduler_tool, bookings)
+            storage.close()
+
+            # Cold start: rebuild tools from what the backend persisted
+            storage = factory()
+            start = time.perf_counter()
+            if isinstance(storage, InMemoryStorage):
+                # Nothing persisted: a restart has to re-ingest the inventory
+                ClinicSchedulerTool(slot_store=SlotIndex()).add_slots(generate_slots(slot_count, days=30))
+            else:
+                ClinicSchedulerTool(slot_store=SlotIndex(), storage=storage)
+            cold = time.perf_counter() - start
+            storage.close()
+
+            print(f"{name:<26}{bookings / elapsed:>14.1f}{cold:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
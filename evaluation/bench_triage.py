@@ -0,0 +1,91 @@
+"""
+Microbenchmark for TriageAgent on a large synthetic message corpus.
+
+Compares the compiled KeywordMatcher with the original chain of substring
+checks, and counts how often the two disagree (mostly the old "ent" inside
+"appointment" and "appointment" inside "reschedule my appointment" cases).
+
+Run with:
+    python -m evaluation.bench_triage [messages]
+"""
+
+import random
+import sys
+import time
+
+from agents.triage_agent import TriageAgent, TriageResult
+
+
+OPENERS = ["I need to", "Please", "Can you", "I'd like to", "Help me", ""]
+VERBS = ["book", "reschedule", "cancel", "change", "schedule", "see a doctor about"]
+SUBJECTS = [
+    "a cardiology appointment", "my heart checkup", "a skin appointment",
+    "a dermatology visit", "an ENT consult", "my ear infection appointment",
+    "a general checkup", "my appointment", "an appointment for my sore throat",
+]
+TIMES = ["in the morning", "tomorrow afternoon", "in the evening", "after 5 pm", "next week", ""]
+
+
+def legacy_triage(message: str):
+    """
+    The original substring-based heuristics, kept for comparison.
+    """
+    lower_msg = message.lower()
+    if any(word in lower_msg for word in ["book", "appointment", "schedule", "see a doctor"]):
+        intent = "book"
+    elif "reschedule" in lower_msg or "change" in lower_msg:
+        intent = "reschedule"
+    elif "cancel" in lower_msg:
+        intent = "cancel"
+    else:
+        intent = "unknown"
+    if "cardio" in lower_msg or "heart" in lower_msg:
+        department = "Cardiology"
+    elif "skin" in lower_msg or "derma" in lower_msg:
+        department = "Dermatology"
+    elif "ent" in lower_msg or "ear" in lower_msg or "nose" in lower_msg or "throat" in lower_msg:
+        department = "ENT"
+    else:
+        department = "General"
+    if "morning" in lower_msg:
+        time_of_day = "morning"
+    elif "afternoon" in lower_msg:
+        time_of_day = "afternoon"
+    elif "evening" in lower_msg or "after 5" in lower_msg:
+        time_of_day = "evening"
+    else:
+        time_of_day = "any"
+    return TriageResult(intent=intent, request_data={"department": department, "time_of_day": time_of_day})
+
+
+def corpus(size: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [
+        " ".join(filter(None, [rng.choice(OPENERS), rng.choice(VERBS), rng.choice(SUBJECTS), rng.choice(TIMES)]))
+        for _ in range(size)
+    ]
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    messages = corpus(size)
+    agent = TriageAgent()
+
+    start = time.perf_counter()
+    legacy = [legacy_triage(m) for m in messages]
+    legacy_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = [agent.triage(m, {}) for m in messages]
+    matcher_elapsed = time.perf_counter() - start
+
+    disagreements = sum(r != old for r, old in zip(results, legacy))
+
+    print(f"{size:,} messages")
+    print(f"legacy substring checks: {size / legacy_elapsed:12.0f} msg/s")
+    print(f"KeywordMatcher         : {size / matcher_elapsed:12.0f} msg/s")
+    print(f"classifications changed: {disagreements:,} ({disagreements / size:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Triage micro-batching benchmark: throughput vs latency as the window varies.
+
+For each load level, concurrent clients on one event loop send triage
+requests back to back (drawn from the bench_triage corpus, so popular
+phrasings repeat) to a FakeModelBackend: 20 ms per call plus 0.5 ms per
+message, at most 8 calls at once. The baseline sends every message as its own model call; the other
+rows go through BatchingTriageAgent with increasing windows. Under light
+load a longer window mostly adds latency; under heavy load batches fill up
+before the window ends and the window hardly matters.
+
+Run with:
+    python -m evaluation.bench_triage_batching [seconds] [clients ...]
+"""
+
+from typing import Any, Awaitable, Callable, List
+import asyncio
+import random
+import sys
+import time
+
+from agents.batching_triage import BatchingTriageAgent, FakeModelBackend
+from evaluation.bench_triage import corpus
+from evaluation.benchmark import percentile
+
+
+WINDOWS_MS = [0, 1, 2, 5, 10, 20, 50]
+MAX_BATCH = 64
+
+
+async def drive(triage: Callable[[str], Awaitable[Any]], clients: int, duration: float) -> List[float]:
+    messages = corpus(5_000)
+    latencies: List[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def client(seed: int) -> None:
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await triage(rng.choice(messages))
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(client(seed) for seed in range(clients)))
+    return latencies
+
+
+def report(label: str, latencies: List[float], duration: float, backend: FakeModelBackend, coalesced: int) -> None:
+    latencies.sort()
+    print(
+        f"{label:<14}{len(latencies) / duration:>10,.0f}{percentile(latencies, 0.5) * 1000:>9.1f}"
+        f"{percentile(latencies, 0.95) * 1000:>9.1f}{backend.calls:>9,}"
+        f"{backend.messages / max(backend.calls, 1):>8.1f}{coalesced / max(len(latencies), 1):>11.1%}"
+    )
+
+
+def main() -> None:
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    loads = [int(arg) for arg in sys.argv[2:]] or [4, 50, 500]
+
+    for clients in loads:
+        print(f"\n{clients} concurrent clients, {duration:.0f}s per run, max batch {MAX_BATCH}")
+        print(f"{'window':<14}{'msg/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'calls':>9}{'batch':>8}{'coalesced':>11}")
+
+        backend = FakeModelBackend()
+
+        async def unbatched(message: str) -> Any:
+            return (await backend.triage_batch([message]))[0]
+
+        latencies = asyncio.run(drive(unbatched, clients, duration))
+        report("per message", latencies, duration, backend, 0)
+
+        for window in WINDOWS_MS:
+            backend = FakeModelBackend()
+            agent = BatchingTriageAgent(backend, window_ms=window, max_batch=MAX_BATCH)
+            latencies = asyncio.run(drive(lambda message: agent.triage_async(message, {}), clients, duration))
+            report(f"{window} ms", latencies, duration, backend, agent.stats()["coalesced"])
+
+
+if __name__ == "__main__":
+    main()
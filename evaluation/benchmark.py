@@ -0,0 +1,314 @@
+"""
+Load-testing and benchmark harness for CareFlow.
+
+Generates a synthetic user population and slot inventory, drives each
+target for a fixed duration, and reports throughput plus p50/p95/p99
+latency per intent/operation. Results can be saved as JSON and compared
+against a saved baseline to catch regressions.
+
+Targets:
+- orchestrator: full OrchestratorAgent.handle_user_message conversations
+- triage: TriageAgent.triage
+- scheduler: SchedulerAgent.book_appointment
+- tools: ClinicSchedulerTool.find_available_slots, CalendarTool.first_free_slot
+- notification: NotificationAgent.build_user_message
+
+Run with:
+    python -m evaluation.benchmark --users 2000 --slots 100000 --duration 2 \\
+        --output bench.json [--baseline previous.json --tolerance 0.2]
+
+Add --trace to also collect per-stage span latencies (triage, scheduler,
+tool calls, notification) while the targets run.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from agents.notification_agent import NotificationAgent
+from agents.orchestrator_agent import OrchestratorAgent
+from agents.scheduler_agent import SchedulerAgent, SchedulerResult
+from agents.triage_agent import TriageAgent
+from evaluation.synthetic import generate_slots
+from tools.calendar_tool import CalendarTool
+from tools.clinic_scheduler_tool import ClinicSchedulerTool
+from tools.slot_index import SlotIndex
+from tools.tracing import InMemoryHistogramExporter, tracer
+
+
+DEPARTMENT_WORDS = {
+    "Cardiology": ["cardiology", "heart"],
+    "Dermatology": ["dermatology", "skin"],
+    "ENT": ["ENT", "ear"],
+    "General": ["general", "checkup"],
+}
+TIME_WORDS = {"morning": "in the morning", "afternoon": "in the afternoon", "evening": "in the evening", "any": ""}
+TEMPLATES = {
+    "book": ["I need a {dep} appointment {tod}", "Please book {dep} {tod}", "Can I see a doctor for {dep} {tod}"],
+    "reschedule": ["Please reschedule my appointment {tod}", "Can I change my {dep} visit {tod}"],
+    "cancel": ["Cancel my appointment", "Please cancel my {dep} visit"],
+}
+
+
+@dataclass
+class Conversation:
+    user_id: str
+    messages: List[Tuple[str, str]]  # (intent, message)
+
+
+def generate_population(users: int, seed: int = 1) -> List[Conversation]:
+    """
+    Each synthetic user books, then sometimes reschedules and/or cancels.
+    """
+    rng = random.Random(seed)
+    population = []
+    for n in range(users):
+        department = rng.choice(list(DEPARTMENT_WORDS))
+        flow = ["book"]
+        if rng.random() < 0.4:
+            flow.append("reschedule")
+        if rng.random() < 0.3:
+            flow.append("cancel")
+        messages = []
+        for intent in flow:
+            text = rng.choice(TEMPLATES[intent]).format(
+                dep=rng.choice(DEPARTMENT_WORDS[department]),
+                tod=TIME_WORDS[rng.choice(list(TIME_WORDS))],
+            )
+            messages.append((intent, " ".join(text.split())))
+        population.append(Conversation(user_id=f"user-{n}", messages=messages))
+    return population
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies: Dict[str, List[float]], elapsed: float) -> Dict[str, Dict[str, float]]:
+    summary = {}
+    for label, values in sorted(latencies.items()):
+        values.sort()
+        summary[label] = {
+            "count": len(values),
+            "throughput_per_sec": len(values) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+        }
+    return summary
+
+
+def drive(operations: Callable[[], Tuple[str, Callable[[], object]]], duration: float) -> Dict[str, Dict[str, float]]:
+    """
+    Repeatedly take (label, call) from `operations` and time each call until
+    `duration` seconds have passed.
+    """
+    latencies: Dict[str, List[float]] = {}
+    clock = time.perf_counter
+    start = clock()
+    deadline = start + duration
+    while True:
+        now = clock()
+        if now >= deadline:
+            break
+        label, call = operations()
+        t0 = clock()
+        call()
+        latencies.setdefault(label, []).append(clock() - t0)
+    return summarize(latencies, clock() - start)
+
+
+def build_scheduler_agent(slots: int, seed: int) -> SchedulerAgent:
+    scheduler_tool = ClinicSchedulerTool(slot_store=SlotIndex(generate_slots(slots, seed=seed)))
+    return SchedulerAgent(scheduler_tool=scheduler_tool, calendar_tool=CalendarTool())
+
+
+def bench_orchestrator(population: List[Conversation], slots: int, duration: float, seed: int):
+    orchestrator = OrchestratorAgent(scheduler_agent=build_scheduler_agent(slots, seed))
+
+    def operations():
+        # Walk conversations in order so reschedules/cancels follow bookings
+        for conversation in population:
+            for intent, message in conversation.messages:
+                yield intent, (lambda u=conversation.user_id, m=message: orchestrator.handle_user_message(u, m))
+
+    stream = _cycle(operations)
+    return drive(lambda: next(stream), duration)
+
+
+def bench_triage(population: List[Conversation], duration: float):
+    triage_agent = TriageAgent()
+    messages = [(intent, message) for c in population for intent, message in c.messages]
+
+    def operations():
+        for intent, message in messages:
+            yield intent, (lambda m=message: triage_agent.triage(m, {}))
+
+    stream = _cycle(operations)
+    return drive(lambda: next(stream), duration)
+
+
+def bench_scheduler(population: List[Conversation], slots: int, duration: float, seed: int):
+    agent = build_scheduler_agent(slots, seed)
+    rng = random.Random(seed)
+    departments = list(DEPARTMENT_WORDS)
+    times = list(TIME_WORDS)
+
+    def operations():
+        while True:
+            for conversation in population:
+                request = {"department": rng.choice(departments), "time_of_day": rng.choice(times)}
+                yield "book", (lambda u=conversation.user_id, r=request: agent.book_appointment(u, r, {}))
+
+    stream = operations()
+    return drive(lambda: next(stream), duration)
+
+
+def bench_tools(population: List[Conversation], slots: int, duration: float, seed: int):
+    scheduler_tool = ClinicSchedulerTool(slot_store=SlotIndex(generate_slots(slots, seed=seed)))
+    calendar_tool = CalendarTool()
+    rng = random.Random(seed)
+    sample = scheduler_tool.find_available_slots("Cardiology", "evening")[:200]
+    for conversation in population[:500]:
+        calendar_tool.add_appointment(conversation.user_id, rng.choice(sample))
+    departments = list(DEPARTMENT_WORDS)
+    times = [t for t in TIME_WORDS if t != "any"]
+
+    def operations():
+        while True:
+            dep, tod = rng.choice(departments), rng.choice(times)
+            yield "find_available_slots", (lambda d=dep, t=tod: scheduler_tool.find_available_slots(d, t))
+            user = rng.choice(population[:500]).user_id
+            yield "first_free_slot", (lambda u=user: calendar_tool.first_free_slot(u, sample))
+
+    stream = operations()
+    return drive(lambda: next(stream), duration)
+
+
+def bench_notification(duration: float):
+    notification_agent = NotificationAgent()
+    triage_result = TriageAgent().triage("book cardiology in the evening", {})
+    slot = next(generate_slots(1))
+    result = SchedulerResult(success=True, message="ok", appointment_id="a-1", slot=slot)
+
+    def operations():
+        while True:
+            for intent in ("book", "reschedule", "cancel"):
+                yield intent, (lambda i=intent: notification_agent.build_user_message(i, triage_result, result))
+
+    stream = operations()
+    return drive(lambda: next(stream), duration)
+
+
+def _cycle(factory):
+    while True:
+        yield from factory()
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    List regressions: throughput down or p95 latency up by more than `tolerance`.
+    """
+    regressions = []
+    for target, labels in results["targets"].items():
+        for label, current in labels.items():
+            previous = baseline.get("targets", {}).get(target, {}).get(label)
+            if not previous:
+                continue
+            name = f"{target}/{label}"
+            if current["throughput_per_sec"] < previous["throughput_per_sec"] * (1 - tolerance):
+                regressions.append(
+                    f"{name}: throughput {previous['throughput_per_sec']:.1f} -> {current['throughput_per_sec']:.1f}/s"
+                )
+            if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{name}: p95 {previous['p95_ms']:.3f} -> {current['p95_ms']:.3f} ms")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="CareFlow benchmark harness")
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--slots", type=int, default=100_000)
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per target")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--targets", default="orchestrator,triage,scheduler,tools,notification")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", help="compare against a previous JSON result")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--trace", action="store_true", help="report per-stage span latencies")
+    args = parser.parse_args(argv)
+
+    population = generate_population(args.users, args.seed)
+    runners = {
+        "orchestrator": lambda: bench_orchestrator(population, args.slots, args.duration, args.seed),
+        "triage": lambda: bench_triage(population, args.duration),
+        "scheduler": lambda: bench_scheduler(population, args.slots, args.duration, args.seed),
+        "tools": lambda: bench_tools(population, args.slots, args.duration, args.seed),
+        "notification": lambda: bench_notification(args.duration),
+    }
+
+    results = {
+        "config": {
+            "users": args.users,
+            "slots": args.slots,
+            "duration": args.duration,
+            "seed": args.seed,
+            "python": platform.python_version(),
+        },
+        "targets": {},
+    }
+
+    histogram = None
+    if args.trace:
+        histogram = InMemoryHistogramExporter()
+        tracer.enable(histogram)
+
+    print(f"{'target/label':<36}{'count':>9}{'ops/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for target in args.targets.split(","):
+        summary = runners[target]()
+        results["targets"][target] = summary
+        for label, stats in summary.items():
+            print(
+                f"{target + '/' + label:<36}{stats['count']:>9}{stats['throughput_per_sec']:>12.1f}"
+                f"{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+            )
+
+    if histogram is not None:
+        tracer.disable()
+        results["stages"] = histogram.summary()
+        print(f"\n{'stage':<44}{'count':>9}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, stats in results["stages"].items():
+            print(
+                f"{name:<44}{stats['count']:>9}{stats['mean_ms']:>10.3f}"
+                f"{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nNo regressions against baseline.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Startup profile: how long a fresh process takes to answer its first message.
+
+Each run starts a new interpreter (like a CLI invocation or a freshly
+forked worker) and times, from inside it:
+- import: `from agents.orchestrator_agent import OrchestratorAgent`
+- construct: `OrchestratorAgent()`
+- first response: the first handle_user_message, including whatever
+  imports and sub-agent construction were deferred until then
+- total: the three above, i.e. everything CareFlow adds on top of the bare
+  interpreter
+
+The bare interpreter start-up (`python -c pass`) and the whole process's
+wall time are reported alongside for reference. One extra run with
+`-X importtime` lists the slowest modules CareFlow loads.
+
+Medians over --runs are reported against --budget-ms (on total) for
+reference only: wall-clock times swing too much between runs and machines
+to decide pass or fail. What is checked is which heavy modules load:
+none of DEFERRED_MODULES may be imported before the first message, and
+none of SYNC_UNUSED_MODULES while answering it. A violation exits with
+status 1, so the command doubles as a regression check
+(evaluation.test_scenarios runs it).
+
+Run with:
+    python -m evaluation.profile_startup [--runs 5] [--budget-ms 100] [--message "..."]
+"""
+
+from typing import Dict, List, Optional, Set, Tuple
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MESSAGE = "I need a cardiology appointment in the evening"
+DEFAULT_BUDGET_MS = 100.0
+
+# Loaded lazily, only by the code paths that need them: none may be
+# imported by importing and constructing the orchestrator
+DEFERRED_MODULES = ("asyncio", "json", "sqlite3", "uuid")
+# Not needed to answer a message synchronously (a booking does load uuid)
+SYNC_UNUSED_MODULES = ("asyncio", "sqlite3")
+
+# Runs in the child. Nothing but `time` is imported before the clock starts.
+_CHILD = """
+import sys, time
+watched = sys.argv[2].split(",")
+t0 = time.perf_counter()
+from agents.orchestrator_agent import OrchestratorAgent
+t1 = time.perf_counter()
+orchestrator = OrchestratorAgent()
+t2 = time.perf_counter()
+at_startup = [name for name in watched if name in sys.modules]
+response = orchestrator.handle_user_message("startup-probe", sys.argv[1])
+t3 = time.perf_counter()
+after_response = [name for name in watched if name in sys.modules]
+modules = len(sys.modules)
+import json
+print(json.dumps({"import": t1 - t0, "construct": t2 - t1, "first_response": t3 - t2,
+                  "modules": modules, "response": response,
+                  "at_startup": at_startup, "after_response": after_response}))
+"""
+_WATCHED = ",".join(sorted(set(DEFERRED_MODULES) | set(SYNC_UNUSED_MODULES)))
+
+
+def _run(args: List[str]) -> Tuple[float, subprocess.CompletedProcess]:
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return time.perf_counter() - start, completed
+
+
+def _import_times(stderr: str) -> Dict[str, int]:
+    """
+    Parse `-X importtime` output into {module: self time in microseconds}.
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():
+            times[name.strip()] = int(self_us)
+    return times
+
+
+def profile(message: str, runs: int) -> Dict[str, float]:
+    """
+    Median timings in milliseconds over `runs` fresh processes.
+    """
+    # Warm-up: writes .pyc files so the first measured run isn't compiling
+    _run(["-c", _CHILD, message, _WATCHED])
+
+    samples: Dict[str, List[float]] = {
+        "interpreter": [], "import": [], "construct": [], "first_response": [], "total": [], "process": [],
+    }
+    for _ in range(runs):
+        elapsed, _ = _run(["-c", "pass"])
+        samples["interpreter"].append(elapsed)
+        elapsed, completed = _run(["-c", _CHILD, message, _WATCHED])
+        result = json.loads(completed.stdout)
+        for key in ("import", "construct", "first_response"):
+            samples[key].append(result[key])
+        samples["total"].append(result["import"] + result["construct"] + result["first_response"])
+        samples["process"].append(elapsed)
+    return {key: statistics.median(values) * 1000 for key, values in samples.items()}
+
+
+def slowest_imports(message: str, limit: int) -> List[Tuple[str, int]]:
+    """
+    Modules CareFlow loads (beyond the bare interpreter's), slowest first.
+    """
+    _, bare = _run(["-X", "importtime", "-c", "pass"])
+    baseline: Set[str] = set(_import_times(bare.stderr))
+    _, completed = _run(["-X", "importtime", "-c", _CHILD, message, _WATCHED])
+    loaded = _import_times(completed.stderr)
+    ranked = sorted(
+        ((name, us) for name, us in loaded.items() if name not in baseline), key=lambda item: -item[1]
+    )
+    return ranked[:limit]
+
+
+def import_violations(message: str) -> List[str]:
+    """
+    Heavy modules a fresh process loaded too early: DEFERRED_MODULES before
+    the first message, SYNC_UNUSED_MODULES while answering it. The same on
+    every run of the same tree, unlike the timings.
+    """
+    _, completed = _run(["-c", _CHILD, message, _WATCHED])
+    result = json.loads(completed.stdout)
+    violations = [f"{name} imported at startup" for name in result["at_startup"] if name in DEFERRED_MODULES]
+    violations += [
+        f"{name} imported by the first response"
+        for name in result["after_response"]
+        if name in SYNC_UNUSED_MODULES and name not in result["at_startup"]
+    ]
+    return violations
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="CareFlow startup profile")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="reference for the median total (reported, not enforced)")
+    parser.add_argument("--message", default=DEFAULT_MESSAGE, help="first message to answer")
+    parser.add_argument("--imports", type=int, default=10, help="slowest imports to list (0 to skip)")
+    args = parser.parse_args(argv)
+
+    timings = profile(args.message, args.runs)
+    print(f"Startup to first response, median of {args.runs} fresh processes")
+    print(f"  interpreter     {timings['interpreter']:>8.1f} ms   (python -c pass)")
+    print(f"  import          {timings['import']:>8.1f} ms")
+    print(f"  construct       {timings['construct']:>8.1f} ms")
+    print(f"  first response  {timings['first_response']:>8.1f} ms")
+    print(f"  total           {timings['total']:>8.1f} ms   (budget {args.budget_ms:.0f} ms)")
+    print(f"  process         {timings['process']:>8.1f} ms   (wall time of the whole process)")
+
+    if args.imports:
+        print("\nSlowest imports (self time):")
+        for name, us in slowest_imports(args.message, args.imports):
+            print(f"  {us / 1000:>6.2f} ms  {name}")
+
+    if timings["total"] > args.budget_ms:
+        print(f"\nover budget (not enforced): {timings['total']:.1f} ms > {args.budget_ms:.0f} ms")
+
+    violations = import_violations(args.message)
+    for violation in violations:
+        print(f"\nEAGER IMPORT: {violation}")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
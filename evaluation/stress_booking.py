@@ -0,0 +1,81 @@
+"""
+Multi-threaded booking stress test.
+
+Many threads book through SchedulerAgent.book_appointment against one shared
+ClinicSchedulerTool. Afterwards every slot must belong to at most one
+appointment, and the number of appointments must equal the number of slots
+marked booked. Bookings/sec is reported for each thread count.
+
+Run with:
+    python -m evaluation.stress_booking [slot_count]
+"""
+
+from collections import Counter
+import sys
+import threading
+import time
+
+from agents.scheduler_agent import SchedulerAgent
+from evaluation.synthetic import generate_slots
+from tools.calendar_tool import CalendarTool
+from tools.clinic_scheduler_tool import ClinicSchedulerTool
+from tools.slot_index import SlotIndex
+from tools.slot_table import SlotTable
+
+
+REQUESTS = [
+    {"department": "Cardiology", "time_of_day": "evening"},
+    {"department": "Dermatology", "time_of_day": "morning"},
+    {"department": "ENT", "time_of_day": "any"},
+    {"department": "General", "time_of_day": "afternoon"},
+]
+
+
+def run(store_factory, slot_count: int, threads: int, bookings_per_thread: int) -> float:
+    scheduler_tool = ClinicSchedulerTool(slot_store=store_factory(generate_slots(slot_count, days=3)))
+    calendar_tool = CalendarTool()
+    barrier = threading.Barrier(threads)
+
+    def worker(worker_id: int) -> None:
+        agent = SchedulerAgent(scheduler_tool=scheduler_tool, calendar_tool=calendar_tool)
+        barrier.wait()
+        for i in range(bookings_per_thread):
+            agent.book_appointment(
+                user_id=f"user-{worker_id}-{i}",
+                request_data=REQUESTS[(worker_id + i) % len(REQUESTS)],
+                session={},
+            )
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    # No slot may be held by two appointments
+    appointments = scheduler_tool._appointments.values()
+    per_slot = Counter(a["slot"]["slot_id"] for a in appointments if a["status"] == "booked")
+    doubles = [slot_id for slot_id, n in per_slot.items() if n > 1]
+    assert not doubles, f"double-booked slots: {doubles[:5]}"
+
+    booked_in_store = slot_count - len(scheduler_tool.find_available_slots("General", "any"))
+    assert booked_in_store == len(per_slot), (booked_in_store, len(per_slot))
+
+    return len(per_slot) / elapsed
+
+
+def main() -> None:
+    slot_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    bookings_per_thread = 400
+
+    for name, factory in [("SlotIndex", SlotIndex), ("SlotTable", SlotTable)]:
+        print(f"\n{name}: {slot_count:,} slots, {bookings_per_thread} bookings per thread")
+        for threads in (1, 2, 4, 8, 16):
+            rate = run(factory, slot_count, threads, bookings_per_thread)
+            print(f"  threads={threads:>2}  {rate:10.1f} bookings/sec  (no double bookings)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Synthetic data helpers for CareFlow benchmarks.
+
+Generates slot inventories that look like the mock data in
+ClinicSchedulerTool, but at configurable size.
+"""
+
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator
+import random
+
+
+DEPARTMENTS = ["Cardiology", "Dermatology", "ENT", "General"]
+LOCATIONS = ["Sunrise Clinic", "Downtown Medical Center", "Lakeside Hospital", "Northside Clinic"]
+TIMES = {
+    "morning": ["09:00", "09:30", "10:00", "10:30", "11:00", "11:30"],
+    "afternoon": ["13:00", "13:30", "14:00", "14:30", "15:00", "15:30"],
+    "evening": ["17:30", "18:00", "18:30", "19:00", "19:30"],
+}
+
+
+def generate_slots(
+    count: int,
+    seed: int = 42,
+    doctors_per_department: int = 25,
+    start_date: date = date(2026, 1, 1),
+    days: int = 180,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield `count` free slot dicts spread over doctors, locations and days.
+    """
+    rng = random.Random(seed)
+    doctors = []
+    for department in DEPARTMENTS:
+        for i in range(doctors_per_department):
+            doctors.append({
+                "doctor_id": f"doc-{department[:3].lower()}-{i}",
+                "doctor_name": f"Dr. {department[:3]}{i}",
+                "department": department,
+                "location": LOCATIONS[i % len(LOCATIONS)],
+            })
+
+    time_slots = [(tod, t) for tod, times in TIMES.items() for t in times]
+    for n in range(count):
+        doctor = rng.choice(doctors)
+        time_of_day, time = rng.choice(time_slots)
+        day = start_date + timedelta(days=rng.randrange(days))
+        yield {
+            "slot_id": f"slot-{n}",
+            "doctor_id": doctor["doctor_id"],
+            "doctor_name": doctor["doctor_name"],
+            "department": doctor["department"],
+            "date": day.isoformat(),
+            "time": time,
+            "time_of_day": time_of_day,
+            "location": doctor["location"],
+            "booked": False,
+        }
@@ -7,12 +7,72 @@ It verifies:
 - Booking a new appointment
 - Rescheduling an appointment
 - Canceling an appointment
+- Triage classification of known tricky messages
+- Availability counters staying in step with the slot store
+- Calendar entries following their appointment through reschedule and cancel
+- Reminders firing on time, and following reschedules and cancellations
+- Startup: sub-agents built lazily, heavy modules not imported until needed
+- Sharded scheduler answering like a single one, across shard moves
+- Batched triage matching plain triage, with duplicate messages merged
+- Recurring-rule slots matching the same slots listed out, through booking
+- Operation log recovery: reopen, torn final record, snapshot
+- Triage cache: no session data shared between users, expired rows purged
+- Session stores: reads keep a session alive, idle sessions dropped on put
+- SlotTable returning the same slots as SlotIndex, through booking and snapshots
+- Bulk booking: no slot booked twice, no calendar clashes, results in request order
+- Server: one slot booked through two workers at once is sold only once
+- Tracing: a booking's trace includes its slot lookup, sync and async
 
 Run with:
     python -m evaluation.test_scenarios
+
+Exits non-zero if any check fails.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import asyncio
+import gc
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+from agents.batching_triage import BatchingTriageAgent, FakeModelBackend
 from agents.orchestrator_agent import OrchestratorAgent
+from agents.reminder_dispatcher import ReminderDispatcher, StubSender, slot_start
+from agents.scheduler_agent import BookingRequest, SchedulerAgent
+from agents.session_store import InMemorySessionStore, SQLiteSessionStore
+from agents.triage_cache import CachedTriageAgent, SQLiteTriageCacheBackend
+from agents.triage_agent import TriageAgent
+from evaluation import profile_startup
+from evaluation.synthetic import DEPARTMENTS, TIMES, generate_slots
+from tools.slot_table import SlotTable, minutes_to_time, time_to_minutes
+from tools.calendar_tool import CalendarTool, slot_interval
+from tools.clinic_scheduler_tool import ClinicSchedulerTool
+from tools.oplog import LogStorage, _LogState
+from tools.recurring_slots import AvailabilityRule, RecurringSlotStore, parse_weekdays
+from tools.sharded_scheduler import ShardedScheduler, by_location_department
+from tools.slot_index import SlotIndex
+from tools.tracing import tracer
+from server import CareFlowServer
+
+
+# (message, expected intent, expected department, expected time_of_day)
+TRIAGE_REGRESSIONS = [
+    # "ent" inside "appointment" used to classify every booking as ENT
+    ("I need an appointment in the morning", "book", "General", "morning"),
+    ("Book a cardiology appointment", "book", "Cardiology", "any"),
+    # "appointment" used to win over the explicit verb
+    ("Please reschedule my appointment to the morning", "reschedule", "General", "morning"),
+    ("Cancel my appointment", "cancel", "General", "any"),
+    # "ear" inside "early", "nose" inside "diagnose"
+    ("Book an early slot to diagnose my skin rash", "book", "Dermatology", "any"),
+    ("I have an ENT problem, can I book after 5pm?", "book", "ENT", "evening"),
+    ("My ears hurt, I want to see a doctor", "book", "ENT", "any"),
+]
 
 
 def run_test(test_name, orchestrator, user_id, message):
@@ -23,6 +83,802 @@ def run_test(test_name, orchestrator, user_id, message):
     print(f"AGENT: {response}")
 
 
+def run_triage_regressions():
+    triage_agent = TriageAgent()
+    failures = 0
+    print("\n---------------------")
+    print("TRIAGE REGRESSIONS")
+    for message, intent, department, time_of_day in TRIAGE_REGRESSIONS:
+        result = triage_agent.triage(message, {})
+        actual = (result.intent, result.request_data["department"], result.request_data["time_of_day"])
+        expected = (intent, department, time_of_day)
+        status = "PASS" if actual == expected else "FAIL"
+        if actual != expected:
+            failures += 1
+        print(f"[{status}] {message!r} -> {actual}")
+    return failures
+
+
+def run_availability_checks():
+    """
+    Book, reschedule and cancel, then compare every counter with a count
+    of find_available_slots.
+    """
+    scheduler_tool = ClinicSchedulerTool(slot_store=SlotIndex(generate_slots(2_000, days=14)))
+    scheduler_agent = SchedulerAgent(scheduler_tool=scheduler_tool)
+    for i in range(300):
+        session = {}
+        request = {"department": DEPARTMENTS[i % 4], "time_of_day": list(TIMES)[i % 3]}
+        result = scheduler_agent.book_appointment(f"patient-{i}", request, session)
+        session["last_appointment_id"] = result.appointment_id
+        if i % 3 == 0:
+            scheduler_agent.reschedule_appointment(f"patient-{i}", {"department": "General"}, session)
+        if i % 5 == 0:
+            scheduler_agent.cancel_appointment(f"patient-{i}", {}, session)
+
+    failures = 0
+    print("\n---------------------")
+    print("AVAILABILITY COUNTERS")
+    week = ("2026-01-01", "2026-01-07")
+    # DEPARTMENTS includes "General", which also means "every department"
+    for department in DEPARTMENTS:
+        for time_of_day in list(TIMES) + ["any"]:
+            slots = scheduler_tool.find_available_slots(department, time_of_day)
+            in_week = [s for s in slots if week[0] <= s["date"] <= week[1]]
+            expected = (len(slots), len(in_week))
+            actual = (
+                scheduler_tool.count_available_slots(department, time_of_day),
+                scheduler_tool.count_available_slots(department, time_of_day, *week),
+            )
+            if actual != expected:
+                failures += 1
+                print(f"[FAIL] {department}/{time_of_day}: counters {actual}, slots {expected}")
+    status = "FAIL" if failures else "PASS"
+    print(f"[{status}] counters match find_available_slots")
+    return failures
+
+
+def run_calendar_checks():
+    """
+    Book two appointments, reschedule the first and cancel the second: the
+    calendar must hold exactly the rescheduled slot under its appointment id.
+    Rescheduling into a slot overlapping the appointment's own current time
+    must not count as a conflict. Two concurrent async bookings by one user
+    must not both get overlapping slots.
+    """
+    calendar_tool = CalendarTool()
+    scheduler_agent = SchedulerAgent(
+        scheduler_tool=ClinicSchedulerTool(slot_store=SlotIndex(generate_slots(500, days=7))),
+        calendar_tool=calendar_tool,
+    )
+    user_id = "calendar-patient"
+    first, second = {}, {}
+    booked = scheduler_agent.book_appointment(user_id, {"department": "Cardiology"}, first)
+    first["last_appointment_id"] = booked.appointment_id
+    other = scheduler_agent.book_appointment(user_id, {"department": "ENT"}, second)
+    second["last_appointment_id"] = other.appointment_id
+    moved = scheduler_agent.reschedule_appointment(user_id, {"department": "Dermatology"}, first)
+    scheduler_agent.cancel_appointment(user_id, {}, second)
+
+    expected = [(booked.appointment_id, moved.slot)]
+    actual = calendar_tool.list_appointments(user_id)
+    status = "PASS" if actual == expected and calendar_tool.next_appointment(user_id) == expected[0] else "FAIL"
+
+    overlapping = [
+        {
+            "slot_id": f"overlap-{time}", "doctor_id": "doc-1", "doctor_name": "Dr. Mehta",
+            "department": "Cardiology", "date": "2026-01-05", "time": time, "time_of_day": "evening",
+            "location": "Sunrise Clinic", "booked": False,
+        }
+        for time in ("18:30", "18:45")
+    ]
+    request = {"department": "Cardiology"}
+    agent = SchedulerAgent(scheduler_tool=ClinicSchedulerTool(slot_store=SlotIndex(dict(s) for s in overlapping)))
+    session = {"last_appointment_id": agent.book_appointment(user_id, request, {}).appointment_id}
+    moved_sync = agent.reschedule_appointment(user_id, request, session).success
+
+    agent = SchedulerAgent(scheduler_tool=ClinicSchedulerTool(slot_store=SlotIndex(dict(s) for s in overlapping)))
+
+    async def book_and_move():
+        booked = await agent.book_appointment_async(user_id, request, {})
+        session = {"last_appointment_id": booked.appointment_id}
+        return (await agent.reschedule_appointment_async(user_id, request, session)).success
+
+    moved_async = asyncio.run(book_and_move())
+    overlap_status = "PASS" if moved_sync and moved_async else "FAIL"
+
+    agent = SchedulerAgent(scheduler_tool=ClinicSchedulerTool(slot_store=SlotIndex(dict(s) for s in overlapping)))
+
+    async def book_twice():
+        return await asyncio.gather(*(agent.book_appointment_async(user_id, request, {}) for _ in range(2)))
+
+    concurrent = [result.success for result in asyncio.run(book_twice())]
+    concurrent_status = "PASS" if sorted(concurrent) == [False, True] else "FAIL"
+
+    print("\n---------------------")
+    print("CALENDAR")
+    print(f"[{status}] calendar keeps one entry per appointment through reschedule and cancel")
+    print(f"[{overlap_status}] reschedule may overlap the appointment's own current time (sync and async)")
+    print(f"[{concurrent_status}] concurrent async bookings by one user don't overlap")
+    return (status != "PASS") + (overlap_status != "PASS") + (concurrent_status != "PASS")
+
+
+def run_reminder_checks():
+    """
+    Book, reschedule and cancel with a reminder dispatcher, then step time
+    forward an hour at a time: every reminder must be for a still-booked
+    appointment's current slot, sent within the hour it fell due.
+    """
+    sender = StubSender()
+    clock = datetime(2025, 12, 31)
+    reminders = ReminderDispatcher(sender=sender, now=clock)
+    scheduler_tool = ClinicSchedulerTool(slot_store=SlotIndex(generate_slots(1_000, days=14)))
+    scheduler_agent = SchedulerAgent(scheduler_tool=scheduler_tool, reminders=reminders)
+    for i in range(100):
+        session = {}
+        result = scheduler_agent.book_appointment(f"patient-{i}", {"department": DEPARTMENTS[i % 4]}, session)
+        session["last_appointment_id"] = result.appointment_id
+        if i % 4 == 0:
+            scheduler_agent.reschedule_appointment(f"patient-{i}", {"department": "General"}, session)
+        if i % 5 == 0:
+            scheduler_agent.cancel_appointment(f"patient-{i}", {}, session)
+
+    failures = 0
+    while clock < datetime(2026, 1, 20):
+        clock += timedelta(hours=1)
+        first = len(sender.sent)
+        reminders.advance(clock)
+        for notification in sender.sent[first:]:
+            appointment = scheduler_tool.get_appointment(notification.appointment_id)
+            due = slot_start(appointment["slot"]) - timedelta(hours=int(notification.kind[:-1]))
+            if appointment["status"] != "booked" or not clock - timedelta(hours=1) < due <= clock:
+                failures += 1
+
+    expected = 2 * sum(1 for _ in scheduler_tool.booked_appointments())
+    if len(sender.sent) != expected:
+        failures += 1
+    status = "FAIL" if failures else "PASS"
+    print("\n---------------------")
+    print("REMINDERS")
+    print(f"[{status}] {len(sender.sent)} reminders sent on time for booked appointments (expected {expected})")
+    return failures
+
+
+def run_startup_checks():
+    """
+    A message triage can't place must not build the scheduler, and a fresh
+    process must not load heavy modules before they are needed (see
+    evaluation/profile_startup.py; its timings are reported, not checked).
+    """
+    orchestrator = OrchestratorAgent()
+    orchestrator.handle_user_message("startup-patient", "hello")
+    lazy = orchestrator._scheduler_agent is None and orchestrator._notification_agent is None
+
+    print("\n---------------------")
+    print("STARTUP")
+    print(f"[{'PASS' if lazy else 'FAIL'}] scheduler and notification agents not built for an unplaced message")
+    imports_deferred = profile_startup.main(["--runs", "3", "--imports", "0"]) == 0
+    print(
+        f"[{'PASS' if imports_deferred else 'FAIL'}] {', '.join(profile_startup.DEFERRED_MODULES)} not loaded at startup;"
+        f" {', '.join(profile_startup.SYNC_UNUSED_MODULES)} not loaded by a sync first response"
+    )
+    return (not lazy) + (not imports_deferred)
+
+
+def run_sharding_checks():
+    """
+    A ShardedScheduler must find the same free slots, date by date, as one
+    ClinicSchedulerTool over the same inventory, and an appointment must
+    keep its id when rescheduled into another shard.
+    """
+    slots = list(generate_slots(2_000, days=14))
+    single = ClinicSchedulerTool(slot_store=SlotIndex(dict(slot) for slot in slots))
+    sharded = ShardedScheduler(shards=3, slots=(dict(slot) for slot in slots), partition_key=by_location_department)
+    try:
+        same = all(
+            [(day, sorted(s["slot_id"] for s in found)) for day, found in single.find_available_slots_by_date(dep, tod)]
+            == [(day, sorted(s["slot_id"] for s in found)) for day, found in sharded.find_available_slots_by_date(dep, tod)]
+            for dep in DEPARTMENTS for tod in ("any", *TIMES)
+        )
+        first_day = min(slot["date"] for slot in slots)
+        end = (datetime.strptime(first_day, "%Y-%m-%d") + timedelta(days=4)).strftime("%Y-%m-%d")
+        windowed = all(
+            sorted(s["slot_id"] for s in single.find_available_slots(dep, "any", first_day, end))
+            == sorted(s["slot_id"] for s in sharded.find_available_slots(dep, "any", first_day, end))
+            for dep in DEPARTMENTS
+        )
+
+        scheduler_agent = SchedulerAgent(scheduler_tool=sharded)
+        session = {}
+        booked = scheduler_agent.book_appointment("shard-patient", {"department": "Cardiology"}, session)
+        session["last_appointment_id"] = booked.appointment_id
+        moved = scheduler_agent.reschedule_appointment("shard-patient", {"department": "ENT"}, session)
+        appointment = sharded.get_appointment(booked.appointment_id)
+        follows = (
+            moved.success
+            and appointment["slot"]["slot_id"] == moved.slot["slot_id"]
+            and [a["id"] for a in sharded.booked_appointments()] == [booked.appointment_id]
+            and sharded.count_available_slots() == single.count_available_slots() - 1
+        )
+    finally:
+        sharded.close()
+
+    print("\n---------------------")
+    print("SHARDING")
+    print(f"[{'PASS' if same else 'FAIL'}] sharded lookups match a single scheduler")
+    print(f"[{'PASS' if windowed else 'FAIL'}] sharded lookups within a date window match a single scheduler")
+    print(f"[{'PASS' if follows else 'FAIL'}] appointment keeps its id when rescheduled across shards")
+    return (not same) + (not windowed) + (not follows)
+
+
+def run_batching_checks():
+    """
+    Concurrent triage through BatchingTriageAgent (async and from threads)
+    must give the same answers as TriageAgent, in fewer model calls, with
+    repeated messages merged. Finished event loops must not be kept alive,
+    and close() must release triage() callers still waiting.
+    """
+    messages = [message for message, *_ in TRIAGE_REGRESSIONS] * 20
+    expected = [TriageAgent().triage(message, {}) for message in messages]
+
+    backend = FakeModelBackend(call_latency=0.005, per_message_latency=0)
+    agent = BatchingTriageAgent(backend, window_ms=2)
+
+    async def triage_all():
+        return await asyncio.gather(*(agent.triage_async(message, {}) for message in messages))
+
+    batched = asyncio.run(triage_all())
+    async_calls = backend.calls
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        threaded = list(pool.map(lambda message: agent.triage(message, {}), messages))
+    agent.close()
+
+    same = batched == expected and threaded == expected
+    stats = agent.stats()
+    print("\n---------------------")
+    print("TRIAGE BATCHING")
+    print(f"[{'PASS' if same else 'FAIL'}] batched triage matches TriageAgent for {len(messages)} messages")
+    merged = async_calls == 1 and stats["coalesced"] > 0
+    print(
+        f"[{'PASS' if merged else 'FAIL'}] {len(messages)} concurrent requests sent as {async_calls} model call(s), "
+        f"{stats['coalesced']} duplicates merged overall"
+    )
+
+    for _ in range(5):
+        asyncio.run(triage_all())
+    gc.collect()
+    released_loops = len(agent._states) == 0 and len(backend._limits) == 0
+
+    # A loop collected on a thread that holds the agent's lock (its
+    # finalizer then runs there) must not deadlock, and keeps its counts
+    requests_before = agent.stats()["requests"]
+    loops = [asyncio.new_event_loop()]
+    loops[0].run_until_complete(agent.triage_async(messages[0], {}))
+    loops[0].close()
+
+    def collect_under_lock():
+        with agent._lock:
+            loops.clear()
+            gc.collect()
+
+    collector = threading.Thread(target=collect_under_lock, daemon=True)
+    collector.start()
+    collector.join(timeout=2)
+    released_loops = (
+        released_loops and not collector.is_alive() and agent.stats()["requests"] == requests_before + 1
+    )
+
+    slow = BatchingTriageAgent(FakeModelBackend(call_latency=10), window_ms=1)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        waiting = [pool.submit(slow.triage, message, {}) for message in messages[:4]]
+        time.sleep(0.1)
+        slow.close()
+        released_callers = all(isinstance(call.exception(timeout=2), RuntimeError) for call in waiting)
+    released = released_loops and released_callers
+    print(f"[{'PASS' if released else 'FAIL'}] finished event loops released, close() fails waiting callers")
+    return (not same) + (not merged) + (not released)
+
+
+RECURRING_RULES = [
+    AvailabilityRule("mehta-eve", "doc-1", "Dr. Mehta", "Cardiology", "Sunrise Clinic",
+                     parse_weekdays("Mon-Fri"), "18:00", "20:00"),
+    AvailabilityRule("rao-am", "doc-2", "Dr. Rao", "Dermatology", "Downtown Medical Center",
+                     parse_weekdays("Mon,Wed,Sat"), "09:00", "12:30", slot_minutes=45),
+    AvailabilityRule("kumar-day", "doc-4", "Dr. Kumar", "General", "Sunrise Clinic",
+                     parse_weekdays("Tue-Sat"), "11:00", "16:00", slot_minutes=20, valid_until="2026-02-15"),
+    AvailabilityRule("shah-eve", "doc-3", "Dr. Shah", "ENT", "Sunrise Clinic",
+                     parse_weekdays("Thu"), "16:30", "19:00", valid_from="2026-01-20"),
+]
+
+
+def run_recurring_checks():
+    """
+    A RecurringSlotStore must answer lookups and counts exactly like a
+    SlotIndex holding every slot its rules describe, and keep doing so
+    through bookings and cancellations.
+    """
+    start, days = datetime(2026, 1, 1), 60
+    listed = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        iso = day.date().isoformat()
+        for rule in RECURRING_RULES:
+            if day.weekday() not in rule.weekdays or not (rule.valid_from or iso) <= iso <= (rule.valid_until or iso):
+                continue
+            end = time_to_minutes(rule.end_time) - rule.slot_minutes
+            for minutes in range(time_to_minutes(rule.start_time), end + 1, rule.slot_minutes):
+                time = minutes_to_time(minutes)
+                listed.append({
+                    "slot_id": f"{rule.rule_id}/{iso}/{time}",
+                    "doctor_id": rule.doctor_id,
+                    "doctor_name": rule.doctor_name,
+                    "department": rule.department,
+                    "location": rule.location,
+                    "date": iso,
+                    "time": time,
+                    "time_of_day": "morning" if minutes < 720 else "afternoon" if minutes < 1020 else "evening",
+                    "booked": False,
+                })
+    listed.sort(key=lambda slot: (slot["date"], slot["time"]))
+
+    single = ClinicSchedulerTool(slot_store=SlotIndex(listed))
+    recurring = ClinicSchedulerTool(
+        slot_store=RecurringSlotStore(RECURRING_RULES, start_date="2026-01-01", horizon_days=days)
+    )
+
+    def same_answers():
+        window = ("2026-01-10", "2026-01-24")
+        for dep in DEPARTMENTS:
+            for tod in ("any", *TIMES):
+                by_date = [(day, {s["slot_id"] for s in found}) for day, found in single.find_available_slots_by_date(dep, tod)]
+                if by_date != [
+                    (day, {s["slot_id"] for s in found}) for day, found in recurring.find_available_slots_by_date(dep, tod)
+                ]:
+                    return False
+                if {s["slot_id"] for s in single.find_available_slots(dep, tod, *window)} != {
+                    s["slot_id"] for s in recurring.find_available_slots(dep, tod, *window)
+                }:
+                    return False
+                if single.count_available_slots(dep, tod, *window) != recurring.count_available_slots(dep, tod, *window):
+                    return False
+        return (
+            single.availability_summary() == recurring.availability_summary()
+            and single.count_available_by_doctor("doc-4") == recurring.count_available_by_doctor("doc-4")
+        )
+
+    matches = same_answers()
+
+    single_agent, recurring_agent = SchedulerAgent(scheduler_tool=single), SchedulerAgent(scheduler_tool=recurring)
+    sessions = [{}, {}]
+    for request in ({"department": "Cardiology", "time_of_day": "evening"}, {"department": "General"}):
+        for agent, session in zip((single_agent, recurring_agent), sessions):
+            booked = agent.book_appointment("recurring-patient", request, session)
+            session["last_appointment_id"] = booked.appointment_id
+    moved = [
+        agent.reschedule_appointment("recurring-patient", {"department": "Dermatology", "time_of_day": "morning"}, session)
+        for agent, session in zip((single_agent, recurring_agent), sessions)
+    ]
+    cancelled = recurring_agent.cancel_appointment("recurring-patient", {}, sessions[1]).success
+    single_agent.cancel_appointment("recurring-patient", {}, sessions[0])
+    follows = (
+        all(result.success for result in moved)
+        and moved[0].slot["slot_id"] == moved[1].slot["slot_id"]
+        and cancelled
+        and recurring.get_slot(moved[1].slot["slot_id"])["booked"] is False
+        and recurring._slot_store.booked_count() == 1
+        and same_answers()
+    )
+
+    print("\n---------------------")
+    print("RECURRING SLOTS")
+    print(f"[{'PASS' if matches else 'FAIL'}] rule-generated slots match {len(listed)} listed slots")
+    print(f"[{'PASS' if follows else 'FAIL'}] bookings, reschedules and cancellations stay in step, only bookings stored")
+    return (not matches) + (not follows)
+
+
+def run_oplog_checks():
+    """
+    Reopen a LogStorage after bookings (one by a user id containing the
+    record field separator), after a torn final record and after a
+    snapshot: scheduler and calendar must come back unchanged, the snapshot
+    must drop the canceled appointment, and reopening must not add segments.
+    A compaction that fails on disk must be raised by snapshot() and leave
+    no temp file or lost records behind.
+    """
+    users = ["evil\x1fuser", "plain-user", "gone-user"]
+
+    def open_tools(directory):
+        storage = LogStorage(directory)
+        scheduler_tool = ClinicSchedulerTool(slot_store=SlotIndex(), storage=storage)
+        return storage, scheduler_tool, CalendarTool(storage=storage)
+
+    def state(scheduler_tool, calendar_tool):
+        return (
+            sorted((a["id"], a["user_id"], a["slot"]["slot_id"]) for a in scheduler_tool.booked_appointments()),
+            scheduler_tool.availability_summary(),
+            [calendar_tool.list_appointments(user_id) for user_id in users],
+        )
+
+    def segments(directory):
+        return sorted(name for name in os.listdir(directory) if name.startswith("log."))
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage, scheduler_tool, calendar_tool = open_tools(directory)
+        scheduler_tool.add_slots(generate_slots(300, days=7))
+        scheduler_agent = SchedulerAgent(scheduler_tool=scheduler_tool, calendar_tool=calendar_tool)
+        for user_id in users:
+            scheduler_agent.book_appointment(user_id, {"department": "General"}, {})
+        gone = scheduler_agent.book_appointment("gone-user", {"department": "ENT"}, {})
+        scheduler_agent.cancel_appointment("gone-user", {}, {"last_appointment_id": gone.appointment_id})
+        expected = state(scheduler_tool, calendar_tool)
+        storage.close()
+        written = segments(directory)
+
+        storage, scheduler_tool, calendar_tool = open_tools(directory)
+        reopened = state(scheduler_tool, calendar_tool) == expected
+        storage.close()
+
+        last = os.path.join(directory, written[-1])
+        size = os.path.getsize(last)
+        with open(last, "ab") as f:
+            # Header promising 100 bytes, then a crash after 7 of them
+            f.write(struct.pack("<IIB", 100, 0, 4) + b"partial")
+        storage, scheduler_tool, calendar_tool = open_tools(directory)
+        torn = state(scheduler_tool, calendar_tool) == expected and os.path.getsize(last) == size
+        storage.close()
+        same_segments = segments(directory) == written
+
+        storage = LogStorage(directory)
+        storage.snapshot()
+        storage.close()
+        storage, scheduler_tool, calendar_tool = open_tools(directory)
+        compacted = (
+            state(scheduler_tool, calendar_tool) == expected
+            and scheduler_tool.get_appointment(gone.appointment_id) is None
+            and len(segments(directory)) == 1
+        )
+        storage.close()
+
+        def disk_full(self):
+            yield next(records(self))
+            raise OSError(28, "No space left on device")
+
+        storage, scheduler_tool, calendar_tool = open_tools(directory)
+        scheduler_agent = SchedulerAgent(scheduler_tool=scheduler_tool, calendar_tool=calendar_tool)
+        scheduler_agent.book_appointment("plain-user", {"department": "ENT"}, {})
+        expected = state(scheduler_tool, calendar_tool)
+        records, _LogState.records = _LogState.records, disk_full
+        try:
+            storage.snapshot()
+            reported = False
+        except IOError:
+            reported = True
+        finally:
+            _LogState.records = records
+        storage.close()
+        storage, scheduler_tool, calendar_tool = open_tools(directory)
+        failed_compaction = (
+            reported
+            and not os.path.exists(os.path.join(directory, "snapshot.tmp"))
+            and state(scheduler_tool, calendar_tool) == expected
+        )
+        storage.close()
+
+    print("\n---------------------")
+    print("OPERATION LOG")
+    print(f"[{'PASS' if reopened else 'FAIL'}] state survives reopening, with a separator inside a user id")
+    print(f"[{'PASS' if torn and same_segments else 'FAIL'}] torn final record dropped, reopening adds no segments")
+    print(f"[{'PASS' if compacted else 'FAIL'}] snapshot keeps the state and drops the canceled appointment")
+    print(f"[{'PASS' if failed_compaction else 'FAIL'}] failed compaction is raised, leaves no temp file and loses nothing")
+    return (not reopened) + (not (torn and same_segments)) + (not compacted) + (not failed_compaction)
+
+
+class SessionEchoTriageAgent(TriageAgent):
+    """
+    Triage that copies session data into its result, as a triage step
+    reading the patient's profile would.
+    """
+
+    def triage(self, message, session):
+        result = super().triage(message, session)
+        result.request_data["patient_name"] = session.get("patient_name")
+        return result
+
+
+def run_triage_cache_checks():
+    """
+    Two users send the same message through CachedTriageAgents sharing a
+    SQLite backend: the second user's hits (local and shared) must not
+    carry the first user's session fields, and editing a returned result
+    must not change what is cached. Expired shared rows must be purged.
+    """
+    message = "Book a cardiology appointment in the evening"
+    with tempfile.TemporaryDirectory() as directory:
+        backend = SQLiteTriageCacheBackend(os.path.join(directory, "triage.db"), purge_every=10)
+        first = CachedTriageAgent(SessionEchoTriageAgent(), backend=backend, session_fields=("patient_name",))
+        second = CachedTriageAgent(SessionEchoTriageAgent(), backend=backend, session_fields=("patient_name",))
+
+        own = first.triage(message, {"patient_name": "Asha"})
+        own.request_data["department"] = "Edited"
+        local_hit = first.triage(message, {"patient_name": "Ravi"})
+        shared_hit = second.triage(message, {"patient_name": "Ravi"})
+        isolated = (
+            own.request_data["patient_name"] == "Asha"
+            and "patient_name" not in local_hit.request_data
+            and "patient_name" not in shared_hit.request_data
+            and local_hit.request_data["department"] == shared_hit.request_data["department"] == "Cardiology"
+            and second.stats()["shared_hits"] == 1
+        )
+
+        short_lived = CachedTriageAgent(backend=backend, ttl_seconds=0.05)
+        # Writes 2-9 expire; the 10th triggers the purge
+        for i in range(8):
+            short_lived.triage(f"book ent appointment {i}", {})
+        time.sleep(0.1)
+        short_lived.triage("book ent appointment 8", {})
+        purged = len(backend) == 2  # the message above (long TTL) and the newest short-lived one
+        backend.close()
+
+    print("\n---------------------")
+    print("TRIAGE CACHE")
+    print(f"[{'PASS' if isolated else 'FAIL'}] cached hits carry no other user's session fields")
+    print(f"[{'PASS' if purged else 'FAIL'}] expired shared cache rows are purged")
+    return (not isolated) + (not purged)
+
+
+def run_session_store_checks():
+    """
+    Both session stores: a get refreshes the session's last-used time, and
+    puts periodically drop sessions idle for longer than the TTL.
+    """
+    failures = 0
+    print("\n---------------------")
+    print("SESSION STORES")
+    with tempfile.TemporaryDirectory() as directory:
+        stores = {
+            "in-memory": InMemorySessionStore(ttl_seconds=0.3, expire_every=3),
+            "sqlite": SQLiteSessionStore(os.path.join(directory, "sessions.db"), ttl_seconds=0.3, expire_every=3),
+        }
+        for label, store in stores.items():
+            store.put("read", {"n": 1})
+            store.put("idle", {"n": 2})
+            time.sleep(0.2)
+            store.get("read")
+            time.sleep(0.2)
+            refreshed = store.get("read") == {"n": 1}
+            # Third put: "idle" is past the TTL and is dropped
+            store.put("new", {"n": 3})
+            expired = store.metrics()["sessions"] == 2
+            ok = refreshed and expired
+            failures += not ok
+            print(f"[{'PASS' if ok else 'FAIL'}] {label}: get refreshes last use, put expires idle sessions")
+            if label == "sqlite":
+                store.close()
+    return failures
+
+
+def run_slot_table_checks():
+    """
+    SlotTable and SlotIndex over the same slots must return the same free
+    slots (by department, time of day and date, and date by date), agree on
+    every booking and release, and a SlotTable snapshot must load back the
+    same.
+    """
+    slots = list(generate_slots(3_000, days=14))
+    index = SlotIndex(dict(slot) for slot in slots)
+    table = SlotTable(dict(slot) for slot in slots)
+    lookups = [(dep, tod) for dep in DEPARTMENTS for tod in ("any", *TIMES)]
+    days = sorted({slot["date"] for slot in slots})
+
+    def same_lookups(store_a, store_b):
+        return all(
+            store_a.find(dep, tod) == store_b.find(dep, tod)
+            and store_a.find(dep, tod, days[3]) == store_b.find(dep, tod, days[3])
+            and list(store_a.find_by_date(dep, tod)) == list(store_b.find_by_date(dep, tod))
+            for dep, tod in lookups
+        )
+
+    before = same_lookups(index, table)
+
+    # Book every third slot (some twice), then free every other booked one
+    booked_ids = [slot["slot_id"] for slot in slots[::3]]
+    agree = all(
+        index.mark_booked(slot_id) == table.mark_booked(slot_id)
+        for slot_id in booked_ids + booked_ids[:50] + ["no-such-slot"]
+    )
+    agree = agree and all(
+        index.mark_free(slot_id) == table.mark_free(slot_id)
+        for slot_id in booked_ids[::2] + booked_ids[:10]
+    )
+    agree = agree and all(index.get(slot["slot_id"]) == table.get(slot["slot_id"]) for slot in slots[:300])
+    after = agree and len(index) == len(table) and same_lookups(index, table)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "slots.bin")
+        table.save_snapshot(path)
+        loaded = SlotTable.load_snapshot(path)
+        snapshot = len(loaded) == len(table) and same_lookups(table, loaded)
+        del loaded
+
+    print("\n---------------------")
+    print("SLOT TABLE")
+    print(f"[{'PASS' if before else 'FAIL'}] SlotTable lookups match SlotIndex")
+    print(f"[{'PASS' if after else 'FAIL'}] SlotTable matches SlotIndex through bookings and releases")
+    print(f"[{'PASS' if snapshot else 'FAIL'}] SlotTable snapshot loads back the same slots")
+    return (not before) + (not after) + (not snapshot)
+
+
+class WalkInSchedulerTool(ClinicSchedulerTool):
+    """
+    Every seventh booking loses its slot to a walk-in patient booked just
+    before it, as a concurrent booking from another worker would.
+    """
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.calls = 0
+
+    def book_slot(self, user_id, slot, appointment_id=None):
+        self.calls += 1
+        if self.calls % 7 == 0:
+            super().book_slot("walk-in", slot)
+        return super().book_slot(user_id, slot, appointment_id)
+
+
+class CountingRecurringSlotStore(RecurringSlotStore):
+    """
+    RecurringSlotStore that counts the dates it generates slots for.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.days_read = 0
+
+    def _free_on(self, day, department, time_of_day):
+        self.days_read += 1
+        return super()._free_on(day, department, time_of_day)
+
+
+def run_book_many_checks():
+    """
+    SchedulerAgent.book_many over more requests than slots, with patients
+    asking several times and some slots lost to walk-ins: every result must
+    answer its own request, no slot may be booked twice, and no patient may
+    get two overlapping appointments. Against recurring rules with a long
+    horizon, it must only generate the dates it books from.
+    """
+    scheduler_tool = WalkInSchedulerTool(slot_store=SlotIndex(generate_slots(300, days=2)))
+    scheduler_agent = SchedulerAgent(scheduler_tool=scheduler_tool, calendar_tool=CalendarTool())
+    requests = [
+        BookingRequest(f"bulk-{i % 40}", DEPARTMENTS[i % len(DEPARTMENTS)], ("any", *TIMES)[i % 4])
+        for i in range(400)
+    ]
+    results = scheduler_agent.book_many(requests)
+
+    booked = [(request, result) for request, result in zip(requests, results) if result.success]
+    appointments = {a["id"]: a for a in scheduler_tool.booked_appointments() if a["user_id"] != "walk-in"}
+    in_order = len(results) == len(requests) and all(
+        appointments[result.appointment_id]["user_id"] == request.user_id
+        and request.department in ("General", result.slot["department"])
+        and request.time_of_day in ("any", result.slot["time_of_day"])
+        for request, result in booked
+    )
+
+    slot_ids = [a["slot"]["slot_id"] for a in scheduler_tool.booked_appointments()]
+    no_double = (
+        len(slot_ids) == len(set(slot_ids))
+        and len(appointments) == len(booked)
+        and any(not result.success for result in results)
+    )
+
+    by_user = {}
+    for request, result in booked:
+        by_user.setdefault(request.user_id, []).append(slot_interval(result.slot))
+    no_clash = all(
+        end <= next_start
+        for intervals in by_user.values()
+        for (_, end), (next_start, _) in zip(sorted(intervals), sorted(intervals)[1:])
+    )
+
+    store = CountingRecurringSlotStore(RECURRING_RULES, start_date="2026-01-01", horizon_days=3650)
+    recurring_agent = SchedulerAgent(scheduler_tool=ClinicSchedulerTool(slot_store=store), calendar_tool=CalendarTool())
+    recurring_results = recurring_agent.book_many(
+        [BookingRequest(f"rule-{i % 3}", "Cardiology", "evening") for i in range(12)]
+    )
+    lazy_dates = (
+        all(result.success for result in recurring_results)
+        and [result.slot["date"] for result in recurring_results] == sorted(result.slot["date"] for result in recurring_results)
+        and store.days_read <= 14
+    )
+
+    print("\n---------------------")
+    print("BULK BOOKING")
+    print(f"[{'PASS' if in_order else 'FAIL'}] book_many results answer their requests, in request order")
+    print(f"[{'PASS' if no_double else 'FAIL'}] book_many never books a slot twice")
+    print(f"[{'PASS' if no_clash else 'FAIL'}] book_many gives no patient overlapping appointments")
+    print(f"[{'PASS' if lazy_dates else 'FAIL'}] book_many on recurring rules reads only the dates it books from")
+    return (not in_order) + (not no_double) + (not no_clash) + (not lazy_dates)
+
+
+def run_server_checks():
+    """
+    Two users routed to different workers ask for the only evening
+    cardiology slot at the same time: exactly one of them gets it.
+    """
+    async def drive():
+        server = CareFlowServer(workers=2, port=0)
+        await server.start()
+        try:
+            users = {}
+            n = 0
+            while len(users) < 2:
+                users.setdefault(server._ring.node_for(f"server-patient-{n}"), f"server-patient-{n}")
+                n += 1
+            return await asyncio.gather(*(
+                server.dispatch(user_id, "I need a cardiology appointment in the evening")
+                for user_id in users.values()
+            ))
+        finally:
+            await server.shutdown()
+
+    responses = asyncio.run(drive())
+    booked = sum("is booked for" in response for response in responses)
+    ok = booked == 1
+
+    print("\n---------------------")
+    print("SERVER")
+    print(f"[{'PASS' if ok else 'FAIL'}] a slot booked through two workers is sold once ({booked} bookings)")
+    return int(not ok)
+
+
+class SpanCollector:
+    def __init__(self):
+        self.records = []
+
+    def export(self, record):
+        self.records.append(record)
+
+
+def run_tracing_checks():
+    """
+    A traced booking, sync and async, must record a slot lookup span inside
+    its scheduler.book span, under the same trace id.
+    """
+    message = "I need a cardiology appointment in the evening"
+    collector = SpanCollector()
+    tracer.enable(collector)
+    try:
+        OrchestratorAgent().handle_user_message("traced-patient", message)
+        sync_records = collector.records
+        collector.records = []
+        asyncio.run(OrchestratorAgent().handle_user_message_async("traced-patient", message))
+        async_records = collector.records
+    finally:
+        tracer.disable()
+        tracer.clear_exporters()
+
+    def lookup_in_booking(records):
+        by_id = {record.span_id: record for record in records}
+        for record in records:
+            if record.name != "scheduler_tool.find_available_slots_by_date":
+                continue
+            parent = by_id.get(record.parent_id)
+            while parent is not None and parent.name != "scheduler.book":
+                parent = by_id.get(parent.parent_id)
+            if parent is not None and record.trace_id is not None and parent.trace_id == record.trace_id:
+                return True
+        return False
+
+    failures = 0
+    print("\n---------------------")
+    print("TRACING")
+    for label, records in (("sync", sync_records), ("async", async_records)):
+        ok = lookup_in_booking(records)
+        failures += not ok
+        print(f"[{'PASS' if ok else 'FAIL'}] {label} booking trace records the slot lookup span")
+    return failures
+
+
 def main():
     orchestrator = OrchestratorAgent()
     user_id = "test_user"
@@ -51,11 +907,94 @@ def main():
         message="Cancel my appointment",
     )
 
+    # 4. Triage regressions
+    failures = run_triage_regressions()
+
+    # 5. Availability counters
+    availability_failures = run_availability_checks()
+
+    # 6. Calendar entries by appointment id
+    calendar_failures = run_calendar_checks()
+
+    # 7. Reminder dispatch
+    reminder_failures = run_reminder_checks()
+
+    # 8. Startup
+    startup_failures = run_startup_checks()
+
+    # 9. Sharded scheduler
+    sharding_failures = run_sharding_checks()
+
+    # 10. Triage micro-batching
+    batching_failures = run_batching_checks()
+
+    # 11. Recurring availability rules
+    recurring_failures = run_recurring_checks()
+
+    # 12. Operation log recovery
+    oplog_failures = run_oplog_checks()
+
+    # 13. Triage cache isolation and expiry
+    triage_cache_failures = run_triage_cache_checks()
+
+    # 14. Session store expiry
+    session_failures = run_session_store_checks()
+
+    # 15. SlotTable against SlotIndex
+    slot_table_failures = run_slot_table_checks()
+
+    # 16. Bulk booking
+    book_many_failures = run_book_many_checks()
+
+    # 17. Server workers share one inventory
+    server_failures = run_server_checks()
+
+    # 18. Booking traces
+    tracing_failures = run_tracing_checks()
+
     print("\n---------------------")
     print("All test scenarios executed.")
+    if failures:
+        print(f"{failures} triage regression(s) failed.")
+    if availability_failures:
+        print(f"{availability_failures} availability count(s) wrong.")
+    if calendar_failures:
+        print(f"{calendar_failures} calendar check(s) failed.")
+    if reminder_failures:
+        print(f"{reminder_failures} reminder check(s) failed.")
+    if startup_failures:
+        print(f"{startup_failures} startup check(s) failed.")
+    if sharding_failures:
+        print(f"{sharding_failures} sharding check(s) failed.")
+    if batching_failures:
+        print(f"{batching_failures} triage batching check(s) failed.")
+    if recurring_failures:
+        print(f"{recurring_failures} recurring slot check(s) failed.")
+    if oplog_failures:
+        print(f"{oplog_failures} operation log check(s) failed.")
+    if triage_cache_failures:
+        print(f"{triage_cache_failures} triage cache check(s) failed.")
+    if session_failures:
+        print(f"{session_failures} session store check(s) failed.")
+    if slot_table_failures:
+        print(f"{slot_table_failures} slot table check(s) failed.")
+    if book_many_failures:
+        print(f"{book_many_failures} bulk booking check(s) failed.")
+    if server_failures:
+        print(f"{server_failures} server check(s) failed.")
+    if tracing_failures:
+        print(f"{tracing_failures} tracing check(s) failed.")
     print("---------------------\n")
 
+    # Non-zero exit when anything failed, so CI and budget gates notice
+    return int(bool(
+        failures + availability_failures + calendar_failures + reminder_failures + startup_failures
+        + sharding_failures + batching_failures + recurring_failures + oplog_failures
+        + triage_cache_failures + session_failures + slot_table_failures + book_many_failures
+        + server_failures + tracing_failures
+    ))
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
 
@@ -0,0 +1,478 @@
+# server.py
+"""
+Multi-process HTTP server for CareFlow.
+
+A front process runs an asyncio HTTP/1.1 server (TCP or Unix socket) and
+forwards each message to one of N worker processes, each owning its own
+OrchestratorAgent. Requests are routed by consistent hashing on user_id,
+so a user's session and calendar always live in the same worker.
+
+The slot inventory is not per worker: by default every worker's scheduler
+books from one SharedSlotStore (tools/shared_slots.py), a SQLite file the
+front process seeds before the workers start, so a slot can only be sold
+once however many workers there are. A custom `orchestrator_factory` must
+do the same (e.g. shared_orchestrator with its own seeded file); agents
+with in-memory slot stores would each sell their own copy of every slot.
+
+Endpoints:
+    POST /message   {"user_id": "...", "message": "..."} -> {"response": "..."}
+    GET  /health    worker count and requests in flight
+
+SIGINT/SIGTERM trigger a graceful shutdown: stop accepting connections,
+let in-flight requests finish, then stop the workers.
+
+If a worker process dies, its in-flight requests get 503 Service
+Unavailable and a replacement worker is started; its users' requests get
+503 until the new worker is ready (their sessions are lost with the old
+one).
+
+Run with:
+    python server.py --port 8080 --workers 4
+    python server.py --unix /tmp/careflow.sock
+"""
+
+from functools import partial
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import shutil
+import signal
+import tempfile
+import threading
+
+from agents.orchestrator_agent import OrchestratorAgent
+from tools.clinic_scheduler_tool import ClinicSchedulerTool
+from tools.shared_slots import SharedSlotStore
+
+
+# Larger request bodies are refused (413) without being read
+MAX_BODY_BYTES = 64 * 1024
+
+
+class WorkerUnavailable(Exception):
+    """
+    The worker owning a request died, or is being restarted.
+    """
+
+
+class HashRing:
+    """
+    Consistent hash ring over worker indexes. Each worker gets `replicas`
+    virtual points, so keys spread evenly and resizing the pool only moves
+    about 1/N of the users.
+    """
+
+    def __init__(self, nodes: int, replicas: int = 128) -> None:
+        points = []
+        for node in range(nodes):
+            for replica in range(replicas):
+                points.append((self._hash(f"{node}:{replica}"), node))
+        points.sort()
+        self._hashes = [h for h, _ in points]
+        self._nodes = [node for _, node in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+    def node_for(self, key: str) -> int:
+        i = bisect.bisect(self._hashes, self._hash(key))
+        return self._nodes[i % len(self._nodes)]
+
+
+def shared_orchestrator(slots_path: str) -> OrchestratorAgent:
+    """
+    An OrchestratorAgent whose scheduler books from the SharedSlotStore at
+    `slots_path`, shared with every other worker opening the same file.
+    """
+    from agents.scheduler_agent import SchedulerAgent
+
+    scheduler_tool = ClinicSchedulerTool(slot_store=SharedSlotStore(slots_path))
+    return OrchestratorAgent(scheduler_agent=SchedulerAgent(scheduler_tool=scheduler_tool))
+
+
+def seed_shared_slots(slots_path: str, slots: Optional[List[Dict[str, Any]]] = None) -> None:
+    """
+    Write `slots` (default: ClinicSchedulerTool's built-in slots) into a
+    SharedSlotStore file. Ids already in the file are kept as they are.
+    """
+    if slots is None:
+        slots = ClinicSchedulerTool().find_available_slots("General", "any")
+    store = SharedSlotStore(slots_path)
+    try:
+        store.add_many(slots)
+    finally:
+        store.close()
+
+
+def _worker_main(conn: Connection, orchestrator_factory: Callable[[], OrchestratorAgent]) -> None:
+    """
+    Worker loop: receive batches of (request_id, user_id, message), reply
+    with batches of (request_id, response, error). None means stop.
+    """
+    # The front process coordinates shutdown; ignore signals sent to the
+    # whole process group (terminal ^C, container stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    orchestrator = orchestrator_factory()
+    conn.send("ready")
+    while True:
+        batch = conn.recv()
+        if batch is None:
+            break
+        replies = []
+        for request_id, user_id, message in batch:
+            try:
+                replies.append((request_id, orchestrator.handle_user_message(user_id, message), None))
+            except Exception as exc:
+                replies.append((request_id, None, f"{type(exc).__name__}: {exc}"))
+        conn.send(replies)
+    conn.close()
+
+
+class _Worker:
+    """
+    Front-side handle for one worker process.
+
+    Sends happen on a dedicated thread so the event loop never blocks on a
+    full pipe; whatever queued up while the previous send was in progress
+    goes out as one batch.
+    """
+
+    def __init__(self, orchestrator_factory: Callable[[], OrchestratorAgent]) -> None:
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_worker_main, args=(child_conn, orchestrator_factory), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        # Request ids sent to this worker and not answered yet
+        self.pending: Set[int] = set()
+        self.alive = True
+        self._outbox: "queue.SimpleQueue[Optional[Tuple[int, str, str]]]" = queue.SimpleQueue()
+        self._sender = threading.Thread(target=self._send_loop, daemon=True)
+        self._sender.start()
+
+    def wait_ready(self) -> None:
+        if self.conn.recv() != "ready":
+            raise RuntimeError("worker failed to start")
+
+    def submit(self, request_id: int, user_id: str, message: str) -> None:
+        self._outbox.put((request_id, user_id, message))
+
+    def _send_loop(self) -> None:
+        while True:
+            item = self._outbox.get()
+            batch = []
+            while item is not None:
+                batch.append(item)
+                try:
+                    item = self._outbox.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    self.conn.send(batch)
+                if item is None:
+                    self.conn.send(None)
+                    return
+            except OSError:
+                # Worker died (BrokenPipeError); the reply reader sees EOF
+                # and fails this worker's pending requests
+                return
+
+    def stop(self, timeout: float) -> None:
+        self._outbox.put(None)
+        self._sender.join(timeout)
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class CareFlowServer:
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        unix_path: Optional[str] = None,
+        orchestrator_factory: Optional[Callable[[], OrchestratorAgent]] = None,
+        shutdown_timeout: float = 10.0,
+        slots_path: Optional[str] = None,
+    ) -> None:
+        """
+        Without an orchestrator_factory, workers use shared_orchestrator on
+        `slots_path`, seeded with the built-in slots if it has none; with no
+        path, a temporary file removed at shutdown.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.slots_path = slots_path
+        self._orchestrator_factory = orchestrator_factory
+        self._slots_dir: Optional[str] = None
+        self._shutdown_timeout = shutdown_timeout
+
+        self._ring = HashRing(self.workers)
+        self._workers: List[_Worker] = []
+        self._restarts: Set["asyncio.Task[None]"] = set()
+        self._pending: Dict[int, "asyncio.Future[str]"] = {}
+        self._next_request_id = 0
+        self._connections: Set["asyncio.Task[None]"] = set()
+        self._idle_connections: Set[asyncio.StreamWriter] = set()
+        self._stopping: Optional[asyncio.Event] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    # --- lifecycle ----------------------------------------------------
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        if self._orchestrator_factory is None:
+            if self.slots_path is None:
+                self._slots_dir = tempfile.mkdtemp(prefix="careflow-")
+                self.slots_path = os.path.join(self._slots_dir, "slots.db")
+            # Seed before any worker opens the file
+            await loop.run_in_executor(None, seed_shared_slots, self.slots_path)
+            self._orchestrator_factory = partial(shared_orchestrator, self.slots_path)
+        self._workers = [_Worker(self._orchestrator_factory) for _ in range(self.workers)]
+        # Workers build their agents in parallel; listen only once all are up
+        for worker in self._workers:
+            await loop.run_in_executor(None, worker.wait_ready)
+            loop.add_reader(worker.conn.fileno(), self._on_worker_reply, worker)
+
+        if self.unix_path:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=self.unix_path)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+            # Report the real port when 0 asked for an ephemeral one
+            self.port = self._server.sockets[0].getsockname()[1]
+
+    def request_shutdown(self) -> None:
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def serve(self) -> None:
+        """
+        Start, serve until request_shutdown() (or SIGINT/SIGTERM), then
+        shut down gracefully.
+        """
+        await self.start()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.request_shutdown)
+        where = self.unix_path or f"http://{self.host}:{self.port}"
+        print(f"CareFlow server on {where} with {self.workers} workers", flush=True)
+        await self._stopping.wait()
+        await self.shutdown()
+
+    async def shutdown(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._stopping.set()
+        self._server.close()
+        for writer in list(self._idle_connections):
+            writer.close()
+
+        # Connections busy with a request finish it, reply, then exit
+        if self._connections:
+            _, busy = await asyncio.wait(list(self._connections), timeout=self._shutdown_timeout)
+            for task in busy:
+                task.cancel()
+        await self._server.wait_closed()
+
+        if self._restarts:
+            await asyncio.wait(list(self._restarts))
+        for worker in self._workers:
+            if worker.alive:
+                loop.remove_reader(worker.conn.fileno())
+        await loop.run_in_executor(None, self._stop_workers)
+        if self.unix_path and os.path.exists(self.unix_path):
+            os.unlink(self.unix_path)
+        if self._slots_dir is not None:
+            shutil.rmtree(self._slots_dir, ignore_errors=True)
+
+    def _stop_workers(self) -> None:
+        for worker in self._workers:
+            worker.stop(self._shutdown_timeout)
+
+    # --- routing ------------------------------------------------------
+
+    def dispatch(self, user_id: str, message: str) -> "asyncio.Future[str]":
+        """
+        Send one message to the worker owning `user_id`.
+        """
+        self._next_request_id += 1
+        request_id = self._next_request_id
+        future = asyncio.get_running_loop().create_future()
+        worker = self._workers[self._ring.node_for(user_id)]
+        if not worker.alive:
+            future.set_exception(WorkerUnavailable("worker is restarting"))
+            return future
+        self._pending[request_id] = future
+        worker.pending.add(request_id)
+        worker.submit(request_id, user_id, message)
+        return future
+
+    def _on_worker_reply(self, worker: _Worker) -> None:
+        conn = worker.conn
+        while True:
+            try:
+                if not conn.poll():
+                    return
+                replies = conn.recv()
+            except (EOFError, OSError):
+                self._on_worker_exit(worker)
+                return
+            for request_id, response, error in replies:
+                worker.pending.discard(request_id)
+                future = self._pending.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if error is None:
+                    future.set_result(response)
+                else:
+                    future.set_exception(RuntimeError(error))
+
+    def _on_worker_exit(self, worker: _Worker) -> None:
+        """
+        The worker's pipe hit EOF: stop watching it, fail what it still
+        owed, and start a replacement unless shutting down.
+        """
+        loop = asyncio.get_running_loop()
+        worker.alive = False
+        loop.remove_reader(worker.conn.fileno())
+        for request_id in worker.pending:
+            future = self._pending.pop(request_id, None)
+            if future is not None and not future.done():
+                future.set_exception(WorkerUnavailable("worker exited"))
+        worker.pending.clear()
+        if not self._stopping.is_set():
+            task = loop.create_task(self._restart_worker(self._workers.index(worker)))
+            self._restarts.add(task)
+            task.add_done_callback(self._restarts.discard)
+
+    async def _restart_worker(self, index: int) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._workers[index].stop, 0)
+        worker = _Worker(self._orchestrator_factory)
+        try:
+            await loop.run_in_executor(None, worker.wait_ready)
+        except (EOFError, OSError, RuntimeError):
+            # Could not start; its users keep getting 503
+            await loop.run_in_executor(None, worker.stop, 0)
+            return
+        if self._stopping.is_set():
+            await loop.run_in_executor(None, worker.stop, self._shutdown_timeout)
+            return
+        self._workers[index] = worker
+        loop.add_reader(worker.conn.fileno(), self._on_worker_reply, worker)
+
+    # --- HTTP ---------------------------------------------------------
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections.add(asyncio.current_task())
+        self._idle_connections.add(writer)
+        try:
+            while not self._stopping.is_set():
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                self._idle_connections.discard(writer)
+
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length", "0"))
+                except ValueError:
+                    length = -1
+                # The body is left unread on errors, so those close the connection
+                if length < 0:
+                    status, payload, keep_alive = "400 Bad Request", {"error": "invalid Content-Length"}, False
+                elif length > MAX_BODY_BYTES:
+                    status, payload, keep_alive = (
+                        "413 Payload Too Large", {"error": f"body over {MAX_BODY_BYTES} bytes"}, False
+                    )
+                else:
+                    body = await reader.readexactly(length)
+                    status, payload = await self._route(request_line, body)
+                    keep_alive = headers.get("connection", "").lower() != "close" and not self._stopping.is_set()
+                data = json.dumps(payload).encode()
+                writer.write(
+                    b"HTTP/1.1 %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: %s\r\n\r\n"
+                    % (status.encode(), len(data), b"keep-alive" if keep_alive else b"close")
+                    + data
+                )
+                await writer.drain()
+
+                self._idle_connections.add(writer)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._idle_connections.discard(writer)
+            self._connections.discard(asyncio.current_task())
+            writer.close()
+
+    async def _route(self, request_line: bytes, body: bytes) -> Tuple[str, Dict[str, Any]]:
+        try:
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            return "400 Bad Request", {"error": "malformed request line"}
+
+        if path == "/health" and method == "GET":
+            return "200 OK", {"workers": self.workers, "in_flight": len(self._pending)}
+        if path != "/message":
+            return "404 Not Found", {"error": f"unknown path {path}"}
+        if method != "POST":
+            return "405 Method Not Allowed", {"error": "use POST"}
+
+        try:
+            request = json.loads(body)
+            user_id, message = str(request["user_id"]), str(request["message"])
+        except (ValueError, KeyError, TypeError):
+            return "400 Bad Request", {"error": "expected JSON with user_id and message"}
+
+        try:
+            response = await self.dispatch(user_id, message)
+        except WorkerUnavailable as exc:
+            return "503 Service Unavailable", {"error": str(exc)}
+        except RuntimeError as exc:
+            return "500 Internal Server Error", {"error": str(exc)}
+        return "200 OK", {"response": response}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="CareFlow multi-process server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument(
+        "--slots-db", help="SQLite file holding the shared slot inventory (default: a temporary file)"
+    )
+    args = parser.parse_args(argv)
+
+    server = CareFlowServer(
+        workers=args.workers, host=args.host, port=args.port, unix_path=args.unix, slots_path=args.slots_db
+    )
+    asyncio.run(server.serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+AvailabilityCounters:
+Running counts of free slots, kept up to date as slots are booked and freed.
+
+Counts are kept per (department, time_of_day) and date, and per doctor and
+date, plus running totals for each. Every booking change is an O(log dates)
+update, and "how many X slots are free in this window" queries bisect the
+window's ends in a sorted date list and take two prefix sums, instead of
+scanning slots or adding up one counter per day.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import threading
+
+
+class _DatedCounter:
+    """
+    Free-slot count per date for one key, plus the running total. The dates
+    are kept sorted with a Fenwick tree over their counts, rebuilt on the
+    next windowed count after a new date appears.
+    """
+
+    __slots__ = ("by_date", "total", "_dates", "_positions", "_tree")
+
+    def __init__(self) -> None:
+        self.by_date: Dict[str, int] = {}
+        self.total = 0
+        self._dates: List[str] = []
+        self._positions: Dict[str, int] = {}
+        # None until built, and again whenever a new date shifts positions
+        self._tree: Optional[List[int]] = None
+
+    def adjust(self, date: str, delta: int) -> None:
+        count = self.by_date.get(date)
+        if count is None:
+            self.by_date[date] = delta
+            self._tree = None
+        else:
+            self.by_date[date] = count + delta
+            if self._tree is not None:
+                tree, i = self._tree, self._positions[date] + 1
+                while i < len(tree):
+                    tree[i] += delta
+                    i += i & -i
+        self.total += delta
+
+    def _rebuild(self) -> List[int]:
+        dates = self._dates = sorted(self.by_date)
+        self._positions = {date: i for i, date in enumerate(dates)}
+        tree = [0] * (len(dates) + 1)
+        for i, date in enumerate(dates, 1):
+            tree[i] += self.by_date[date]
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+        return tree
+
+    def count(self, start_date: Optional[str], end_date: Optional[str]) -> int:
+        if start_date is None and end_date is None:
+            return self.total
+        tree = self._tree if self._tree is not None else self._rebuild()
+        lo = 0 if start_date is None else bisect_left(self._dates, start_date)
+        hi = len(self._dates) if end_date is None else bisect_right(self._dates, end_date)
+        return _prefix_sum(tree, hi) - _prefix_sum(tree, lo) if hi > lo else 0
+
+
+def _prefix_sum(tree: List[int], end: int) -> int:
+    """
+    Sum of the first `end` counts in a Fenwick tree.
+    """
+    total = 0
+    while end > 0:
+        total += tree[end]
+        end -= end & -end
+    return total
+
+
+class AvailabilityCounters:
+    def __init__(self, slots: Iterable[Dict[str, Any]] = ()) -> None:
+        # (department, time_of_day) -> counts
+        self._by_category: Dict[Tuple[str, str], _DatedCounter] = {}
+        # doctor_id -> counts
+        self._by_doctor: Dict[str, _DatedCounter] = {}
+        self._lock = threading.Lock()
+
+        for slot in slots:
+            self.add(slot)
+
+    def _category(self, department: str, time_of_day: str) -> _DatedCounter:
+        counter = self._by_category.get((department, time_of_day))
+        if counter is None:
+            counter = self._by_category[(department, time_of_day)] = _DatedCounter()
+        return counter
+
+    def _doctor(self, doctor_id: str) -> _DatedCounter:
+        counter = self._by_doctor.get(doctor_id)
+        if counter is None:
+            counter = self._by_doctor[doctor_id] = _DatedCounter()
+        return counter
+
+    def _adjust(self, slot: Dict[str, Any], delta: int) -> None:
+        date = slot["date"]
+        with self._lock:
+            self._category(slot["department"], slot["time_of_day"]).adjust(date, delta)
+            self._doctor(slot["doctor_id"]).adjust(date, delta)
+
+    def seed(self, slot_store: Any) -> None:
+        """
+        Count the free slots already in a slot store. Stores that can count
+        by column (free_counts()) are not asked to build slot dicts.
+        """
+        free_counts = getattr(slot_store, "free_counts", None)
+        if free_counts is None:
+            for slot in slot_store.find("General", "any"):
+                self.add(slot)
+            return
+
+        by_category, by_doctor = free_counts()
+        with self._lock:
+            for (department, time_of_day, date), n in by_category.items():
+                self._category(department, time_of_day).adjust(date, n)
+            for (doctor_id, date), n in by_doctor.items():
+                self._doctor(doctor_id).adjust(date, n)
+
+    def add(self, slot: Dict[str, Any]) -> None:
+        """
+        Count a newly stored slot (only free slots count as available).
+        """
+        self._adjust(slot, 0 if slot.get("booked") else 1)
+
+    def booked(self, slot: Dict[str, Any]) -> None:
+        self._adjust(slot, -1)
+
+    def freed(self, slot: Dict[str, Any]) -> None:
+        self._adjust(slot, 1)
+
+    def free_count(
+        self,
+        department: str = "General",
+        time_of_day: str = "any",
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> int:
+        """
+        Free slots for department/time_of_day with a date in
+        [start_date, end_date] (ISO dates, either end optional). "General"
+        matches every department and "any" every time of day.
+        """
+        with self._lock:
+            return sum(
+                counter.count(start_date, end_date)
+                for (dep, tod), counter in self._by_category.items()
+                if (department == "General" or dep == department) and (time_of_day == "any" or tod == time_of_day)
+            )
+
+    def doctor_free_count(
+        self,
+        doctor_id: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> int:
+        with self._lock:
+            counter = self._by_doctor.get(doctor_id)
+            if counter is None:
+                return 0
+            return counter.count(start_date, end_date)
+
+    def summary(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Free slots per department and time_of_day in the window, e.g.
+        {"Cardiology": {"evening": 12, "morning": 3}, ...}.
+        """
+        result: Dict[str, Dict[str, int]] = {}
+        with self._lock:
+            for (dep, tod), counter in sorted(self._by_category.items()):
+                result.setdefault(dep, {})[tod] = counter.count(start_date, end_date)
+        return result
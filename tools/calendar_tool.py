@@ -1,62 +1,232 @@
-# tools/calendar_tool.py
 """
 CalendarTool:
 A simple per-user calendar that tracks appointments to avoid conflicts.
 This is in-memory and purely illustrative.
+
+Entries are keyed by appointment_id, so updating or removing an appointment
+touches exactly that entry. Each user also gets an IntervalIndex of
+appointment start/end datetimes tagged with their appointment ids: conflict
+checks catch partial overlaps at O(log n) per candidate, and the same
+time-ordered index answers "next appointment" lookups.
 """
 
-from typing import Dict, Any, List
+from datetime import datetime, timedelta
+import itertools
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from tools.interval_index import IntervalIndex
+from tools.lazy_import import lazy_import
+from tools.storage import InMemoryStorage
+from tools.tracing import traced
+
+# Loaded on the first appointment added without an id
+uuid = lazy_import("uuid")
+
+
+# Slots don't carry a length yet, so assume a standard consultation
+DEFAULT_SLOT_MINUTES = 30
+
+
+def slot_interval(slot: Dict[str, Any]) -> Tuple[datetime, datetime]:
+    """
+    Return the [start, end) datetimes covered by a slot.
+    """
+    start = datetime.fromisoformat(f"{slot['date']}T{slot['time']}")
+    minutes = slot.get("duration_minutes", DEFAULT_SLOT_MINUTES)
+    return start, start + timedelta(minutes=minutes)
+
+
+def first_free_index_in(
+    intervals: Optional[IntervalIndex],
+    slots: Sequence[Dict[str, Any]],
+    start: int = 0,
+) -> Optional[int]:
+    """
+    Return the position of the first slot at or after `start` that overlaps
+    nothing in `intervals`, or None.
+    """
+    if start >= len(slots):
+        return None
+    if not intervals:
+        return start
+    position = intervals.first_free(map(slot_interval, itertools.islice(slots, start, None)))
+    return None if position is None else start + position
 
 
 class CalendarTool:
-    def __init__(self) -> None:
-        # user_id -> list of slots
-        self._user_appointments: Dict[str, List[Dict[str, Any]]] = {}
+    def __init__(self, storage: Optional[Any] = None) -> None:
+        # appointment_id -> (user_id, slot)
+        self._appointments: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        # user_id -> {appointment_id: slot}, in booking order
+        self._user_appointments: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # user_id -> interval index over the same slots, valued by appointment_id
+        self._user_intervals: Dict[str, IntervalIndex] = {}
+
+        # Storage backend (in-memory by default); reload any saved calendars
+        self._storage = storage or InMemoryStorage()
+        for user_id, entries in self._storage.load_calendar().items():
+            for appointment_id, slot in entries.items():
+                self._insert(user_id, appointment_id, slot)
+
+    def _insert(self, user_id: str, appointment_id: str, slot: Dict[str, Any]) -> None:
+        self._appointments[appointment_id] = (user_id, slot)
+        self._user_appointments.setdefault(user_id, {})[appointment_id] = slot
+        self._user_intervals.setdefault(user_id, IntervalIndex()).add(*slot_interval(slot), appointment_id)
+
+    def _discard(self, appointment_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        entry = self._appointments.pop(appointment_id, None)
+        if entry is None:
+            return None
+        user_id, slot = entry
+        entries = self._user_appointments[user_id]
+        del entries[appointment_id]
+        intervals = self._user_intervals[user_id]
+        intervals.remove(*slot_interval(slot), appointment_id)
+        if not entries:
+            del self._user_appointments[user_id]
+            del self._user_intervals[user_id]
+        return entry
 
+    @traced("calendar_tool.has_conflict")
     def has_conflict(self, user_id: str, slot: Dict[str, Any]) -> bool:
         """
-        Simple conflict check: same date & time considered a conflict.
+        True if the slot overlaps any appointment already in the user's calendar.
+        """
+        intervals = self._user_intervals.get(user_id)
+        if not intervals:
+            return False
+        return intervals.overlaps(*slot_interval(slot))
+
+    @traced("calendar_tool.first_free_index")
+    def first_free_index(
+        self,
+        user_id: str,
+        slots: Sequence[Dict[str, Any]],
+        start: int = 0,
+    ) -> Optional[int]:
+        """
+        Batch conflict check: return the position of the first slot (from
+        `start` on) that does not overlap the user's calendar, or None.
         """
-        user_slots = self._user_appointments.get(user_id, [])
-        for existing in user_slots:
-            if (
-                existing.get("date") == slot.get("date")
-                and existing.get("time") == slot.get("time")
-            ):
-                return True
-        return False
+        return first_free_index_in(self._user_intervals.get(user_id), slots, start)
 
-    def add_appointment(self, user_id: str, appointment_slot: Dict[str, Any]) -> None:
+    def first_free_slot(
+        self,
+        user_id: str,
+        slots: Sequence[Dict[str, Any]],
+    ) -> Optional[Dict[str, Any]]:
         """
-        Store a new appointment slot for the user.
+        Return the first slot in `slots` that does not overlap the user's
+        calendar, or None if every slot conflicts.
         """
-        self._user_appointments.setdefault(user_id, []).append(appointment_slot)
+        position = self.first_free_index(user_id, slots)
+        return None if position is None else slots[position]
 
-    def update_appointment(self, user_id: str, appointment_slot: Dict[str, Any]) -> None:
+    @traced("calendar_tool.busy_intervals")
+    def busy_intervals(self, user_id: str) -> IntervalIndex:
         """
-        For simplicity, just replace any slot with same date/time.
-        In a real system, we'd store an appointment_id and update by id.
+        Return a snapshot of the user's busy intervals.
         """
-        user_slots = self._user_appointments.get(user_id, [])
-        new_slots: List[Dict[str, Any]] = []
+        intervals = self._user_intervals.get(user_id)
+        if not intervals:
+            return IntervalIndex()
+        return intervals.copy()
 
-        for existing in user_slots:
-            if (
-                existing.get("date") == appointment_slot.get("date")
-                and existing.get("time") == appointment_slot.get("time")
-            ):
-                # skip old version of this slot
-                continue
-            new_slots.append(existing)
+    @traced("calendar_tool.add_appointment")
+    def add_appointment(
+        self,
+        user_id: str,
+        appointment_slot: Dict[str, Any],
+        appointment_id: Optional[str] = None,
+    ) -> str:
+        """
+        Store a new appointment for the user and return its id (a fresh one
+        if none is given).
+        """
+        if appointment_id is None:
+            appointment_id = str(uuid.uuid4())
+        elif appointment_id in self._appointments:
+            self._discard(appointment_id)
+        self._insert(user_id, appointment_id, appointment_slot)
+        self._storage.add_calendar_entry(user_id, appointment_id, appointment_slot)
+        return appointment_id
+
+    @traced("calendar_tool.update_appointment")
+    def update_appointment(self, user_id: str, appointment_id: str, appointment_slot: Dict[str, Any]) -> None:
+        """
+        Move one appointment to a new slot (adding it if it isn't in the
+        calendar yet).
+        """
+        self._discard(appointment_id)
+        self._insert(user_id, appointment_id, appointment_slot)
+        self._storage.add_calendar_entry(user_id, appointment_id, appointment_slot)
+
+    @traced("calendar_tool.remove_appointment")
+    def remove_appointment(self, user_id: str, appointment_id: str) -> bool:
+        """
+        Remove one appointment. Returns False if the user has no appointment
+        with that id.
+        """
+        entry = self._appointments.get(appointment_id)
+        if entry is None or entry[0] != user_id:
+            return False
+        self._discard(appointment_id)
+        self._storage.remove_calendar_entry(user_id, appointment_id)
+        return True
 
-        new_slots.append(appointment_slot)
-        self._user_appointments[user_id] = new_slots
+    def get_appointment(self, appointment_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._appointments.get(appointment_id)
+        return None if entry is None else entry[1]
 
-    def remove_appointment(self, user_id: str, appointment_id: str) -> None:
+    def next_appointment(
+        self,
+        user_id: str,
+        after: Optional[datetime] = None,
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
         """
-        In this simple demo, we don't track appointment IDs in the calendar.
-        We'll just clear all appointments for simplicity.
+        Return (appointment_id, slot) of the user's first appointment starting
+        at or after `after` (their earliest appointment if None), or None.
         """
-        # For a real implementation, you'd match against appointment_id.
-        self._user_appointments.pop(user_id, None)
+        intervals = self._user_intervals.get(user_id)
+        if not intervals:
+            return None
+        found = intervals.first_starting_at(after or datetime.min)
+        if found is None:
+            return None
+        appointment_id = found[2]
+        return appointment_id, self._user_appointments[user_id][appointment_id]
+
+    def list_appointments(self, user_id: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Return the user's (appointment_id, slot) pairs in time order.
+        """
+        intervals = self._user_intervals.get(user_id)
+        if not intervals:
+            return []
+        entries = self._user_appointments[user_id]
+        return [(appointment_id, entries[appointment_id]) for _, _, appointment_id in intervals.items()]
+
+    # Async variants. The calendar is in memory today, so these simply wrap
+    # the sync calls; a remote calendar backend would await I/O here.
+
+    async def busy_intervals_async(self, user_id: str) -> IntervalIndex:
+        return self.busy_intervals(user_id)
+
+    async def add_appointment_async(
+        self,
+        user_id: str,
+        appointment_slot: Dict[str, Any],
+        appointment_id: Optional[str] = None,
+    ) -> str:
+        return self.add_appointment(user_id, appointment_slot, appointment_id)
+
+    async def update_appointment_async(
+        self,
+        user_id: str,
+        appointment_id: str,
+        appointment_slot: Dict[str, Any],
+    ) -> None:
+        self.update_appointment(user_id, appointment_id, appointment_slot)
 
+    async def remove_appointment_async(self, user_id: str, appointment_id: str) -> bool:
+        return self.remove_appointment(user_id, appointment_id)
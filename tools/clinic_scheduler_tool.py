@@ -4,14 +4,27 @@ ClinicSchedulerTool:
 A mock scheduling backend storing doctors and appointments in memory.
 
 In a real system this would wrap a database or external API.
+Changes can be persisted through a storage backend (see tools/storage.py).
+Free-slot counts are maintained incrementally (see tools/availability.py),
+so availability summaries never scan slots. Slot stores that can count for
+themselves (tools/recurring_slots.py) provide their own counters.
 """
 
-from typing import List, Dict, Any
-import uuid
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+import itertools
+
+from tools.availability import AvailabilityCounters
+from tools.lazy_import import lazy_import
+from tools.slot_index import SlotIndex
+from tools.storage import InMemoryStorage
+from tools.tracing import traced
+
+# Loaded on the first booking
+uuid = lazy_import("uuid")
 
 
 class ClinicSchedulerTool:
-    def __init__(self) -> None:
+    def __init__(self, slot_store: Optional[Any] = None, storage: Optional[Any] = None) -> None:
         # In-memory "database"
         self._doctors = [
             {"id": "doc-1", "name": "Dr. Mehta", "department": "Cardiology"},
@@ -58,65 +71,280 @@ class ClinicSchedulerTool:
             },
         ]
 
+        # Slot store answering availability lookups. Defaults to a SlotIndex
+        # over the mock slots above; a SlotTable can be passed in for large,
+        # memory-compact inventories, or a RecurringSlotStore to generate
+        # slots from weekly rules.
+        if slot_store is None:
+            slot_store = SlotIndex()
+        else:
+            self._slots = []
+        self._slot_store = slot_store
+
         self._appointments: Dict[str, Dict[str, Any]] = {}
+        # Free-slot counts per department/time_of_day/date and per doctor,
+        # seeded once from whatever the store was handed in with
+        counters = getattr(slot_store, "availability_counters", None)
+        self._availability = counters() if counters is not None else AvailabilityCounters()
+        self._availability.seed(slot_store)
+
+        # Storage backend. In-memory (no persistence) by default; with a
+        # persistent backend, previously saved slots and appointments are
+        # loaded back and the mock slots are only used to seed an empty store.
+        self._storage = storage or InMemoryStorage()
+        loaded = False
+        for slot in self._storage.load_slots():
+            self._store_slot(slot)
+            loaded = True
+        if not loaded:
+            self.add_slots(self._slots)
 
-    def find_available_slots(self, department: str, time_of_day: str) -> List[Dict[str, Any]]:
+        for record in self._storage.load_appointments():
+            slot = self._slot_store.get(record["slot_id"])
+            if slot is None:
+                continue
+            # Stores that keep booked state only in memory learn it here
+            if record["status"] == "booked" and self._slot_store.mark_booked(slot["slot_id"]):
+                self._availability.booked(slot)
+                slot = self._slot_store.get(slot["slot_id"])
+            self._appointments[record["id"]] = {
+                "id": record["id"],
+                "user_id": record["user_id"],
+                "slot": slot,
+                "status": record["status"],
+            }
+
+    def _store_slot(self, slot: Dict[str, Any]) -> bool:
         """
-        Return a list of slots matching department and time_of_day that are not booked.
+        Add a slot to the store and the counters. Returns False for a slot
+        id the store already had.
         """
-        results: List[Dict[str, Any]] = []
-        for slot in self._slots:
-            if slot["booked"]:
-                continue
-            if department != "General" and slot["department"] != department:
-                continue
-            if time_of_day != "any" and slot["time_of_day"] != time_of_day:
-                continue
-            results.append(slot)
-        return results
+        size = len(self._slot_store)
+        self._slot_store.add(slot)
+        if len(self._slot_store) == size:
+            return False
+        self._availability.add(slot)
+        return True
+
+    def add_slot(self, slot: Dict[str, Any]) -> None:
+        """
+        Register a new slot so it shows up in availability lookups.
+        """
+        self.add_slots((slot,))
+
+    def add_slots(self, slots: Iterable[Dict[str, Any]]) -> int:
+        """
+        Register many slots at once (indexed and persisted in one pass).
+        Returns how many were new; already stored slot ids are skipped.
+        """
+        added = [slot for slot in slots if self._store_slot(slot)]
+        self._storage.save_slots(added)
+        return len(added)
+
+    @traced("scheduler_tool.find_available_slots")
+    def find_available_slots(
+        self,
+        department: str,
+        time_of_day: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return a list of slots matching department and time_of_day that are not booked,
+        optionally only within [start_date, end_date] (ISO dates).
+        Results are in the same order as the underlying slot list.
+        """
+        if start_date is None and end_date is None:
+            return self._slot_store.find(department, time_of_day)
+        find_between = getattr(self._slot_store, "find_between", None)
+        if find_between is not None:
+            return find_between(department, time_of_day, start_date, end_date)
+        return [
+            slot
+            for slot in self._slot_store.find(department, time_of_day)
+            if (start_date is None or slot["date"] >= start_date) and (end_date is None or slot["date"] <= end_date)
+        ]
+
+    @traced("scheduler_tool.find_available_slots_by_date")
+    def find_available_slots_by_date(
+        self,
+        department: str,
+        time_of_day: str,
+    ) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Yield (date, free slots on that date), earliest date first.
+
+        Uses the slot store's own date-ordered lookup when it has one, so
+        only the dates a caller actually consumes are read. The earliest
+        date is read before returning, so the traced span covers finding
+        it; later dates are read as the caller iterates.
+        """
+        find_by_date = getattr(self._slot_store, "find_by_date", None)
+        if find_by_date is None:
+            by_date: Dict[str, List[Dict[str, Any]]] = {}
+            for slot in self._slot_store.find(department, time_of_day):
+                by_date.setdefault(slot["date"], []).append(slot)
+            return iter(sorted(by_date.items()))
+
+        dates = iter(find_by_date(department, time_of_day))
+        first = next(dates, None)
+        if first is None:
+            return iter(())
+        return itertools.chain((first,), dates)
 
-    def book_slot(self, user_id: str, slot: Dict[str, Any]) -> str:
+    def get_slot(self, slot_id: str) -> Optional[Dict[str, Any]]:
+        return self._slot_store.get(slot_id)
+
+    def get_appointment(self, appointment_id: str) -> Optional[Dict[str, Any]]:
+        return self._appointments.get(appointment_id)
+
+    def booked_appointments(self) -> Iterator[Dict[str, Any]]:
         """
-        Mark a slot as booked and create an appointment record.
+        Yield every appointment that is still booked (not canceled).
+        """
+        for appointment in list(self._appointments.values()):
+            if appointment["status"] == "booked":
+                yield appointment
+
+    @traced("scheduler_tool.book_slot")
+    def book_slot(self, user_id: str, slot: Dict[str, Any], appointment_id: Optional[str] = None) -> Optional[str]:
         """
-        appointment_id = str(uuid.uuid4())
+        Mark a slot as booked and create an appointment record, under
+        `appointment_id` if given (e.g. an appointment moving in from another
+        shard) or a new id.
+
+        The slot store flips the booked flag atomically, so when two callers
+        race for the same slot only one wins. The loser gets None back and
+        should try its next candidate.
+        """
+        if not self._slot_store.mark_booked(slot["slot_id"]):
+            return None
         slot["booked"] = True
+        self._availability.booked(slot)
 
-        self._appointments[appointment_id] = {
+        if appointment_id is None:
+            appointment_id = str(uuid.uuid4())
+        appointment = {
             "id": appointment_id,
             "user_id": user_id,
             "slot": slot,
             "status": "booked",
         }
+        self._appointments[appointment_id] = appointment
+
+        self._storage.set_slot_booked(slot["slot_id"], True)
+        self._storage.save_appointment(appointment)
         return appointment_id
 
+    @traced("scheduler_tool.reschedule_appointment")
     def reschedule_appointment(self, appointment_id: str, new_slot: Dict[str, Any]) -> bool:
         """
         Reschedule an existing appointment to a new slot.
+        Returns False if the appointment is unknown or the new slot was taken.
         """
         appointment = self._appointments.get(appointment_id)
         if not appointment:
             return False
 
+        # Claim the new slot first so a lost race leaves the old booking intact
+        if not self._slot_store.mark_booked(new_slot["slot_id"]):
+            return False
+        new_slot["booked"] = True
+        self._availability.booked(new_slot)
+
+        self._storage.set_slot_booked(new_slot["slot_id"], True)
+
         # Free old slot
         old_slot = appointment["slot"]
-        old_slot["booked"] = False
+        if appointment["status"] == "booked":
+            if self._slot_store.mark_free(old_slot["slot_id"]):
+                self._availability.freed(old_slot)
+            old_slot["booked"] = False
+            self._storage.set_slot_booked(old_slot["slot_id"], False)
 
-        # Book new slot
-        new_slot["booked"] = True
         appointment["slot"] = new_slot
         appointment["status"] = "booked"
+        self._storage.save_appointment(appointment)
         return True
 
+    @traced("scheduler_tool.cancel_appointment")
     def cancel_appointment(self, appointment_id: str) -> bool:
         """
-        Cancel an existing appointment.
+        Cancel an existing appointment. Canceling twice is a no-op.
         """
         appointment = self._appointments.get(appointment_id)
         if not appointment:
             return False
+        if appointment["status"] == "canceled":
+            return True
 
         slot = appointment["slot"]
+        if self._slot_store.mark_free(slot["slot_id"]):
+            self._availability.freed(slot)
         slot["booked"] = False
         appointment["status"] = "canceled"
+
+        self._storage.set_slot_booked(slot["slot_id"], False)
+        self._storage.save_appointment(appointment)
         return True
+
+    def count_available_slots(
+        self,
+        department: str = "General",
+        time_of_day: str = "any",
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> int:
+        """
+        Number of free slots, optionally within [start_date, end_date]
+        (ISO dates). Answered from counters, without touching slot data.
+        """
+        return self._availability.free_count(department, time_of_day, start_date, end_date)
+
+    def count_available_by_doctor(
+        self,
+        doctor_id: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> int:
+        return self._availability.doctor_free_count(doctor_id, start_date, end_date)
+
+    def availability_summary(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Free slots per department and time_of_day, e.g. for a dashboard.
+        """
+        return self._availability.summary(start_date, end_date)
+
+    # Async variants. The store is in memory today, so these simply wrap
+    # the sync calls; a real scheduling backend would await I/O here.
+
+    async def find_available_slots_async(
+        self,
+        department: str,
+        time_of_day: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        return self.find_available_slots(department, time_of_day, start_date, end_date)
+
+    async def find_available_slots_by_date_async(
+        self,
+        department: str,
+        time_of_day: str,
+    ) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        return self.find_available_slots_by_date(department, time_of_day)
+
+    async def book_slot_async(
+        self, user_id: str, slot: Dict[str, Any], appointment_id: Optional[str] = None
+    ) -> Optional[str]:
+        return self.book_slot(user_id, slot, appointment_id)
+
+    async def reschedule_appointment_async(self, appointment_id: str, new_slot: Dict[str, Any]) -> bool:
+        return self.reschedule_appointment(appointment_id, new_slot)
+
+    async def cancel_appointment_async(self, appointment_id: str) -> bool:
+        return self.cancel_appointment(appointment_id)
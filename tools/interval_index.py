@@ -0,0 +1,117 @@
+"""
+IntervalIndex:
+A sorted interval list for fast overlap queries.
+
+Intervals are kept ordered by start, alongside a running maximum of end times.
+An overlap query is then one binary search: among the intervals that start
+before the query ends, the one reaching furthest right tells us whether any
+of them is still running when the query starts.
+"""
+
+from typing import Any, Iterable, List, Optional, Tuple
+import bisect
+
+
+_ANY = object()
+
+
+class IntervalIndex:
+    def __init__(self, intervals: Iterable[Tuple[Any, Any]] = ()) -> None:
+        self._starts: List[Any] = []
+        self._ends: List[Any] = []
+        self._values: List[Any] = []
+        # _max_ends[i] == max(_ends[:i + 1])
+        self._max_ends: List[Any] = []
+
+        for start, end in intervals:
+            self.add(start, end)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def _refresh_max_ends(self, start_at: int) -> None:
+        ends = self._ends
+        max_ends = self._max_ends
+        del max_ends[start_at:]
+        running = max_ends[-1] if max_ends else None
+        for i in range(start_at, len(ends)):
+            end = ends[i]
+            if running is None or end > running:
+                running = end
+            max_ends.append(running)
+
+    def add(self, start: Any, end: Any, value: Any = None) -> None:
+        """
+        Insert the half-open interval [start, end), optionally tagged with a value.
+        """
+        i = bisect.bisect_right(self._starts, start)
+        self._starts.insert(i, start)
+        self._ends.insert(i, end)
+        self._values.insert(i, value)
+        self._refresh_max_ends(i)
+
+    def remove(self, start: Any, end: Any, value: Any = _ANY) -> bool:
+        """
+        Remove one interval equal to [start, end) (and tagged with `value`,
+        if given). Returns False if not found.
+        """
+        i = bisect.bisect_left(self._starts, start)
+        while i < len(self._starts) and self._starts[i] == start:
+            if self._ends[i] == end and (value is _ANY or self._values[i] == value):
+                del self._starts[i]
+                del self._ends[i]
+                del self._values[i]
+                self._refresh_max_ends(i)
+                return True
+            i += 1
+        return False
+
+    def first_starting_at(self, start: Any) -> Optional[Tuple[Any, Any, Any]]:
+        """
+        Return (start, end, value) of the earliest interval starting at or
+        after `start`, or None.
+        """
+        i = bisect.bisect_left(self._starts, start)
+        if i == len(self._starts):
+            return None
+        return self._starts[i], self._ends[i], self._values[i]
+
+    def overlaps(self, start: Any, end: Any) -> bool:
+        """
+        True if any stored interval overlaps [start, end).
+        """
+        i = bisect.bisect_left(self._starts, end) - 1
+        return i >= 0 and self._max_ends[i] > start
+
+    def first_free(self, candidates: Iterable[Tuple[Any, Any]]) -> Optional[int]:
+        """
+        Return the position of the first candidate interval that overlaps
+        nothing in the index, or None if all of them conflict.
+        """
+        starts = self._starts
+        if not starts:
+            for position, _ in enumerate(candidates):
+                return position
+            return None
+
+        max_ends = self._max_ends
+        find = bisect.bisect_left
+        for position, (start, end) in enumerate(candidates):
+            i = find(starts, end) - 1
+            if i < 0 or max_ends[i] <= start:
+                return position
+        return None
+
+    def copy(self) -> "IntervalIndex":
+        clone = IntervalIndex()
+        clone._starts = list(self._starts)
+        clone._ends = list(self._ends)
+        clone._values = list(self._values)
+        clone._max_ends = list(self._max_ends)
+        return clone
+
+    def items(self) -> List[Tuple[Any, Any, Any]]:
+        """
+        Return (start, end, value) triples ordered by start.
+        """
+        return list(zip(self._starts, self._ends, self._values))
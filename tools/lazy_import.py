@@ -0,0 +1,51 @@
+"""
+Deferred imports.
+
+lazy_import("sqlite3") returns a stand-in module that performs the real
+import the first time one of its attributes is used. Call sites stay plain
+(`sqlite3.connect(...)`), but a process that never opens a database never
+pays for loading sqlite3. Once loaded, the real module's namespace is
+copied into the stand-in, so later attribute lookups cost the same as on
+the real module.
+
+Use it for stdlib modules that only some code paths need, and for optional
+third-party backends (LLM clients, web frameworks — see requirements.txt):
+a missing package raises ModuleNotFoundError on first use rather than when
+CareFlow starts.
+"""
+
+from types import ModuleType
+from typing import Any
+import importlib
+import sys
+import threading
+
+
+_lock = threading.RLock()
+
+
+class _LazyModule(ModuleType):
+    def __getattr__(self, attr: str) -> Any:
+        # Only reached for names not in the namespace yet: before loading, or
+        # names the real module doesn't define either
+        namespace = self.__dict__
+        if not namespace.get("__lazy_loaded__"):
+            with _lock:
+                if not namespace.get("__lazy_loaded__"):
+                    namespace.update(importlib.import_module(self.__name__).__dict__)
+                    namespace["__lazy_loaded__"] = True
+        try:
+            return namespace[attr]
+        except KeyError:
+            raise AttributeError(f"module {self.__name__!r} has no attribute {attr!r}") from None
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Return module `name`, importing it on first attribute access (or now,
+    if something else already imported it).
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return _LazyModule(name)
@@ -0,0 +1,505 @@
+"""
+LogStorage: an append-only operation log backend for ClinicSchedulerTool and
+CalendarTool (same interface as the backends in tools/storage.py).
+
+Every change the tools report is encoded as one small binary record and
+appended to the current log segment. A log directory holds:
+
+    snapshot        compacted state up to some segment
+    log.000007      segments written since, replayed in order on startup
+
+Record layout: u32 payload length, u32 CRC-32 (over op and payload), u8 op,
+then the payload: UTF-8 fields separated by \\x1f. Fields are escaped with
+\\x1b (\\x1b -> \\x1b0, \\x1f -> \\x1b1), so client-supplied values such as
+user ids cannot split a record.
+
+Group commit: records are buffered and written with one write() and one
+fsync per batch.
+- synchronous=False (default): like SQLiteStorage, a batch goes to disk every
+  `batch_size` records or `flush_interval` seconds, so a crash can lose at
+  most the unflushed batch. Call flush() to make everything durable.
+- synchronous=True: every call except set_slot_booked returns only once its
+  records (and everything logged before them) are on disk. set_slot_booked
+  is always followed by save_appointment, which commits both. Concurrent
+  writers share fsyncs: while one thread syncs, the others queue up and the
+  next sync covers them all.
+
+Compaction: when the current segment passes `segment_bytes`, writing moves
+on to a new segment and a background thread folds the old snapshot and the
+closed segments into a new snapshot, then deletes them. If compaction
+fails (disk full, permissions), its partial file is removed, the segments
+are kept, and the error is raised by the next snapshot(), flush() or
+close(). Startup therefore replays one snapshot plus the segments written
+since, then keeps appending to the last of them. A torn record at the end of the last segment (a crash
+mid-write) is truncated away. Snapshots leave out canceled appointments.
+
+The recovered state is handed over by the load_* methods once each (the
+tools call them when they are built) and not kept afterwards.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import json
+import os
+import struct
+import threading
+import zlib
+
+
+_HEADER = struct.Struct("<IIB")
+_SEPARATOR = "\x1f"
+_ESCAPE = "\x1b"
+_SNAPSHOT_HEADER = struct.Struct("<8sQ")   # magic, last segment folded in
+_SNAPSHOT_MAGIC = b"CFOPLOG1"
+_SNAPSHOT_NAME = "snapshot"
+_SEGMENT_PREFIX = "log."
+
+_OP_SLOT = 1
+_OP_BOOK = 2
+_OP_FREE = 3
+_OP_APPOINTMENT = 4
+_OP_CALENDAR_PUT = 5
+_OP_CALENDAR_REMOVE = 6
+
+# CRC-32 of the op byte, continued over the payload
+_OP_SEEDS = {op: zlib.crc32(bytes((op,))) for op in range(_OP_SLOT, _OP_CALENDAR_REMOVE + 1)}
+
+_SLOT_COLUMNS = (
+    "slot_id", "doctor_id", "doctor_name", "department", "date", "time", "time_of_day", "location",
+)
+
+_fsync = getattr(os, "fdatasync", os.fsync)
+
+
+def _escape(field: str) -> str:
+    if _ESCAPE in field or _SEPARATOR in field:
+        return field.replace(_ESCAPE, _ESCAPE + "0").replace(_SEPARATOR, _ESCAPE + "1")
+    return field
+
+
+def _unescape(field: str) -> str:
+    # Every \x1b starts a pair, so the two replacements cannot overlap
+    return field.replace(_ESCAPE + "1", _SEPARATOR).replace(_ESCAPE + "0", _ESCAPE)
+
+
+def _record(op: int, fields: Iterable[str]) -> bytes:
+    payload = _SEPARATOR.join(map(_escape, fields)).encode()
+    return _HEADER.pack(len(payload), zlib.crc32(payload, _OP_SEEDS[op]), op) + payload
+
+
+def _slot_record(slot: Dict[str, Any]) -> bytes:
+    fields = [slot[column] for column in _SLOT_COLUMNS]
+    fields.append("1" if slot.get("booked") else "0")
+    return _record(_OP_SLOT, fields)
+
+
+def _appointment_record(appointment_id: str, user_id: str, slot_id: str, status: str) -> bytes:
+    return _record(_OP_APPOINTMENT, (appointment_id, user_id, slot_id, status))
+
+
+def _calendar_record(user_id: str, appointment_id: str, slot: Dict[str, Any]) -> bytes:
+    return _record(_OP_CALENDAR_PUT, (user_id, appointment_id, json.dumps(slot)))
+
+
+class _LogState:
+    """
+    The state a log describes, folded from its records.
+    """
+
+    def __init__(self) -> None:
+        self.slots: Dict[str, Dict[str, Any]] = {}
+        self.appointments: Dict[str, Dict[str, Any]] = {}
+        # user_id -> {appointment_id: slot}
+        self.calendar: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def replay(self, data: bytes) -> int:
+        """
+        Apply every intact record in `data`. Returns the offset just past the
+        last one; anything after it is a torn or corrupt tail.
+        """
+        slots, appointments, calendar = self.slots, self.appointments, self.calendar
+        unpack = _HEADER.unpack_from
+        header_size = _HEADER.size
+        crc32 = zlib.crc32
+        seeds = _OP_SEEDS
+        size = len(data)
+        offset = 0
+
+        while offset + header_size <= size:
+            length, crc, op = unpack(data, offset)
+            start = offset + header_size
+            end = start + length
+            seed = seeds.get(op)
+            if end > size or seed is None:
+                break
+            payload = data[start:end]
+            if crc32(payload, seed) != crc:
+                break
+            text = str(payload, "utf-8")
+            fields = text.split(_SEPARATOR)
+            if _ESCAPE in text:
+                fields = [_unescape(field) for field in fields]
+            offset = end
+
+            if op == _OP_BOOK or op == _OP_FREE:
+                slot = slots.get(fields[0])
+                if slot is not None:
+                    slot["booked"] = op == _OP_BOOK
+            elif op == _OP_APPOINTMENT:
+                appointment_id, user_id, slot_id, status = fields
+                appointments[appointment_id] = {
+                    "id": appointment_id, "user_id": user_id, "slot_id": slot_id, "status": status,
+                }
+            elif op == _OP_SLOT:
+                if fields[0] not in slots:
+                    slot = dict(zip(_SLOT_COLUMNS, fields))
+                    slot["booked"] = fields[8] == "1"
+                    slots[fields[0]] = slot
+            elif op == _OP_CALENDAR_PUT:
+                calendar.setdefault(fields[0], {})[fields[1]] = json.loads(fields[2])
+            else:
+                entries = calendar.get(fields[0])
+                if entries is not None:
+                    entries.pop(fields[1], None)
+                    if not entries:
+                        del calendar[fields[0]]
+        return offset
+
+    def records(self) -> Iterator[bytes]:
+        """
+        The shortest log that rebuilds this state. Canceled appointments are
+        left out; their slots are already free.
+        """
+        for slot in self.slots.values():
+            yield _slot_record(slot)
+        for appointment in self.appointments.values():
+            if appointment["status"] == "canceled":
+                continue
+            yield _appointment_record(
+                appointment["id"], appointment["user_id"], appointment["slot_id"], appointment["status"]
+            )
+        for user_id, entries in self.calendar.items():
+            for appointment_id, slot in entries.items():
+                yield _calendar_record(user_id, appointment_id, slot)
+
+
+class LogStorage:
+    """
+    Append-only log storage with group commit and background compaction.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        synchronous: bool = False,
+        batch_size: int = 256,
+        flush_interval: float = 0.05,
+        segment_bytes: int = 64 * 1024 * 1024,
+    ) -> None:
+        self._directory = directory
+        self._synchronous = synchronous
+        self._batch_size = batch_size
+        self._segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        # State recovered from disk, handed to the tools by the load_* methods
+        self._recovered, self._segment = self._recover()
+
+        # Keep appending to the last segment (a new one if there is none)
+        path = self._segment_path(self._segment)
+        self._file = open(path, "ab")
+        self._segment_size = os.path.getsize(path)
+        self._compactor: Optional[threading.Thread] = None
+        # Set by a failed background compaction, raised by the next
+        # snapshot(), flush() or close()
+        self._compact_error: Optional[BaseException] = None
+
+        # Group commit state. Records get sequence numbers as they are
+        # buffered; _durable is the last one known to be on disk. One thread
+        # at a time (_writing) does the write + fsync.
+        self._cond = threading.Condition()
+        self._buffer: List[bytes] = []
+        self._appended = 0
+        self._durable = 0
+        self._writing = False
+        self._error: Optional[BaseException] = None
+        self._records_written = 0
+        self._syncs = 0
+
+        self._closed = threading.Event()
+        self._flusher = None
+        if flush_interval > 0 and not synchronous:
+            self._flush_interval = flush_interval
+            self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+            self._flusher.start()
+
+    # --- files --------------------------------------------------------
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self._directory, f"{_SEGMENT_PREFIX}{segment:06d}")
+
+    def _segments(self) -> List[int]:
+        return sorted(
+            int(name[len(_SEGMENT_PREFIX):])
+            for name in os.listdir(self._directory)
+            if name.startswith(_SEGMENT_PREFIX) and name[len(_SEGMENT_PREFIX):].isdigit()
+        )
+
+    def _load_snapshot(self, state: _LogState) -> int:
+        """
+        Replay the snapshot into `state`. Returns the last segment it covers
+        (0 if there is no snapshot yet).
+        """
+        path = os.path.join(self._directory, _SNAPSHOT_NAME)
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, covered = _SNAPSHOT_HEADER.unpack_from(data)
+        if magic != _SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not an operation log snapshot.")
+        body = memoryview(data)[_SNAPSHOT_HEADER.size:]
+        if state.replay(body) != len(body):
+            raise ValueError(f"{path} is corrupt.")
+        return covered
+
+    def _recover(self) -> Tuple[_LogState, int]:
+        """
+        Rebuild the state from disk. Returns it with the segment to append
+        to: the last one left, or the one after the snapshot.
+        """
+        state = _LogState()
+        covered = self._load_snapshot(state)
+        segments = []
+        for segment in self._segments():
+            if segment <= covered:
+                # Already folded into the snapshot; a compaction was cut short
+                os.remove(self._segment_path(segment))
+            else:
+                segments.append(segment)
+        for segment in segments:
+            path = self._segment_path(segment)
+            with open(path, "rb") as f:
+                data = f.read()
+            end = state.replay(memoryview(data))
+            if end < len(data):
+                if segment != segments[-1]:
+                    raise ValueError(f"{path} is corrupt at byte {end}.")
+                # Torn write from a crash: drop the partial record
+                os.truncate(path, end)
+        return state, segments[-1] if segments else covered + 1
+
+    # --- group commit -------------------------------------------------
+
+    def _append(self, records: List[bytes], commit: bool) -> None:
+        with self._cond:
+            self._buffer.extend(records)
+            self._appended += len(records)
+            seq = self._appended
+            full = len(self._buffer) >= self._batch_size
+        if (commit and self._synchronous) or full:
+            self._sync_through(seq)
+
+    def _sync_through(self, seq: int, roll_over: bool = False) -> None:
+        """
+        Return once record `seq` is on disk. The first caller to find no
+        write in progress writes and syncs everything buffered; callers that
+        arrive meanwhile wait and are covered by the next round.
+        """
+        with self._cond:
+            while self._durable < seq or roll_over:
+                if self._error is not None:
+                    raise IOError("Operation log write failed earlier.") from self._error
+                if self._writing:
+                    self._cond.wait()
+                    continue
+
+                self._writing = True
+                batch, self._buffer = self._buffer, []
+                upto = self._appended
+                self._cond.release()
+                try:
+                    self._write(batch)
+                    # The only place segments roll over: a full segment, or
+                    # snapshot() asking for one
+                    if roll_over or (self._segment_size >= self._segment_bytes and not self._compacting()):
+                        self._roll_over()
+                except BaseException as error:
+                    self._error = error
+                    raise
+                finally:
+                    self._cond.acquire()
+                    self._writing = False
+                    self._cond.notify_all()
+                self._durable = upto
+                roll_over = False
+
+    def _write(self, batch: List[bytes]) -> None:
+        if not batch:
+            return
+        data = b"".join(batch)
+        self._file.write(data)
+        self._file.flush()
+        _fsync(self._file.fileno())
+        self._segment_size += len(data)
+        self._records_written += len(batch)
+        self._syncs += 1
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(self._flush_interval):
+            self._flush_buffered()
+
+    def _flush_buffered(self) -> None:
+        with self._cond:
+            seq = self._appended
+        self._sync_through(seq)
+
+    def flush(self) -> None:
+        self._flush_buffered()
+        self._raise_compact_error()
+
+    # --- compaction ---------------------------------------------------
+
+    def _compacting(self) -> bool:
+        return self._compactor is not None and self._compactor.is_alive()
+
+    def _roll_over(self) -> None:
+        """
+        Start a new segment and fold the closed ones into the snapshot in
+        the background. Called by the thread doing the writing.
+        """
+        if self._compactor is not None:
+            self._compactor.join()
+        covered = self._segment
+        self._file.close()
+        self._segment += 1
+        self._file = open(self._segment_path(self._segment), "ab")
+        self._segment_size = 0
+        self._compactor = threading.Thread(target=self._compact, args=(covered,), daemon=True)
+        self._compactor.start()
+
+    def _compact(self, covered: int) -> None:
+        """
+        Compactor thread: record any failure for the caller-facing methods
+        to raise, and leave no partial snapshot behind.
+        """
+        tmp_path = os.path.join(self._directory, f"{_SNAPSHOT_NAME}.tmp")
+        try:
+            self._compact_through(covered, tmp_path)
+        except BaseException as error:
+            with self._cond:
+                self._compact_error = error
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _raise_compact_error(self) -> None:
+        with self._cond:
+            error, self._compact_error = self._compact_error, None
+        if error is not None:
+            raise IOError("Operation log compaction failed; its segments were kept.") from error
+
+    def _compact_through(self, covered: int, tmp_path: str) -> None:
+        state = _LogState()
+        previous = self._load_snapshot(state)
+        for segment in self._segments():
+            if previous < segment <= covered:
+                with open(self._segment_path(segment), "rb") as f:
+                    state.replay(f.read())
+
+        path = os.path.join(self._directory, _SNAPSHOT_NAME)
+        with open(tmp_path, "wb") as f:
+            f.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, covered))
+            chunk: List[bytes] = []
+            for record in state.records():
+                chunk.append(record)
+                if len(chunk) == 4096:
+                    f.write(b"".join(chunk))
+                    chunk = []
+            f.write(b"".join(chunk))
+            f.flush()
+            _fsync(f.fileno())
+        os.replace(tmp_path, path)
+        if hasattr(os, "O_DIRECTORY"):
+            fd = os.open(self._directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+        for segment in self._segments():
+            if segment <= covered:
+                os.remove(self._segment_path(segment))
+
+    def snapshot(self) -> None:
+        """
+        Compact everything logged so far into the snapshot now, and wait
+        for it to finish.
+        """
+        with self._cond:
+            seq = self._appended
+        self._sync_through(seq, roll_over=True)
+        self._compactor.join()
+        self._raise_compact_error()
+
+    def metrics(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "records": self._records_written,
+                "syncs": self._syncs,
+                "segment": self._segment,
+                "segment_bytes": self._segment_size,
+            }
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        try:
+            self._flush_buffered()
+        finally:
+            if self._compactor is not None:
+                self._compactor.join()
+            self._file.close()
+        self._raise_compact_error()
+
+    # --- slots --------------------------------------------------------
+
+    def load_slots(self) -> Iterator[Dict[str, Any]]:
+        slots, self._recovered.slots = self._recovered.slots, {}
+        return iter(slots.values())
+
+    def save_slots(self, slots: Iterable[Dict[str, Any]]) -> None:
+        records = [_slot_record(slot) for slot in slots]
+        if records:
+            self._append(records, commit=True)
+
+    def set_slot_booked(self, slot_id: str, booked: bool) -> None:
+        # Committed by the save_appointment call that always follows
+        self._append([_record(_OP_BOOK if booked else _OP_FREE, (slot_id,))], commit=False)
+
+    # --- appointments -------------------------------------------------
+
+    def load_appointments(self) -> Iterator[Dict[str, Any]]:
+        appointments, self._recovered.appointments = self._recovered.appointments, {}
+        return iter(appointments.values())
+
+    def save_appointment(self, appointment: Dict[str, Any]) -> None:
+        self._append(
+            [_appointment_record(
+                appointment["id"], appointment["user_id"], appointment["slot"]["slot_id"], appointment["status"]
+            )],
+            commit=True,
+        )
+
+    # --- calendar -----------------------------------------------------
+
+    def load_calendar(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        calendar, self._recovered.calendar = self._recovered.calendar, {}
+        return calendar
+
+    def add_calendar_entry(self, user_id: str, appointment_id: str, slot: Dict[str, Any]) -> None:
+        self._append([_calendar_record(user_id, appointment_id, slot)], commit=True)
+
+    def remove_calendar_entry(self, user_id: str, appointment_id: str) -> None:
+        self._append([_record(_OP_CALENDAR_REMOVE, (user_id, appointment_id))], commit=True)
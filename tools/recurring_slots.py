@@ -0,0 +1,429 @@
+"""
+RecurringSlotStore:
+A slot store that describes availability as recurring weekly rules ("Dr.
+Mehta, Mon-Fri 18:00-20:00, 30-minute slots, Sunrise Clinic") instead of
+listing every slot.
+
+Slots are generated on demand, only for the dates and department a query
+asks about. The only per-slot state kept is the set of booked slots (the
+exceptions to the rules), so memory grows with bookings, not with how far
+ahead the calendar reaches. Slot ids encode their rule, date and time
+("<rule_id>/<date>/<time>"), so any slot can be rebuilt from its id.
+
+Queries without a date window cover the store's horizon (`horizon_days`
+from `start_date`). find_by_date() yields one date at a time, so finding the
+earliest free slot only generates the first few days. Free-slot counts
+(RuleAvailabilityCounters) are worked out per rule from how many of its
+weekdays fall in the window, minus the bookings in it, without generating
+any slots.
+
+Drop-in for SlotIndex / SlotTable as ClinicSchedulerTool's slot store;
+rules are added with add_rule() rather than add().
+"""
+
+from dataclasses import dataclass
+from datetime import date as _date, timedelta
+from operator import itemgetter
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+import threading
+
+from tools.slot_table import date_to_ordinal, minutes_to_time, time_to_minutes
+
+
+WEEKDAY_NAMES = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# Booked slot -> (department, time_of_day, date, doctor_id), for counting
+BookedSlot = Tuple[str, str, str, str]
+
+_by_time = itemgetter("time")
+
+
+def parse_weekdays(spec: str) -> Tuple[int, ...]:
+    """
+    "Mon-Fri", "Mon,Wed,Fri" or "Sat" -> weekday numbers (0 = Monday).
+    """
+    days: List[int] = []
+    for part in spec.lower().replace(" ", "").split(","):
+        first, _, last = part.partition("-")
+        try:
+            start = WEEKDAY_NAMES.index(first[:3])
+            end = WEEKDAY_NAMES.index(last[:3]) if last else start
+        except ValueError:
+            raise ValueError(f"Unknown weekday in {spec!r}.") from None
+        days.extend((start + i) % 7 for i in range((end - start) % 7 + 1))
+    return tuple(sorted(set(days)))
+
+
+def time_of_day_for(minutes: int) -> str:
+    if minutes < 12 * 60:
+        return "morning"
+    if minutes < 17 * 60:
+        return "afternoon"
+    return "evening"
+
+
+def _weekday_count(first: int, last: int, weekdays: FrozenSet[int]) -> int:
+    """
+    How many dates in [first, last] (ordinals) fall on one of `weekdays`.
+    """
+    if last < first:
+        return 0
+    full_weeks, rest = divmod(last - first + 1, 7)
+    start = _date.fromordinal(first).weekday()
+    return full_weeks * len(weekdays) + sum(1 for i in range(rest) if (start + i) % 7 in weekdays)
+
+
+@dataclass(frozen=True)
+class AvailabilityRule:
+    """
+    One doctor's recurring weekly sessions.
+    """
+    rule_id: str
+    doctor_id: str
+    doctor_name: str
+    department: str
+    location: str
+    weekdays: Tuple[int, ...]          # 0 = Monday; see parse_weekdays()
+    start_time: str                    # "18:00"
+    end_time: str                      # "20:00"; the last slot ends by then
+    slot_minutes: int = 30
+    valid_from: Optional[str] = None   # ISO dates, inclusive
+    valid_until: Optional[str] = None
+
+
+class _CompiledRule:
+    """
+    A rule with its slot times worked out once.
+    """
+
+    __slots__ = ("rule", "weekdays", "first", "last", "times", "by_time_of_day", "time_of_day_by_time", "template")
+
+    def __init__(self, rule: AvailabilityRule) -> None:
+        if "/" in rule.rule_id:
+            raise ValueError(f"Rule id {rule.rule_id!r} must not contain '/'.")
+        if not rule.weekdays or any(not 0 <= day <= 6 for day in rule.weekdays):
+            raise ValueError(f"Rule {rule.rule_id!r} needs weekdays between 0 (Monday) and 6.")
+        start, end = time_to_minutes(rule.start_time), time_to_minutes(rule.end_time)
+        if rule.slot_minutes <= 0 or start + rule.slot_minutes > end:
+            raise ValueError(f"Rule {rule.rule_id!r} has no room for a {rule.slot_minutes}-minute slot.")
+
+        self.rule = rule
+        self.weekdays = frozenset(rule.weekdays)
+        self.first = date_to_ordinal(rule.valid_from) if rule.valid_from else None
+        self.last = date_to_ordinal(rule.valid_until) if rule.valid_until else None
+        # (time, time_of_day) in order, all of them and per time_of_day
+        self.times = [
+            (minutes_to_time(minutes), time_of_day_for(minutes))
+            for minutes in range(start, end - rule.slot_minutes + 1, rule.slot_minutes)
+        ]
+        self.by_time_of_day: Dict[str, List[Tuple[str, str]]] = {"any": self.times}
+        for entry in self.times:
+            self.by_time_of_day.setdefault(entry[1], []).append(entry)
+        self.time_of_day_by_time = dict(self.times)
+        self.template = {
+            "doctor_id": rule.doctor_id,
+            "doctor_name": rule.doctor_name,
+            "department": rule.department,
+            "location": rule.location,
+            "duration_minutes": rule.slot_minutes,
+            "booked": False,
+        }
+
+    def covers(self, ordinal: int) -> bool:
+        return (self.first is None or ordinal >= self.first) and (self.last is None or ordinal <= self.last)
+
+    def days_in(self, first: int, last: int) -> int:
+        """
+        Dates in [first, last] this rule generates slots on.
+        """
+        if self.first is not None:
+            first = max(first, self.first)
+        if self.last is not None:
+            last = min(last, self.last)
+        return _weekday_count(first, last, self.weekdays)
+
+    def slot(self, slot_id: str, day: str, time: str, time_of_day: str) -> Dict[str, Any]:
+        return {**self.template, "slot_id": slot_id, "date": day, "time": time, "time_of_day": time_of_day}
+
+
+class RecurringSlotStore:
+    def __init__(
+        self,
+        rules: Iterable[AvailabilityRule] = (),
+        start_date: Optional[str] = None,
+        horizon_days: int = 365,
+    ) -> None:
+        self._start = _date.fromisoformat(start_date) if start_date else _date.today()
+        self._horizon_days = horizon_days
+        self._rules: Dict[str, _CompiledRule] = {}
+        # (department, weekday) -> rules, in the order added
+        self._by_day: Dict[Tuple[str, int], List[_CompiledRule]] = {}
+        self._departments: Dict[str, None] = {}
+        # The exceptions: slot_id -> what counting needs to know about it
+        self._booked: Dict[str, BookedSlot] = {}
+        self._lock = threading.Lock()
+
+        for rule in rules:
+            self.add_rule(rule)
+
+    def __len__(self) -> int:
+        """
+        Number of rules (slots are not stored).
+        """
+        return len(self._rules)
+
+    @property
+    def window(self) -> Tuple[str, str]:
+        """
+        The default query window, as inclusive ISO dates.
+        """
+        end = self._start + timedelta(days=self._horizon_days - 1)
+        return self._start.isoformat(), end.isoformat()
+
+    def add_rule(self, rule: AvailabilityRule) -> None:
+        compiled = _CompiledRule(rule)
+        with self._lock:
+            if rule.rule_id in self._rules:
+                raise ValueError(f"Duplicate rule id {rule.rule_id!r}.")
+            self._rules[rule.rule_id] = compiled
+            self._departments.setdefault(rule.department, None)
+            for weekday in compiled.weekdays:
+                self._by_day.setdefault((rule.department, weekday), []).append(compiled)
+
+    def add(self, slot: Dict[str, Any]) -> None:
+        raise TypeError("RecurringSlotStore generates slots from rules; add an AvailabilityRule with add_rule().")
+
+    def rules(self) -> List[AvailabilityRule]:
+        return [compiled.rule for compiled in self._rules.values()]
+
+    def booked_count(self) -> int:
+        return len(self._booked)
+
+    # --- single slots -------------------------------------------------
+
+    def _resolve(self, slot_id: str) -> Optional[Tuple[_CompiledRule, str, str, str]]:
+        """
+        (rule, date, time, time_of_day) for a slot id the rules generate.
+        """
+        rule_id, _, rest = slot_id.partition("/")
+        day, _, time = rest.partition("/")
+        compiled = self._rules.get(rule_id)
+        if compiled is None:
+            return None
+        time_of_day = compiled.time_of_day_by_time.get(time)
+        if time_of_day is None:
+            return None
+        try:
+            when = _date.fromisoformat(day)
+        except ValueError:
+            return None
+        if when.weekday() not in compiled.weekdays or not compiled.covers(when.toordinal()):
+            return None
+        return compiled, day, time, time_of_day
+
+    def get(self, slot_id: str) -> Optional[Dict[str, Any]]:
+        resolved = self._resolve(slot_id)
+        if resolved is None:
+            return None
+        compiled, day, time, time_of_day = resolved
+        slot = compiled.slot(slot_id, day, time, time_of_day)
+        slot["booked"] = slot_id in self._booked
+        return slot
+
+    def mark_booked(self, slot_id: str) -> bool:
+        """
+        Record a booking. Returns False if the slot was not free (or is not
+        one the rules generate).
+        """
+        resolved = self._resolve(slot_id)
+        if resolved is None:
+            return False
+        compiled, day, _, time_of_day = resolved
+        with self._lock:
+            if slot_id in self._booked:
+                return False
+            self._booked[slot_id] = (compiled.rule.department, time_of_day, day, compiled.rule.doctor_id)
+        return True
+
+    def mark_free(self, slot_id: str) -> bool:
+        """
+        Drop a booking. Returns False if the slot was already free.
+        """
+        with self._lock:
+            return self._booked.pop(slot_id, None) is not None
+
+    # --- lookups ------------------------------------------------------
+
+    def _free_on(self, day: _date, department: str, time_of_day: str) -> List[Dict[str, Any]]:
+        weekday, ordinal, iso = day.weekday(), day.toordinal(), day.isoformat()
+        departments = self._departments if department == "General" else (department,)
+        booked = self._booked
+        slots: List[Dict[str, Any]] = []
+        rules = 0
+        for dep in departments:
+            for compiled in self._by_day.get((dep, weekday), ()):
+                if not compiled.covers(ordinal):
+                    continue
+                rules += 1
+                prefix = f"{compiled.rule.rule_id}/{iso}/"
+                for time, tod in compiled.by_time_of_day.get(time_of_day, ()):
+                    slot_id = prefix + time
+                    if slot_id not in booked:
+                        slots.append(compiled.slot(slot_id, iso, time, tod))
+        if rules > 1:
+            slots.sort(key=_by_time)
+        return slots
+
+    def _days(self, start_date: Optional[str], end_date: Optional[str]) -> Iterator[_date]:
+        default_start, default_end = self.window
+        day = _date.fromisoformat(start_date or default_start)
+        end = _date.fromisoformat(end_date or default_end)
+        one = timedelta(days=1)
+        while day <= end:
+            yield day
+            day += one
+
+    def find_by_date(
+        self,
+        department: str,
+        time_of_day: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Yield (date, free slots on that date) for each date in the window
+        (default: the horizon) that has any, generating one date at a time.
+        """
+        for day in self._days(start_date, end_date):
+            slots = self._free_on(day, department, time_of_day)
+            if slots:
+                yield day.isoformat(), slots
+
+    def find_between(
+        self,
+        department: str,
+        time_of_day: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Free slots in [start_date, end_date] (default: the horizon), by date
+        and time.
+        """
+        slots: List[Dict[str, Any]] = []
+        for _, found in self.find_by_date(department, time_of_day, start_date, end_date):
+            slots.extend(found)
+        return slots
+
+    def find(
+        self,
+        department: str,
+        time_of_day: str,
+        date: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Free slots for department/time_of_day on one date, or over the whole
+        horizon. "General" matches every department and "any" every time of
+        day.
+        """
+        if date is not None:
+            return self._free_on(_date.fromisoformat(date), department, time_of_day)
+        return self.find_between(department, time_of_day)
+
+    def availability_counters(self) -> "RuleAvailabilityCounters":
+        return RuleAvailabilityCounters(self)
+
+    # --- counting (for RuleAvailabilityCounters) ----------------------
+
+    def _ordinals(self, start_date: Optional[str], end_date: Optional[str]) -> Tuple[int, int]:
+        default_start, default_end = self.window
+        return date_to_ordinal(start_date or default_start), date_to_ordinal(end_date or default_end)
+
+    def _booked_in(self, start_date: Optional[str], end_date: Optional[str]) -> List[BookedSlot]:
+        first, last = self.window
+        first, last = start_date or first, end_date or last
+        with self._lock:
+            return [entry for entry in self._booked.values() if first <= entry[2] <= last]
+
+    def count_free(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        department: str = "General",
+        time_of_day: str = "any",
+        doctor_id: Optional[str] = None,
+    ) -> Dict[Tuple[str, str], int]:
+        """
+        Free slots per (department, time_of_day) in the window, optionally
+        for one doctor's rules only.
+        """
+        first, last = self._ordinals(start_date, end_date)
+        counts: Dict[Tuple[str, str], int] = {}
+        for compiled in list(self._rules.values()):
+            rule = compiled.rule
+            if department != "General" and rule.department != department:
+                continue
+            if doctor_id is not None and rule.doctor_id != doctor_id:
+                continue
+            days = compiled.days_in(first, last)
+            if not days:
+                continue
+            for tod, times in compiled.by_time_of_day.items():
+                if tod != "any" and (time_of_day == "any" or tod == time_of_day):
+                    key = (rule.department, tod)
+                    counts[key] = counts.get(key, 0) + days * len(times)
+        for dep, tod, _, doctor in self._booked_in(start_date, end_date):
+            key = (dep, tod)
+            if key in counts and (doctor_id is None or doctor == doctor_id):
+                counts[key] -= 1
+        return counts
+
+
+class RuleAvailabilityCounters:
+    """
+    AvailabilityCounters for a RecurringSlotStore: answers the same queries
+    from the rules and the booked set on demand, so there is nothing to
+    seed or update per booking. Windows default to the store's horizon.
+    """
+
+    def __init__(self, store: RecurringSlotStore) -> None:
+        self._store = store
+
+    def seed(self, slot_store: Any) -> None:
+        pass
+
+    def add(self, slot: Dict[str, Any]) -> None:
+        pass
+
+    def booked(self, slot: Dict[str, Any]) -> None:
+        pass
+
+    def freed(self, slot: Dict[str, Any]) -> None:
+        pass
+
+    def free_count(
+        self,
+        department: str = "General",
+        time_of_day: str = "any",
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> int:
+        return sum(self._store.count_free(start_date, end_date, department, time_of_day).values())
+
+    def doctor_free_count(
+        self,
+        doctor_id: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> int:
+        return sum(self._store.count_free(start_date, end_date, doctor_id=doctor_id).values())
+
+    def summary(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        result: Dict[str, Dict[str, int]] = {}
+        for (dep, tod), count in sorted(self._store.count_free(start_date, end_date).items()):
+            result.setdefault(dep, {})[tod] = count
+        return result
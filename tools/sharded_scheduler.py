@@ -0,0 +1,520 @@
+"""
+ShardedScheduler:
+A drop-in replacement for ClinicSchedulerTool that spreads slots and
+appointments over several shards, each a ClinicSchedulerTool running in its
+own worker process.
+
+Slots are partitioned by department (the default), or by (location,
+department) for finer-grained balancing. Each new partition goes to the
+shard holding the fewest partitions (then the fewest slots), and the facade
+keeps the partition -> shard table, so:
+- book_slot goes straight to the shard owning the slot's partition
+- lookups for a department only reach the shards holding that department:
+  exactly one when partitioning by department. "General" (every
+  department) fans out to all shards in parallel and the results are
+  merged by date and time.
+- appointment_id -> shard is a dict lookup. A reschedule into another
+  shard books the new slot there under the same id, then cancels the old
+  booking.
+
+Fan-out sends to every shard before waiting on any, so the shards work in
+parallel. Calls to one shard are serialised by its lock; calls to different
+shards are not, so concurrent callers spread over the shards.
+
+Shards start empty and are seeded through `slots` or add_slots(). Use as
+the scheduler tool of a SchedulerAgent and call close() when done.
+"""
+
+from bisect import insort
+from collections import deque
+from multiprocessing.connection import Connection
+from operator import itemgetter
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple
+import asyncio
+import itertools
+import multiprocessing
+import signal
+import threading
+
+from tools.clinic_scheduler_tool import ClinicSchedulerTool
+from tools.slot_index import SlotIndex
+from tools.tracing import traced
+
+
+PartitionKey = Hashable
+
+# Slots sent to the shards per message when seeding
+ADD_BATCH = 10_000
+
+_by_date_time = itemgetter("date", "time")
+_by_time = itemgetter("time")
+
+
+def by_department(slot: Dict[str, Any]) -> PartitionKey:
+    return slot["department"]
+
+
+def by_location_department(slot: Dict[str, Any]) -> PartitionKey:
+    """
+    Spreads a department's clinics over several shards: better balanced,
+    but that department's lookups fan out to each of them.
+    """
+    return (slot.get("location"), slot["department"])
+
+
+def empty_shard(index: int) -> ClinicSchedulerTool:
+    """
+    Default shard factory: an in-memory scheduler with no slots.
+    """
+    return ClinicSchedulerTool(slot_store=SlotIndex())
+
+
+class _Shard:
+    """
+    The shard process's side: ClinicSchedulerTool calls, with slots passed
+    by id so bookings update the shard's own slot dicts.
+    """
+
+    def __init__(self, tool: ClinicSchedulerTool) -> None:
+        self._tool = tool
+
+    def add_slots(self, slots: List[Dict[str, Any]]) -> int:
+        return self._tool.add_slots(slots)
+
+    def find(
+        self, department: str, time_of_day: str, start_date: Optional[str], end_date: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        return self._tool.find_available_slots(department, time_of_day, start_date, end_date)
+
+    def dates(
+        self, department: str, time_of_day: str, after: Optional[str], limit: int
+    ) -> List[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Up to `limit` (date, free slots) pages for dates after `after`.
+        """
+        pages = self._tool.find_available_slots_by_date(department, time_of_day)
+        if after is not None:
+            pages = itertools.dropwhile(lambda page: page[0] <= after, pages)
+        return list(itertools.islice(pages, limit))
+
+    def get_slot(self, slot_id: str) -> Optional[Dict[str, Any]]:
+        return self._tool.get_slot(slot_id)
+
+    def book(self, user_id: str, slot_id: str, appointment_id: Optional[str]) -> Optional[str]:
+        slot = self._tool.get_slot(slot_id)
+        if slot is None:
+            return None
+        return self._tool.book_slot(user_id, slot, appointment_id)
+
+    def reschedule(self, appointment_id: str, slot_id: str) -> bool:
+        slot = self._tool.get_slot(slot_id)
+        return slot is not None and self._tool.reschedule_appointment(appointment_id, slot)
+
+    def cancel(self, appointment_id: str) -> bool:
+        return self._tool.cancel_appointment(appointment_id)
+
+    def get_appointment(self, appointment_id: str) -> Optional[Dict[str, Any]]:
+        return self._tool.get_appointment(appointment_id)
+
+    def booked_appointments(self) -> List[Dict[str, Any]]:
+        return list(self._tool.booked_appointments())
+
+    def count(self, department: str, time_of_day: str, start_date: Optional[str], end_date: Optional[str]) -> int:
+        return self._tool.count_available_slots(department, time_of_day, start_date, end_date)
+
+    def count_by_doctor(self, doctor_id: str, start_date: Optional[str], end_date: Optional[str]) -> int:
+        return self._tool.count_available_by_doctor(doctor_id, start_date, end_date)
+
+    def summary(self, start_date: Optional[str], end_date: Optional[str]) -> Dict[str, Dict[str, int]]:
+        return self._tool.availability_summary(start_date, end_date)
+
+
+def _shard_main(conn: Connection, shard_factory: Callable[[int], ClinicSchedulerTool], index: int) -> None:
+    """
+    Shard loop: receive (method, args), reply (result, error). None means stop.
+    """
+    # The owning process decides when shards stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    shard = _Shard(shard_factory(index))
+    conn.send("ready")
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        method, args = request
+        try:
+            conn.send((getattr(shard, method)(*args), None))
+        except Exception as exc:
+            conn.send((None, f"{type(exc).__name__}: {exc}"))
+    conn.close()
+
+
+class _ShardProcess:
+    """
+    Front-side handle for one shard process.
+    """
+
+    def __init__(self, shard_factory: Callable[[int], ClinicSchedulerTool], index: int) -> None:
+        self.index = index
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_shard_main, args=(child_conn, shard_factory, index), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        # Held from send to reply, so replies can't interleave
+        self.lock = threading.Lock()
+
+    def wait_ready(self) -> None:
+        if self.conn.recv() != "ready":
+            raise RuntimeError(f"scheduler shard {self.index} failed to start")
+
+    def call(self, method: str, *args: Any) -> Any:
+        with self.lock:
+            self.conn.send((method, args))
+            result, error = self.conn.recv()
+        if error is not None:
+            raise RuntimeError(f"scheduler shard {self.index}: {error}")
+        return result
+
+    def stop(self, timeout: float) -> None:
+        with self.lock:
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ShardedScheduler:
+    def __init__(
+        self,
+        shards: int = 4,
+        slots: Iterable[Dict[str, Any]] = (),
+        shard_factory: Callable[[int], ClinicSchedulerTool] = empty_shard,
+        partition_key: Callable[[Dict[str, Any]], PartitionKey] = by_department,
+        max_page_dates: int = 8,
+    ) -> None:
+        self._shards = [_ShardProcess(shard_factory, index) for index in range(shards)]
+        # Shards build their tools in parallel
+        for shard in self._shards:
+            shard.wait_ready()
+
+        self._partition_key = partition_key
+        self._partitions: Dict[PartitionKey, int] = {}
+        # department -> sorted indexes of the shards holding it
+        self._department_shards: Dict[str, List[int]] = {}
+        self._slot_counts = [0] * shards
+        self._partition_counts = [0] * shards
+        self._appointment_shards: Dict[str, int] = {}
+        # Guards partition assignment; lookups read the dicts without it
+        self._lock = threading.Lock()
+        # find_available_slots_by_date asks each shard for one date first
+        # (usually all a caller reads), then doubles up to this many
+        self._max_page_dates = max_page_dates
+
+        self.add_slots(slots)
+
+    def close(self, timeout: float = 5.0) -> None:
+        for shard in self._shards:
+            shard.stop(timeout)
+
+    # --- routing ------------------------------------------------------
+
+    def _assign(self, slot: Dict[str, Any]) -> int:
+        key = self._partition_key(slot)
+        index = self._partitions.get(key)
+        if index is None:
+            index = min(range(len(self._shards)), key=lambda i: (self._partition_counts[i], self._slot_counts[i]))
+            self._partitions[key] = index
+            self._partition_counts[index] += 1
+            holders = self._department_shards.setdefault(slot["department"], [])
+            if index not in holders:
+                insort(holders, index)
+        self._slot_counts[index] += 1
+        return index
+
+    def _shard_of(self, slot: Dict[str, Any]) -> Optional[_ShardProcess]:
+        index = self._partitions.get(self._partition_key(slot))
+        return None if index is None else self._shards[index]
+
+    def _shards_for(self, department: str) -> Sequence[int]:
+        if department == "General":
+            return range(len(self._shards))
+        return self._department_shards.get(department, ())
+
+    def _call_shards(self, calls: List[Tuple[int, str, Tuple[Any, ...]]]) -> List[Any]:
+        """
+        Run one call per shard in parallel: send them all, then collect the
+        replies. `calls` must be in shard order (the lock order).
+        """
+        shards = [self._shards[index] for index, _, _ in calls]
+        for shard in shards:
+            shard.lock.acquire()
+        try:
+            for shard, (_, method, args) in zip(shards, calls):
+                shard.conn.send((method, args))
+            # Read every reply before raising, so no pipe is left out of step
+            replies = [shard.conn.recv() for shard in shards]
+        finally:
+            for shard in shards:
+                shard.lock.release()
+        for shard, (_, error) in zip(shards, replies):
+            if error is not None:
+                raise RuntimeError(f"scheduler shard {shard.index}: {error}")
+        return [result for result, _ in replies]
+
+    def _fan_out(self, indexes: Iterable[int], method: str, *args: Any) -> List[Any]:
+        return self._call_shards([(index, method, args) for index in indexes])
+
+    def shard_slot_counts(self) -> List[int]:
+        """
+        Slots routed to each shard so far.
+        """
+        return list(self._slot_counts)
+
+    # --- ClinicSchedulerTool interface -------------------------------
+
+    def add_slot(self, slot: Dict[str, Any]) -> None:
+        self.add_slots((slot,))
+
+    def add_slots(self, slots: Iterable[Dict[str, Any]]) -> int:
+        """
+        Route slots to their shards, ADD_BATCH at a time. Returns how many
+        were new.
+        """
+        added = 0
+        slots = iter(slots)
+        for chunk in iter(lambda: list(itertools.islice(slots, ADD_BATCH)), []):
+            batches: Dict[int, List[Dict[str, Any]]] = {}
+            with self._lock:
+                for slot in chunk:
+                    batches.setdefault(self._assign(slot), []).append(slot)
+            added += sum(self._call_shards([(index, "add_slots", (batch,)) for index, batch in sorted(batches.items())]))
+        return added
+
+    @traced("sharded_scheduler.find_available_slots")
+    def find_available_slots(
+        self,
+        department: str,
+        time_of_day: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Free slots matching department and time_of_day, optionally only
+        within [start_date, end_date] (ISO dates). From a single shard they
+        come in that shard's order; merged from several, by date and time.
+        """
+        results = self._fan_out(self._shards_for(department), "find", department, time_of_day, start_date, end_date)
+        if not results:
+            return []
+        if len(results) == 1:
+            return results[0]
+        merged = list(itertools.chain.from_iterable(results))
+        merged.sort(key=_by_date_time)
+        return merged
+
+    def find_available_slots_by_date(
+        self,
+        department: str,
+        time_of_day: str,
+    ) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Yield (date, free slots on that date), earliest date first.
+
+        Every relevant shard is asked for its earliest date at once. After
+        that, a shard whose fetched dates are used up is asked again (in
+        parallel with the others) only when its next date could come before
+        the earliest date already in hand; pages double from one date up to
+        max_page_dates.
+        """
+        indexes = list(self._shards_for(department))
+        first_pages = self._fan_out(indexes, "dates", department, time_of_day, None, 1)
+        buffers = {index: deque(page) for index, page in zip(indexes, first_pages)}
+        # Last date fetched from each shard; its next date is later than this
+        last = {index: page[-1][0] for index, page in zip(indexes, first_pages) if page}
+        limits = dict.fromkeys(indexes, 1)
+        exhausted = {index for index, page in zip(indexes, first_pages) if not page}
+
+        while True:
+            heads = [buffer[0][0] for buffer in buffers.values() if buffer]
+            earliest = min(heads) if heads else None
+            refill = [
+                index for index in indexes
+                if not buffers[index] and index not in exhausted and (earliest is None or last[index] < earliest)
+            ]
+            if refill:
+                for index in refill:
+                    limits[index] = min(2 * limits[index], self._max_page_dates)
+                pages = self._call_shards(
+                    [(index, "dates", (department, time_of_day, last[index], limits[index])) for index in refill]
+                )
+                for index, page in zip(refill, pages):
+                    buffers[index].extend(page)
+                    if page:
+                        last[index] = page[-1][0]
+                    if len(page) < limits[index]:
+                        exhausted.add(index)
+                continue
+            if earliest is None:
+                return
+
+            groups = [buffer.popleft()[1] for buffer in buffers.values() if buffer and buffer[0][0] == earliest]
+            if len(groups) == 1:
+                yield earliest, groups[0]
+            else:
+                merged = list(itertools.chain.from_iterable(groups))
+                merged.sort(key=_by_time)
+                yield earliest, merged
+
+    def get_slot(self, slot_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Slot by id. Slot ids don't name their partition, so this asks every
+        shard; the booking paths route by the slot's own fields instead.
+        """
+        for slot in self._fan_out(range(len(self._shards)), "get_slot", slot_id):
+            if slot is not None:
+                return slot
+        return None
+
+    def get_appointment(self, appointment_id: str) -> Optional[Dict[str, Any]]:
+        index = self._appointment_shards.get(appointment_id)
+        if index is None:
+            return None
+        return self._shards[index].call("get_appointment", appointment_id)
+
+    def booked_appointments(self) -> Iterator[Dict[str, Any]]:
+        for appointments in self._fan_out(range(len(self._shards)), "booked_appointments"):
+            yield from appointments
+
+    @traced("sharded_scheduler.book_slot")
+    def book_slot(self, user_id: str, slot: Dict[str, Any], appointment_id: Optional[str] = None) -> Optional[str]:
+        """
+        Book a slot on the shard that owns it. None if it was taken (or is
+        unknown).
+        """
+        shard = self._shard_of(slot)
+        if shard is None:
+            return None
+        appointment_id = shard.call("book", user_id, slot["slot_id"], appointment_id)
+        if appointment_id is None:
+            return None
+        slot["booked"] = True
+        self._appointment_shards[appointment_id] = shard.index
+        return appointment_id
+
+    @traced("sharded_scheduler.reschedule_appointment")
+    def reschedule_appointment(self, appointment_id: str, new_slot: Dict[str, Any]) -> bool:
+        """
+        Move an appointment to a new slot, possibly on another shard.
+        Returns False if the appointment is unknown or the new slot was taken.
+        """
+        source = self._appointment_shards.get(appointment_id)
+        target = self._shard_of(new_slot)
+        if source is None or target is None:
+            return False
+
+        if target.index == source:
+            moved = target.call("reschedule", appointment_id, new_slot["slot_id"])
+        else:
+            appointment = self._shards[source].call("get_appointment", appointment_id)
+            if appointment is None:
+                return False
+            # Claim the new slot first so a lost race leaves the old booking intact
+            moved = target.call("book", appointment["user_id"], new_slot["slot_id"], appointment_id) is not None
+            if moved:
+                self._shards[source].call("cancel", appointment_id)
+                self._appointment_shards[appointment_id] = target.index
+        if moved:
+            new_slot["booked"] = True
+        return moved
+
+    @traced("sharded_scheduler.cancel_appointment")
+    def cancel_appointment(self, appointment_id: str) -> bool:
+        index = self._appointment_shards.get(appointment_id)
+        if index is None:
+            return False
+        return self._shards[index].call("cancel", appointment_id)
+
+    def count_available_slots(
+        self,
+        department: str = "General",
+        time_of_day: str = "any",
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> int:
+        return sum(self._fan_out(self._shards_for(department), "count", department, time_of_day, start_date, end_date))
+
+    def count_available_by_doctor(
+        self,
+        doctor_id: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> int:
+        return sum(self._fan_out(range(len(self._shards)), "count_by_doctor", doctor_id, start_date, end_date))
+
+    def availability_summary(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        summary: Dict[str, Dict[str, int]] = {}
+        for shard_summary in self._fan_out(range(len(self._shards)), "summary", start_date, end_date):
+            for department, counts in shard_summary.items():
+                merged = summary.setdefault(department, {})
+                for time_of_day, count in counts.items():
+                    merged[time_of_day] = merged.get(time_of_day, 0) + count
+        return summary
+
+    # Async variants run the blocking shard round trips on the default
+    # executor, so the event loop keeps serving while a shard works. They
+    # are not truly asynchronous: each call holds an executor thread until
+    # its shards reply, so concurrent lookups beyond the executor's thread
+    # count queue behind each other.
+
+    async def find_available_slots_async(
+        self,
+        department: str,
+        time_of_day: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self.find_available_slots, department, time_of_day, start_date, end_date
+        )
+
+    async def find_available_slots_by_date_async(
+        self,
+        department: str,
+        time_of_day: str,
+    ) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        find_available_slots_by_date with its first max_page_dates dates
+        fetched in the executor. Reading past them goes back to the shards
+        from the caller's thread, blocking its event loop; the ranking
+        rarely needs more than the first few dates.
+        """
+        dates = self.find_available_slots_by_date(department, time_of_day)
+        loop = asyncio.get_running_loop()
+        first = await loop.run_in_executor(None, lambda: list(itertools.islice(dates, self._max_page_dates)))
+        return itertools.chain(first, dates)
+
+    async def book_slot_async(
+        self, user_id: str, slot: Dict[str, Any], appointment_id: Optional[str] = None
+    ) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.book_slot, user_id, slot, appointment_id)
+
+    async def reschedule_appointment_async(self, appointment_id: str, new_slot: Dict[str, Any]) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.reschedule_appointment, appointment_id, new_slot)
+
+    async def cancel_appointment_async(self, appointment_id: str) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.cancel_appointment, appointment_id)
@@ -0,0 +1,256 @@
+"""
+SharedSlotStore:
+A slot store kept in a SQLite file, so several processes (the server's
+workers) book from one inventory instead of each holding its own copy.
+
+Every read goes to the file, and mark_booked is a single conditional
+UPDATE (`... WHERE booked = 0`), so when workers race for the same slot
+SQLite's write lock lets exactly one of them win, in any process.
+
+Free-slot counts come from SharedAvailabilityCounters, which counts rows
+on demand: per-process counters would only see that process's bookings.
+
+It exposes the same methods as SlotIndex, so ClinicSchedulerTool can use
+it as its slot store.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import threading
+
+from tools.lazy_import import lazy_import
+
+# Only needed once a store is opened
+sqlite3 = lazy_import("sqlite3")
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shared_slots (
+    slot_id TEXT PRIMARY KEY,
+    doctor_id TEXT NOT NULL,
+    doctor_name TEXT NOT NULL,
+    department TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    time_of_day TEXT NOT NULL,
+    location TEXT NOT NULL,
+    booked INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS shared_slots_free ON shared_slots (booked, department, time_of_day, date);
+CREATE INDEX IF NOT EXISTS shared_slots_free_dates ON shared_slots (booked, date);
+CREATE INDEX IF NOT EXISTS shared_slots_doctor ON shared_slots (doctor_id, date);
+"""
+
+_COLUMNS = ("slot_id", "doctor_id", "doctor_name", "department", "date", "time", "time_of_day", "location")
+_SELECT = "SELECT " + ", ".join(_COLUMNS) + ", booked FROM shared_slots"
+_INSERT = (
+    "INSERT OR IGNORE INTO shared_slots (" + ", ".join(_COLUMNS) + ", booked)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def _slot(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    slot = dict(zip(_COLUMNS, row))
+    slot["booked"] = bool(row[-1])
+    return slot
+
+
+def _free_filter(
+    department: str,
+    time_of_day: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> Tuple[str, List[Any]]:
+    """
+    WHERE clause and parameters for free slots. "General" matches every
+    department and "any" every time of day.
+    """
+    clauses, params = ["booked = 0"], []
+    if department != "General":
+        clauses.append("department = ?")
+        params.append(department)
+    if time_of_day != "any":
+        clauses.append("time_of_day = ?")
+        params.append(time_of_day)
+    if start_date is not None:
+        clauses.append("date >= ?")
+        params.append(start_date)
+    if end_date is not None:
+        clauses.append("date <= ?")
+        params.append(end_date)
+    return " WHERE " + " AND ".join(clauses), params
+
+
+class SharedSlotStore:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM shared_slots").fetchone()[0]
+
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            return self._conn.execute(sql, tuple(params)).fetchall()
+
+    def add(self, slot: Dict[str, Any]) -> None:
+        """
+        Store a slot. Slots whose id is already stored are ignored.
+        """
+        self.add_many((slot,))
+
+    def add_many(self, slots: Iterable[Dict[str, Any]]) -> None:
+        """
+        Store many slots in one transaction, e.g. to seed a new file before
+        the workers open it.
+        """
+        rows = [tuple(slot[column] for column in _COLUMNS) + (int(bool(slot.get("booked"))),) for slot in slots]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(_INSERT, rows)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def get(self, slot_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._query(_SELECT + " WHERE slot_id = ?", (slot_id,))
+        return _slot(rows[0]) if rows else None
+
+    def mark_booked(self, slot_id: str) -> bool:
+        """
+        Set the booked flag. Returns False if the slot was not free, including
+        when another process booked it first.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE shared_slots SET booked = 1 WHERE slot_id = ? AND booked = 0", (slot_id,)
+            )
+        return cursor.rowcount == 1
+
+    def mark_free(self, slot_id: str) -> bool:
+        """
+        Clear the booked flag. Returns False if the slot was already free.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE shared_slots SET booked = 0 WHERE slot_id = ? AND booked = 1", (slot_id,)
+            )
+        return cursor.rowcount == 1
+
+    def find(
+        self,
+        department: str,
+        time_of_day: str,
+        date: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Free slots for department/time_of_day (optionally one date), in the
+        order they were added.
+        """
+        where, params = _free_filter(department, time_of_day, date, date)
+        return [_slot(row) for row in self._query(_SELECT + where + " ORDER BY rowid", params)]
+
+    def find_between(
+        self,
+        department: str,
+        time_of_day: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        where, params = _free_filter(department, time_of_day, start_date, end_date)
+        return [_slot(row) for row in self._query(_SELECT + where + " ORDER BY rowid", params)]
+
+    def find_by_date(
+        self,
+        department: str,
+        time_of_day: str,
+    ) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Yield (date, free slots on that date), earliest date first. Each date
+        is looked up when the caller asks for it (the next free date after
+        the last one, walking the date index), so callers that only need the
+        soonest dates read only those, and bookings made meanwhile by other
+        processes are seen.
+        """
+        where, params = _free_filter(department, time_of_day)
+        sql = "SELECT MIN(date) FROM shared_slots" + where + " AND date > ?"
+        day = ""
+        while True:
+            day = self._query(sql, params + [day])[0][0]
+            if day is None:
+                return
+            found = self.find(department, time_of_day, day)
+            if found:
+                yield day, found
+
+    def availability_counters(self) -> "SharedAvailabilityCounters":
+        return SharedAvailabilityCounters(self)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SharedAvailabilityCounters:
+    """
+    AvailabilityCounters for a SharedSlotStore: counts free rows in the file
+    on demand, so every process sees every other process's bookings. There
+    is nothing to seed or update per booking.
+    """
+
+    def __init__(self, store: SharedSlotStore) -> None:
+        self._store = store
+
+    def seed(self, slot_store: Any) -> None:
+        pass
+
+    def add(self, slot: Dict[str, Any]) -> None:
+        pass
+
+    def booked(self, slot: Dict[str, Any]) -> None:
+        pass
+
+    def freed(self, slot: Dict[str, Any]) -> None:
+        pass
+
+    def free_count(
+        self,
+        department: str = "General",
+        time_of_day: str = "any",
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> int:
+        where, params = _free_filter(department, time_of_day, start_date, end_date)
+        return self._store._query("SELECT COUNT(*) FROM shared_slots" + where, params)[0][0]
+
+    def doctor_free_count(
+        self,
+        doctor_id: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> int:
+        where, params = _free_filter("General", "any", start_date, end_date)
+        return self._store._query(
+            "SELECT COUNT(*) FROM shared_slots" + where + " AND doctor_id = ?", params + [doctor_id]
+        )[0][0]
+
+    def summary(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        where, params = _free_filter("General", "any", start_date, end_date)
+        result: Dict[str, Dict[str, int]] = {}
+        for department, time_of_day, count in self._store._query(
+            "SELECT department, time_of_day, COUNT(*) FROM shared_slots" + where
+            + " GROUP BY department, time_of_day ORDER BY department, time_of_day",
+            params,
+        ):
+            result.setdefault(department, {})[time_of_day] = count
+        return result
@@ -0,0 +1,160 @@
+"""
+Streaming slot importer for clinic schedule exports (CSV or JSON Lines).
+
+Rows are parsed lazily and handed to ClinicSchedulerTool.add_slots in
+fixed-size chunks, so memory stays bounded by the chunk size plus the slot
+store itself, however large the file. Rows whose slot_id is already stored
+(earlier in the file, or from a previous import) are skipped and counted
+as duplicates.
+
+    result = import_slots(scheduler_tool, "clinic_a.csv")
+
+Combined with a SlotTable store, an import can be saved as a binary
+snapshot that later startups load without re-parsing:
+
+    python -m tools.slot_import clinic_a.csv clinic_b.jsonl --snapshot slots.bin
+    scheduler_tool = ClinicSchedulerTool(slot_store=SlotTable.load_snapshot("slots.bin"))
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional
+import argparse
+import csv
+import itertools
+import json
+import time
+
+from tools.clinic_scheduler_tool import ClinicSchedulerTool
+from tools.slot_table import SlotTable
+
+
+SLOT_FIELDS = ("slot_id", "doctor_id", "doctor_name", "department", "date", "time", "time_of_day", "location")
+DEFAULT_CHUNK_SIZE = 10_000
+
+_TRUE_VALUES = {"1", "true", "yes", "y", "t"}
+
+
+@dataclass
+class ImportResult:
+    rows: int
+    imported: int
+    duplicates: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def _slot_from_row(row: Dict[str, Any], line: int) -> Dict[str, Any]:
+    slot = {}
+    for field in SLOT_FIELDS:
+        value = row.get(field)
+        if value is None or value == "":
+            raise ValueError(f"Row {line}: missing {field}.")
+        slot[field] = str(value)
+    booked = row.get("booked")
+    slot["booked"] = booked.strip().lower() in _TRUE_VALUES if isinstance(booked, str) else bool(booked)
+    return slot
+
+
+def iter_csv_slots(stream: IO[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield slot dicts from a CSV with a header row naming the slot fields
+    (plus an optional "booked" column).
+    """
+    reader = csv.reader(stream)
+    header = next(reader, [])
+    missing = [field for field in SLOT_FIELDS if field not in header]
+    if missing:
+        raise ValueError(f"CSV header is missing {', '.join(missing)}.")
+    columns = [header.index(field) for field in SLOT_FIELDS]
+    booked_column = header.index("booked") if "booked" in header else None
+    width = max(columns + [booked_column or 0]) + 1
+
+    for line, row in enumerate(reader, start=2):
+        if len(row) < width or not all(row[i] for i in columns):
+            # Short or incomplete row: let the generic path name the problem
+            yield _slot_from_row(dict(zip(header, row)), line)
+            continue
+        slot = {field: row[i] for field, i in zip(SLOT_FIELDS, columns)}
+        slot["booked"] = booked_column is not None and row[booked_column].strip().lower() in _TRUE_VALUES
+        yield slot
+
+
+def iter_jsonl_slots(stream: IO[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield slot dicts from JSON Lines, one object per line. Blank lines are skipped.
+    """
+    for line, text in enumerate(stream, start=1):
+        if text.strip():
+            yield _slot_from_row(json.loads(text), line)
+
+
+def iter_slots(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream slots from a .csv or .jsonl/.ndjson file.
+    """
+    if path.endswith(".csv"):
+        parse = iter_csv_slots
+    elif path.endswith((".jsonl", ".ndjson")):
+        parse = iter_jsonl_slots
+    else:
+        raise ValueError(f"Unsupported schedule file {path!r}: expected .csv, .jsonl or .ndjson.")
+    with open(path, newline="", encoding="utf-8") as stream:
+        yield from parse(stream)
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_slots(
+    scheduler_tool: ClinicSchedulerTool,
+    path: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> ImportResult:
+    """
+    Stream one schedule file into the scheduler tool, `chunk_size` rows at
+    a time. Duplicate slot ids are dropped by the slot store.
+    """
+    start = time.perf_counter()
+    rows = imported = 0
+    for chunk in chunked(iter_slots(path), chunk_size):
+        rows += len(chunk)
+        imported += scheduler_tool.add_slots(chunk)
+    return ImportResult(
+        rows=rows,
+        imported=imported,
+        duplicates=rows - imported,
+        seconds=time.perf_counter() - start,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Import clinic schedule exports into a slot table")
+    parser.add_argument("paths", nargs="+", help=".csv / .jsonl schedule files")
+    parser.add_argument("--snapshot", help="write the resulting slot table to this snapshot file")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    table = SlotTable()
+    scheduler_tool = ClinicSchedulerTool(slot_store=table)
+    for path in args.paths:
+        result = import_slots(scheduler_tool, path, args.chunk_size)
+        print(
+            f"{path}: {result.rows:,} rows, {result.imported:,} imported, {result.duplicates:,} duplicates "
+            f"in {result.seconds:.2f}s ({result.rows_per_second:,.0f} rows/s)"
+        )
+    if args.snapshot:
+        table.save_snapshot(args.snapshot)
+        print(f"Snapshot of {len(table):,} slots written to {args.snapshot}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+SlotIndex:
+An in-memory index over slot dicts, keyed by (department, time_of_day, date).
+
+Each key keeps a sorted list of the positions of its *free* slots, so a lookup
+only touches the keys it needs and the slots it returns. Results come back in
+the order the slots were added, matching a plain scan over the slot list.
+
+find_by_date() walks the same keys date by date, earliest first, so callers
+that only need the soonest slots never touch later dates.
+
+Booking state changes are guarded by one lock per key rather than a global
+lock, so bookings for different departments, times or days never contend.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import bisect
+import itertools
+import threading
+
+
+SlotKey = Tuple[str, str, str]
+
+
+class SlotIndex:
+    def __init__(self, slots: Iterable[Dict[str, Any]] = ()) -> None:
+        # position -> slot dict (insertion order == scan order)
+        self._rows: List[Dict[str, Any]] = []
+        # slot_id -> position
+        self._positions: Dict[str, int] = {}
+        # (department, time_of_day, date) -> sorted positions of free slots
+        self._free: Dict[SlotKey, List[int]] = {}
+        # (department, time_of_day) -> sorted dates seen for that pair
+        self._dates: Dict[Tuple[str, str], List[str]] = {}
+        self._departments: Dict[str, None] = {}
+        self._times_of_day: Dict[str, None] = {}
+        # One lock per key for free-list updates, plus one for adding slots
+        self._locks: Dict[SlotKey, threading.Lock] = {}
+        self._add_lock = threading.Lock()
+
+        for slot in slots:
+            self.add(slot)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @staticmethod
+    def _key(slot: Dict[str, Any]) -> SlotKey:
+        return (slot["department"], slot["time_of_day"], slot["date"])
+
+    def add(self, slot: Dict[str, Any]) -> None:
+        """
+        Add a slot to the index. Slots whose id is already indexed are ignored.
+        """
+        with self._add_lock:
+            slot_id = slot["slot_id"]
+            if slot_id in self._positions:
+                return
+
+            key = self._key(slot)
+            department, time_of_day, date = key
+            self._departments.setdefault(department, None)
+            self._times_of_day.setdefault(time_of_day, None)
+
+            dates = self._dates.setdefault((department, time_of_day), [])
+            i = bisect.bisect_left(dates, date)
+            if i == len(dates) or dates[i] != date:
+                dates.insert(i, date)
+
+            lock = self._locks.setdefault(key, threading.Lock())
+            with lock:
+                position = len(self._rows)
+                self._rows.append(slot)
+                self._positions[slot_id] = position
+                free = self._free.setdefault(key, [])
+                if not slot.get("booked"):
+                    # Positions only grow, so appending keeps the list sorted
+                    free.append(position)
+
+    def get(self, slot_id: str) -> Optional[Dict[str, Any]]:
+        position = self._positions.get(slot_id)
+        if position is None:
+            return None
+        return self._rows[position]
+
+    def mark_booked(self, slot_id: str) -> bool:
+        """
+        Remove a slot from its free list. Returns False if it was not free.
+        """
+        position = self._positions.get(slot_id)
+        if position is None:
+            return False
+        slot = self._rows[position]
+        key = self._key(slot)
+        with self._locks[key]:
+            free = self._free[key]
+            i = bisect.bisect_left(free, position)
+            if i == len(free) or free[i] != position:
+                return False
+            del free[i]
+            slot["booked"] = True
+        return True
+
+    def mark_free(self, slot_id: str) -> bool:
+        """
+        Put a slot back on its free list. Returns False if it was already free.
+        """
+        position = self._positions.get(slot_id)
+        if position is None:
+            return False
+        slot = self._rows[position]
+        key = self._key(slot)
+        with self._locks[key]:
+            free = self._free[key]
+            i = bisect.bisect_left(free, position)
+            if i < len(free) and free[i] == position:
+                return False
+            free.insert(i, position)
+            slot["booked"] = False
+        return True
+
+    def _pairs(self, department: str, time_of_day: str) -> List[Tuple[str, str]]:
+        departments = tuple(self._departments) if department == "General" else (department,)
+        times_of_day = tuple(self._times_of_day) if time_of_day == "any" else (time_of_day,)
+        return [(dep, tod) for dep in departments for tod in times_of_day if self._dates.get((dep, tod))]
+
+    def find_by_date(
+        self,
+        department: str,
+        time_of_day: str,
+    ) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Yield (date, free slots on that date) in ascending date order, lazily.
+        Dates with no free slots are skipped.
+        """
+        pairs = self._pairs(department, time_of_day)
+        if len(pairs) == 1:
+            dates: Iterable[str] = self._dates[pairs[0]][:]
+        else:
+            dates = sorted(set(itertools.chain.from_iterable(self._dates[pair] for pair in pairs)))
+
+        rows = self._rows
+        for day in dates:
+            lists = [free[:] for free in (self._free.get((dep, tod, day)) for dep, tod in pairs) if free]
+            if not lists:
+                continue
+            positions = lists[0] if len(lists) == 1 else sorted(itertools.chain.from_iterable(lists))
+            yield day, [rows[p] for p in positions]
+
+    def find(
+        self,
+        department: str,
+        time_of_day: str,
+        date: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return free slots for department/time_of_day (optionally one date).
+        "General" matches every department and "any" every time of day.
+        """
+        departments = tuple(self._departments) if department == "General" else (department,)
+        times_of_day = tuple(self._times_of_day) if time_of_day == "any" else (time_of_day,)
+
+        lists: List[List[int]] = []
+        for dep in departments:
+            for tod in times_of_day:
+                dates = self._dates.get((dep, tod))
+                if not dates:
+                    continue
+                for day in (date,) if date is not None else dates:
+                    free = self._free.get((dep, tod, day))
+                    if free:
+                        # Copy so concurrent bookings can't shift the list under us
+                        lists.append(free[:])
+
+        rows = self._rows
+        if not lists:
+            return []
+        if len(lists) == 1:
+            return [rows[p] for p in lists[0]]
+        # Each list is a sorted run; timsort merges runs in C
+        return [rows[p] for p in sorted(itertools.chain.from_iterable(lists))]
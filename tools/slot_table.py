@@ -0,0 +1,409 @@
+"""
+SlotTable:
+A compact, column-oriented slot store for large inventories.
+
+Instead of one 9-key dict per slot, every column lives in an `array`:
+- repeated strings (department, time_of_day, doctor, location) are interned
+  to small integer codes
+- dates are stored as proleptic ordinals and times as minutes after midnight
+- the booked state is a byte-per-row flag column
+
+Lookups build byte masks with `bytes.translate` and combine them with
+big-integer bitwise ops, so filtering runs in C rather than a Python loop.
+Slot dicts are only built for the rows that are actually returned.
+
+Booked-flag updates are compare-and-set under striped per-row locks, so
+concurrent bookings of different slots rarely contend.
+
+It exposes the same methods as SlotIndex, so ClinicSchedulerTool can use
+either one as its slot store.
+
+save_snapshot() writes the columns to a binary file that load_snapshot()
+memory-maps and copies straight back into arrays, so a large inventory
+restarts without re-parsing its source export.
+"""
+
+from array import array
+from collections import Counter
+from datetime import date as _date
+import itertools
+import mmap
+import os
+import sys
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+import threading
+
+from tools.lazy_import import lazy_import
+
+# Only needed for snapshots
+json = lazy_import("json")
+
+
+_ZERO_TABLE = bytes(256)
+_FLIP_TABLE = bytes([1]) + bytes(255)   # 0 -> 1, anything else -> 0
+_LOCK_STRIPES = 64
+
+_SNAPSHOT_MAGIC = b"CFSLOTS1"
+
+
+class _Interner:
+    """
+    Maps hashable values to dense integer codes and back.
+    """
+
+    def __init__(self, limit: Optional[int] = None) -> None:
+        self._codes: Dict[Hashable, int] = {}
+        self._values: List[Any] = []
+        self._limit = limit
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def code(self, value: Hashable) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._values)
+            if self._limit is not None and code >= self._limit:
+                raise ValueError(f"Too many distinct values (limit {self._limit}).")
+            self._codes[value] = code
+            self._values.append(value)
+        return code
+
+    def lookup(self, value: Hashable) -> Optional[int]:
+        return self._codes.get(value)
+
+    def value(self, code: int) -> Any:
+        return self._values[code]
+
+    def values(self) -> List[Any]:
+        return list(self._values)
+
+
+def date_to_ordinal(value: str) -> int:
+    return _date.fromisoformat(value).toordinal()
+
+
+def ordinal_to_date(value: int) -> str:
+    return _date.fromordinal(value).isoformat()
+
+
+def time_to_minutes(value: str) -> int:
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def minutes_to_time(value: int) -> str:
+    return f"{value // 60:02d}:{value % 60:02d}"
+
+
+class SlotTable:
+    def __init__(self, slots: Iterable[Dict[str, Any]] = ()) -> None:
+        # Interned categories. Department and time_of_day are one byte per row
+        # so they can be masked with bytes.translate.
+        self._departments = _Interner(limit=256)
+        self._times_of_day = _Interner(limit=256)
+        self._doctors = _Interner()     # (doctor_id, doctor_name)
+        self._locations = _Interner()
+
+        # Columns, one entry per row
+        self._slot_ids: List[str] = []
+        self._department = bytearray()
+        self._time_of_day = bytearray()
+        self._doctor = array("I")
+        self._location = array("I")
+        self._date = array("I")
+        self._time = array("H")
+        self._booked = bytearray()
+
+        # slot_id -> row
+        self._rows: Dict[str, int] = {}
+        self._row_locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+        self._add_lock = threading.Lock()
+
+        # Decoded date/time strings, shared across materialized slots
+        self._date_strings: Dict[int, str] = {}
+        self._time_strings: Dict[int, str] = {}
+
+        for slot in slots:
+            self.add(slot)
+
+    def __len__(self) -> int:
+        return len(self._slot_ids)
+
+    def add(self, slot: Dict[str, Any]) -> None:
+        """
+        Append a slot as a new row. Slots whose id is already stored are ignored.
+        """
+        with self._add_lock:
+            slot_id = slot["slot_id"]
+            if slot_id in self._rows:
+                return
+
+            self._department.append(self._departments.code(slot["department"]))
+            self._time_of_day.append(self._times_of_day.code(slot["time_of_day"]))
+            self._doctor.append(self._doctors.code((slot["doctor_id"], slot["doctor_name"])))
+            self._location.append(self._locations.code(slot["location"]))
+            self._date.append(date_to_ordinal(slot["date"]))
+            self._time.append(time_to_minutes(slot["time"]))
+            self._booked.append(1 if slot.get("booked") else 0)
+            # Publish the row last, once every column has it
+            self._slot_ids.append(slot_id)
+            self._rows[slot_id] = len(self._slot_ids) - 1
+
+    def _materialize(self, row: int) -> Dict[str, Any]:
+        doctor_id, doctor_name = self._doctors.value(self._doctor[row])
+
+        date = self._date_string(self._date[row])
+        minutes = self._time[row]
+        time = self._time_strings.get(minutes)
+        if time is None:
+            time = self._time_strings[minutes] = minutes_to_time(minutes)
+
+        return {
+            "slot_id": self._slot_ids[row],
+            "doctor_id": doctor_id,
+            "doctor_name": doctor_name,
+            "department": self._departments.value(self._department[row]),
+            "date": date,
+            "time": time,
+            "time_of_day": self._times_of_day.value(self._time_of_day[row]),
+            "location": self._locations.value(self._location[row]),
+            "booked": bool(self._booked[row]),
+        }
+
+    def get(self, slot_id: str) -> Optional[Dict[str, Any]]:
+        row = self._rows.get(slot_id)
+        if row is None:
+            return None
+        return self._materialize(row)
+
+    def mark_booked(self, slot_id: str) -> bool:
+        """
+        Set the booked flag. Returns False if the slot was not free.
+        """
+        row = self._rows.get(slot_id)
+        if row is None:
+            return False
+        with self._row_locks[row % _LOCK_STRIPES]:
+            if self._booked[row]:
+                return False
+            self._booked[row] = 1
+        return True
+
+    def mark_free(self, slot_id: str) -> bool:
+        """
+        Clear the booked flag. Returns False if the slot was already free.
+        """
+        row = self._rows.get(slot_id)
+        if row is None:
+            return False
+        with self._row_locks[row % _LOCK_STRIPES]:
+            if not self._booked[row]:
+                return False
+            self._booked[row] = 0
+        return True
+
+    @staticmethod
+    def _match_mask(column: bytearray, code: int) -> bytes:
+        """
+        Byte mask with 0x01 where column == code, else 0x00.
+        """
+        table = bytearray(_ZERO_TABLE)
+        table[code] = 1
+        return column.translate(table)
+
+    def _matching_rows(self, department: str, time_of_day: str) -> List[int]:
+        n = len(self._slot_ids)
+        if n == 0:
+            return []
+
+        # Start from the "free" mask (booked flags are 0/1, so flip them)
+        mask = int.from_bytes(self._match_mask(self._booked, 0), "little")
+
+        if department != "General":
+            code = self._departments.lookup(department)
+            if code is None:
+                return []
+            mask &= int.from_bytes(self._match_mask(self._department, code), "little")
+
+        if time_of_day != "any":
+            code = self._times_of_day.lookup(time_of_day)
+            if code is None:
+                return []
+            mask &= int.from_bytes(self._match_mask(self._time_of_day, code), "little")
+
+        if not mask:
+            return []
+
+        # Walk the set bytes with memchr-speed finds. Columns may be a row
+        # ahead of _slot_ids while add() runs, so stop at n.
+        flags = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+        rows: List[int] = []
+        find = flags.find
+        row = find(1, 0, n)
+        while row != -1:
+            rows.append(row)
+            row = find(1, row + 1, n)
+        return rows
+
+    def find(
+        self,
+        department: str,
+        time_of_day: str,
+        date: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return free slots for department/time_of_day (optionally one date),
+        in row order. "General" matches every department and "any" every
+        time of day.
+        """
+        rows = self._matching_rows(department, time_of_day)
+        if date is not None:
+            ordinal = date_to_ordinal(date)
+            column = self._date
+            rows = [row for row in rows if column[row] == ordinal]
+        return [self._materialize(row) for row in rows]
+
+    def find_by_date(
+        self,
+        department: str,
+        time_of_day: str,
+    ) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Yield (date, free slots on that date) in ascending date order. Rows
+        are grouped on the date column and only materialized per date as the
+        caller asks for it.
+        """
+        column = self._date
+        rows = sorted(self._matching_rows(department, time_of_day), key=column.__getitem__)
+        for ordinal, group in itertools.groupby(rows, key=column.__getitem__):
+            yield self._date_string(ordinal), [self._materialize(row) for row in group]
+
+    def _date_string(self, ordinal: int) -> str:
+        date = self._date_strings.get(ordinal)
+        if date is None:
+            date = self._date_strings[ordinal] = ordinal_to_date(ordinal)
+        return date
+
+    def free_counts(self) -> Tuple[Dict[Tuple[str, str, str], int], Dict[Tuple[str, str], int]]:
+        """
+        Free slot counts per (department, time_of_day, date) and per
+        (doctor_id, date), tallied from the column codes without building
+        slot dicts.
+        """
+        n = len(self._slot_ids)
+        free = self._booked[:n].translate(_FLIP_TABLE)
+        by_category = Counter(itertools.compress(zip(self._department, self._time_of_day, self._date), free))
+        by_doctor = Counter(itertools.compress(zip(self._doctor, self._date), free))
+        return (
+            {
+                (self._departments.value(dep), self._times_of_day.value(tod), self._date_string(ordinal)): count
+                for (dep, tod, ordinal), count in by_category.items()
+            },
+            {
+                (self._doctors.value(doctor)[0], self._date_string(ordinal)): count
+                for (doctor, ordinal), count in by_doctor.items()
+            },
+        )
+
+    def save_snapshot(self, path: str) -> None:
+        """
+        Write the table to a binary snapshot file.
+
+        Layout: magic, 4-byte little-endian header length, a JSON header
+        (row count, interned values, array layout, section offsets), then
+        the raw column buffers back to back. The file is written next to
+        `path` and renamed into place, so readers never see a partial one.
+        """
+        with self._add_lock:
+            n = len(self._slot_ids)
+            sections = [
+                ("department", bytes(self._department[:n])),
+                ("time_of_day", bytes(self._time_of_day[:n])),
+                ("doctor", self._doctor[:n].tobytes()),
+                ("location", self._location[:n].tobytes()),
+                ("date", self._date[:n].tobytes()),
+                ("time", self._time[:n].tobytes()),
+                ("booked", bytes(self._booked[:n])),
+                ("slot_ids", "\n".join(self._slot_ids[:n]).encode()),
+            ]
+            header = {
+                "rows": n,
+                "byteorder": sys.byteorder,
+                "itemsizes": {"I": self._doctor.itemsize, "H": self._time.itemsize},
+                "departments": self._departments.values(),
+                "times_of_day": self._times_of_day.values(),
+                "doctors": [list(doctor) for doctor in self._doctors.values()],
+                "locations": self._locations.values(),
+                "sections": [],
+            }
+
+        offset = 0
+        for name, data in sections:
+            header["sections"].append([name, offset, len(data)])
+            offset += len(data)
+        encoded = json.dumps(header).encode()
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_SNAPSHOT_MAGIC)
+            f.write(len(encoded).to_bytes(4, "little"))
+            f.write(encoded)
+            for _, data in sections:
+                f.write(data)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_snapshot(cls, path: str) -> "SlotTable":
+        """
+        Rebuild a table from a save_snapshot() file. Columns are copied out
+        of a memory map with one buffer copy each; nothing is parsed per row
+        except the slot id index.
+        """
+        table = cls()
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if mapped[:len(_SNAPSHOT_MAGIC)] != _SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not a slot table snapshot.")
+            start = len(_SNAPSHOT_MAGIC)
+            header_length = int.from_bytes(mapped[start:start + 4], "little")
+            header = json.loads(mapped[start + 4:start + 4 + header_length])
+            base = start + 4 + header_length
+
+            if header["itemsizes"] != {"I": table._doctor.itemsize, "H": table._time.itemsize}:
+                raise ValueError(f"{path} was written with different array item sizes.")
+            swap = header["byteorder"] != sys.byteorder
+
+            sections = {}
+            with memoryview(mapped) as view:
+                for name, offset, length in header["sections"]:
+                    with view[base + offset:base + offset + length] as section:
+                        if name in ("department", "time_of_day", "booked"):
+                            sections[name] = bytearray(section)
+                        elif name == "slot_ids":
+                            sections[name] = bytes(section)
+                        else:
+                            column = array("H" if name == "time" else "I")
+                            column.frombytes(section)
+                            if swap:
+                                column.byteswap()
+                            sections[name] = column
+
+        for department in header["departments"]:
+            table._departments.code(department)
+        for time_of_day in header["times_of_day"]:
+            table._times_of_day.code(time_of_day)
+        for doctor in header["doctors"]:
+            table._doctors.code(tuple(doctor))
+        for location in header["locations"]:
+            table._locations.code(location)
+
+        table._department = sections["department"]
+        table._time_of_day = sections["time_of_day"]
+        table._doctor = sections["doctor"]
+        table._location = sections["location"]
+        table._date = sections["date"]
+        table._time = sections["time"]
+        table._booked = sections["booked"]
+        table._slot_ids = sections["slot_ids"].decode().split("\n") if header["rows"] else []
+        table._rows = dict(zip(table._slot_ids, range(len(table._slot_ids))))
+        return table
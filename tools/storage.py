@@ -0,0 +1,245 @@
+"""
+Storage backends for ClinicSchedulerTool and CalendarTool.
+
+The tools keep their working state (slot store, appointment dict, calendar
+indexes) in memory and report every change to a storage backend:
+
+- InMemoryStorage: the default. Persists nothing; state lives only in the
+  tools, exactly as before.
+- SQLiteStorage: durable storage in a SQLite file. Indexed tables, WAL mode,
+  and group-committed writes: changes are queued and committed together every
+  `batch_size` writes or `flush_interval` seconds, whichever comes first.
+- LogStorage (tools/oplog.py): an append-only binary operation log with
+  fsync group commit, background snapshot compaction and replay on startup.
+
+A backend implements:
+    load_slots() / save_slots(slots) / set_slot_booked(slot_id, booked)
+    load_appointments() / save_appointment(appointment)
+    load_calendar() / add_calendar_entry(user_id, appointment_id, slot)
+    remove_calendar_entry(user_id, appointment_id)
+    flush() / close()
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+import threading
+
+from tools.lazy_import import lazy_import
+
+# Only SQLiteStorage needs these
+json = lazy_import("json")
+sqlite3 = lazy_import("sqlite3")
+
+
+class InMemoryStorage:
+    """
+    No-op backend: the tools' own in-memory structures are the only copy.
+    """
+
+    def load_slots(self) -> Iterator[Dict[str, Any]]:
+        return iter(())
+
+    def save_slots(self, slots: Iterable[Dict[str, Any]]) -> None:
+        pass
+
+    def set_slot_booked(self, slot_id: str, booked: bool) -> None:
+        pass
+
+    def load_appointments(self) -> Iterator[Dict[str, Any]]:
+        return iter(())
+
+    def save_appointment(self, appointment: Dict[str, Any]) -> None:
+        pass
+
+    def load_calendar(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        return {}
+
+    def add_calendar_entry(self, user_id: str, appointment_id: str, slot: Dict[str, Any]) -> None:
+        pass
+
+    def remove_calendar_entry(self, user_id: str, appointment_id: str) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    slot_id TEXT PRIMARY KEY,
+    doctor_id TEXT NOT NULL,
+    doctor_name TEXT NOT NULL,
+    department TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    time_of_day TEXT NOT NULL,
+    location TEXT NOT NULL,
+    booked INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS slots_lookup ON slots (department, time_of_day, date);
+
+CREATE TABLE IF NOT EXISTS appointments (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    slot_id TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS appointments_user ON appointments (user_id);
+
+CREATE TABLE IF NOT EXISTS calendar_appointments (
+    appointment_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    slot TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS calendar_appointments_user ON calendar_appointments (user_id);
+"""
+
+# Statements are module constants so sqlite3's statement cache reuses the
+# compiled (prepared) form for every call.
+_INSERT_SLOT = (
+    "INSERT OR IGNORE INTO slots (slot_id, doctor_id, doctor_name, department, date, time,"
+    " time_of_day, location, booked)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_SET_BOOKED = "UPDATE slots SET booked = ? WHERE slot_id = ?"
+_UPSERT_APPOINTMENT = (
+    "INSERT INTO appointments (id, user_id, slot_id, status) VALUES (?, ?, ?, ?)"
+    " ON CONFLICT(id) DO UPDATE SET slot_id = excluded.slot_id, status = excluded.status"
+)
+_UPSERT_CALENDAR = (
+    "INSERT INTO calendar_appointments (appointment_id, user_id, slot) VALUES (?, ?, ?)"
+    " ON CONFLICT(appointment_id) DO UPDATE SET user_id = excluded.user_id, slot = excluded.slot"
+)
+_DELETE_CALENDAR = "DELETE FROM calendar_appointments WHERE appointment_id = ?"
+
+_SLOT_COLUMNS = (
+    "slot_id", "doctor_id", "doctor_name", "department", "date", "time", "time_of_day", "location",
+)
+
+
+class SQLiteStorage:
+    """
+    SQLite-backed storage with WAL mode and group commit.
+
+    Writes are queued and applied in a single transaction per batch. Until a
+    batch is flushed, a crash can lose at most that batch; call flush() when a
+    change must be durable before replying.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 256,
+        flush_interval: float = 0.05,
+    ) -> None:
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, cached_statements=64)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, Tuple[Any, ...]]] = []
+
+        self._closed = threading.Event()
+        self._flusher = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+            self._flusher.start()
+
+    # --- group commit -------------------------------------------------
+
+    def _queue(self, sql: str, params: Tuple[Any, ...]) -> None:
+        with self._lock:
+            self._pending.append((sql, params))
+            if len(self._pending) < self._batch_size:
+                return
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        with self._conn:
+            # Consecutive writes with the same statement go in one executemany
+            i = 0
+            while i < len(pending):
+                sql = pending[i][0]
+                j = i
+                while j < len(pending) and pending[j][0] == sql:
+                    j += 1
+                self._conn.executemany(sql, [params for _, params in pending[i:j]])
+                i = j
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(self._flush_interval):
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+    # --- slots --------------------------------------------------------
+
+    def load_slots(self) -> Iterator[Dict[str, Any]]:
+        self.flush()
+        cursor = self._conn.execute(
+            "SELECT " + ", ".join(_SLOT_COLUMNS) + ", booked FROM slots ORDER BY rowid"
+        )
+        for row in cursor:
+            slot = dict(zip(_SLOT_COLUMNS, row))
+            slot["booked"] = bool(row[-1])
+            yield slot
+
+    def save_slots(self, slots: Iterable[Dict[str, Any]]) -> None:
+        for slot in slots:
+            self._queue(
+                _INSERT_SLOT,
+                tuple(slot[column] for column in _SLOT_COLUMNS) + (int(bool(slot.get("booked"))),),
+            )
+
+    def set_slot_booked(self, slot_id: str, booked: bool) -> None:
+        self._queue(_SET_BOOKED, (int(booked), slot_id))
+
+    # --- appointments -------------------------------------------------
+
+    def load_appointments(self) -> Iterator[Dict[str, Any]]:
+        self.flush()
+        cursor = self._conn.execute("SELECT id, user_id, slot_id, status FROM appointments")
+        for appointment_id, user_id, slot_id, status in cursor:
+            yield {"id": appointment_id, "user_id": user_id, "slot_id": slot_id, "status": status}
+
+    def save_appointment(self, appointment: Dict[str, Any]) -> None:
+        self._queue(
+            _UPSERT_APPOINTMENT,
+            (appointment["id"], appointment["user_id"], appointment["slot"]["slot_id"], appointment["status"]),
+        )
+
+    # --- calendar -----------------------------------------------------
+
+    def load_calendar(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        self.flush()
+        calendar: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        cursor = self._conn.execute("SELECT appointment_id, user_id, slot FROM calendar_appointments ORDER BY rowid")
+        for appointment_id, user_id, slot in cursor:
+            calendar.setdefault(user_id, {})[appointment_id] = json.loads(slot)
+        return calendar
+
+    def add_calendar_entry(self, user_id: str, appointment_id: str, slot: Dict[str, Any]) -> None:
+        self._queue(_UPSERT_CALENDAR, (appointment_id, user_id, json.dumps(slot)))
+
+    def remove_calendar_entry(self, user_id: str, appointment_id: str) -> None:
+        self._queue(_DELETE_CALENDAR, (appointment_id,))
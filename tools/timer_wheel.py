@@ -0,0 +1,142 @@
+"""
+TimerWheel:
+A hierarchical timing wheel for large numbers of timers with coarse ticks.
+
+Time is an integer tick count. Level 0 has 256 buckets of one tick each;
+each level above has 64 buckets, each covering a whole turn of the level
+below (256 ticks, 16384 ticks, ...). A timer goes into the lowest level
+whose range covers its delay, in the bucket its expiry tick maps to, so
+scheduling is O(1). Buckets are dicts keyed by timer, and each timer
+remembers its bucket, so cancelling is O(1) as well.
+
+Advancing fires level 0's bucket for every tick passed. Each time level 0
+wraps, the matching bucket one level up is emptied and its timers are
+re-inserted lower down ("cascading"), and so on up the levels. Timers
+further out than the top level's range wait in its furthest bucket and are
+re-placed when it cascades.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+
+class Timer:
+    __slots__ = ("expires", "payload", "_bucket")
+
+    def __init__(self, expires: int, payload: Any) -> None:
+        self.expires = expires
+        self.payload = payload
+        self._bucket: Optional[Dict["Timer", None]] = None
+
+    @property
+    def active(self) -> bool:
+        return self._bucket is not None
+
+
+class TimerWheel:
+    def __init__(self, now: int = 0, level_bits: Sequence[int] = (8, 6, 6, 6)) -> None:
+        self._now = now
+        self._bits = tuple(level_bits)
+        self._shifts: List[int] = []
+        shift = 0
+        for bits in self._bits:
+            self._shifts.append(shift)
+            shift += bits
+        # Delays at or beyond this are parked at the top level
+        self._max_delay = (1 << shift) - 1
+        self._levels: List[List[Dict[Timer, None]]] = [
+            [{} for _ in range(1 << bits)] for bits in self._bits
+        ]
+        # (delay limit, shift, index mask, buckets) per level, lowest first;
+        # the top level takes everything that reaches it
+        self._placement = [
+            (1 << (shift + bits), shift, (1 << bits) - 1, buckets)
+            for shift, bits, buckets in zip(self._shifts, self._bits, self._levels)
+        ]
+        self._placement[-1] = (self._max_delay + 1,) + self._placement[-1][1:]
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def now(self) -> int:
+        return self._now
+
+    def _place(self, timer: Timer, earliest: int) -> None:
+        expires = timer.expires
+        if expires < earliest:
+            expires = earliest
+        delay = expires - self._now
+        if delay > self._max_delay:
+            expires = self._now + self._max_delay
+            delay = self._max_delay
+        for limit, shift, mask, buckets in self._placement:
+            if delay < limit:
+                bucket = buckets[(expires >> shift) & mask]
+                bucket[timer] = None
+                timer._bucket = bucket
+                return
+
+    def schedule(self, expires: int, payload: Any) -> Timer:
+        """
+        Add a timer firing at tick `expires` and return its handle.
+        """
+        timer = Timer(expires, payload)
+        # Anything already due fires on the next tick
+        self._place(timer, self._now + 1)
+        self._count += 1
+        return timer
+
+    def cancel(self, timer: Timer) -> bool:
+        """
+        Remove a pending timer. Returns False if it already fired or was
+        cancelled.
+        """
+        bucket = timer._bucket
+        if bucket is None:
+            return False
+        del bucket[timer]
+        timer._bucket = None
+        self._count -= 1
+        return True
+
+    def _cascade(self, level: int) -> None:
+        shift = self._shifts[level]
+        buckets = self._levels[level]
+        index = (self._now >> shift) & (len(buckets) - 1)
+        timers = buckets[index]
+        if not timers:
+            return
+        buckets[index] = {}
+        for timer in timers:
+            # Timers due on this very tick go into the level 0 bucket
+            # that is about to fire
+            self._place(timer, self._now)
+
+    def advance(self, to: int) -> List[Any]:
+        """
+        Move time forward to tick `to` and return the payloads of every
+        timer that fired, in expiry order.
+        """
+        fired: List[Any] = []
+        level0 = self._levels[0]
+        mask0 = len(level0) - 1
+        while self._now < to:
+            if not self._count:
+                self._now = to
+                break
+            self._now += 1
+            if not self._now & mask0:
+                # Level 0 wrapped: pull down the next bucket of each level
+                # above, top down, so timers land in their final level
+                for level in range(len(self._bits) - 1, 0, -1):
+                    if not (self._now & ((1 << self._shifts[level]) - 1)):
+                        self._cascade(level)
+            bucket = level0[self._now & mask0]
+            if bucket:
+                level0[self._now & mask0] = {}
+                for timer in bucket:
+                    timer._bucket = None
+                    fired.append(timer.payload)
+                self._count -= len(bucket)
+        return fired
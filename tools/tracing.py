@@ -0,0 +1,251 @@
+"""
+Lightweight tracing for the CareFlow pipeline.
+
+    from tools.tracing import tracer
+
+    with tracer.trace():                      # new trace id for this request
+        with tracer.span("triage"):
+            ...
+        with tracer.span("scheduler.book"):
+            with tracer.span("tool.find_available_slots"):
+                ...
+
+Spans nest automatically (parent ids follow the call stack, including
+across `await`, via contextvars) and carry the current trace id. Finished
+spans are handed to pluggable exporters:
+
+- InMemoryHistogramExporter: per-span-name latency histograms
+- JsonLinesExporter: one JSON object per span, for offline analysis
+
+Tool methods can be instrumented with the @traced("name") decorator.
+
+Tracing is off by default. While disabled, span() and trace() return a
+shared no-op context manager and @traced calls straight through, so
+instrumented code pays only a function call and a flag check.
+"""
+
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, IO, List, Optional, TypeVar
+import bisect
+import functools
+import itertools
+import os
+import threading
+import time
+
+from tools.lazy_import import lazy_import
+
+# Only needed to export spans
+json = lazy_import("json")
+
+
+@dataclass
+class SpanRecord:
+    trace_id: Optional[str]
+    span_id: int
+    parent_id: Optional[int]
+    name: str
+    start_ns: int
+    duration_ns: int
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+_current_trace: ContextVar[Optional[str]] = ContextVar("careflow_trace_id", default=None)
+_current_span: ContextVar[Optional[int]] = ContextVar("careflow_span_id", default=None)
+_span_ids = itertools.count(1)
+
+
+def new_trace_id() -> str:
+    return os.urandom(8).hex()
+
+
+def current_trace_id() -> Optional[str]:
+    return _current_trace.get()
+
+
+class _NoopContext:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info: Any) -> bool:
+        return False
+
+
+_NOOP = _NoopContext()
+
+
+class _Span:
+    __slots__ = ("_tracer", "_name", "_attributes", "_span_id", "_parent_id", "_token", "_start")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict[str, Any]) -> None:
+        self._tracer = tracer
+        self._name = name
+        self._attributes = attributes
+
+    def __enter__(self) -> "_Span":
+        self._span_id = next(_span_ids)
+        self._parent_id = _current_span.get()
+        self._token = _current_span.set(self._span_id)
+        self._start = time.perf_counter_ns()
+        return self
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self._attributes[key] = value
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> bool:
+        duration = time.perf_counter_ns() - self._start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self._attributes["error"] = exc_type.__name__
+        self._tracer._export(SpanRecord(
+            trace_id=_current_trace.get(),
+            span_id=self._span_id,
+            parent_id=self._parent_id,
+            name=self._name,
+            start_ns=self._start,
+            duration_ns=duration,
+            attributes=self._attributes,
+        ))
+        return False
+
+
+class _Trace:
+    __slots__ = ("_trace_id", "_token")
+
+    def __init__(self, trace_id: Optional[str]) -> None:
+        self._trace_id = trace_id
+
+    def __enter__(self) -> str:
+        trace_id = self._trace_id or _current_trace.get() or new_trace_id()
+        self._token = _current_trace.set(trace_id)
+        return trace_id
+
+    def __exit__(self, *exc_info: Any) -> bool:
+        _current_trace.reset(self._token)
+        return False
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.enabled = False
+        self._exporters: List[Any] = []
+
+    def enable(self, *exporters: Any) -> None:
+        self._exporters.extend(exporters)
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def clear_exporters(self) -> None:
+        self._exporters = []
+
+    def span(self, name: str, **attributes: Any):
+        """
+        Context manager timing one stage. No-op while tracing is disabled.
+        """
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name, attributes)
+
+    def trace(self, trace_id: Optional[str] = None):
+        """
+        Context manager binding a trace id for everything inside it. Reuses
+        the active trace id when one is already set and none is given.
+        """
+        if not self.enabled:
+            return _NOOP
+        return _Trace(trace_id)
+
+    def _export(self, record: SpanRecord) -> None:
+        for exporter in self._exporters:
+            exporter.export(record)
+
+
+# Process-wide tracer used by the agents and tools
+tracer = Tracer()
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """
+    Decorator wrapping every call of a function in a span called `name`.
+    """
+    def decorate(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            with _Span(tracer, name, {}):
+                return fn(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorate
+
+
+class InMemoryHistogramExporter:
+    """
+    Aggregates span durations per name into log-spaced buckets (about 10%
+    apart, from 1µs to ~100s), giving cheap approximate percentiles.
+    """
+
+    _BOUNDS_NS = [int(1_000 * 1.1 ** i) for i in range(194)]
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, List[int]] = {}
+        self._counts: Dict[str, int] = {}
+        self._totals: Dict[str, int] = {}
+
+    def export(self, record: SpanRecord) -> None:
+        bucket = bisect.bisect_left(self._BOUNDS_NS, record.duration_ns)
+        with self._lock:
+            buckets = self._buckets.get(record.name)
+            if buckets is None:
+                buckets = self._buckets[record.name] = [0] * (len(self._BOUNDS_NS) + 1)
+            buckets[bucket] += 1
+            self._counts[record.name] = self._counts.get(record.name, 0) + 1
+            self._totals[record.name] = self._totals.get(record.name, 0) + record.duration_ns
+
+    def _percentile_ms(self, buckets: List[int], count: int, q: float) -> float:
+        target = q * count
+        seen = 0
+        for i, n in enumerate(buckets):
+            seen += n
+            if seen >= target and n:
+                bound = self._BOUNDS_NS[min(i, len(self._BOUNDS_NS) - 1)]
+                return bound / 1e6
+        return self._BOUNDS_NS[-1] / 1e6
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            names = {name: (list(b), self._counts[name], self._totals[name]) for name, b in self._buckets.items()}
+        return {
+            name: {
+                "count": count,
+                "mean_ms": total / count / 1e6,
+                "p50_ms": self._percentile_ms(buckets, count, 0.50),
+                "p95_ms": self._percentile_ms(buckets, count, 0.95),
+                "p99_ms": self._percentile_ms(buckets, count, 0.99),
+            }
+            for name, (buckets, count, total) in sorted(names.items())
+        }
+
+
+class JsonLinesExporter:
+    """
+    Writes every finished span as one JSON line.
+    """
+
+    def __init__(self, stream: IO[str]) -> None:
+        self._stream = stream
+        self._lock = threading.Lock()
+
+    def export(self, record: SpanRecord) -> None:
+        line = json.dumps(asdict(record))
+        with self._lock:
+            self._stream.write(line + "\n")